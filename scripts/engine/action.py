@@ -18,11 +18,11 @@ from scripts.engine.core.constants import (
     TargetTagType,
 )
 from scripts.engine.core.definitions import ProjectileData
-from scripts.engine.effect import Effect
+from scripts.engine.effect import Effect, EffectTemplate
 from scripts.engine.world_objects.tile import Tile
 
 if TYPE_CHECKING:
-    from typing import Tuple, List
+    from typing import Any, Iterable, Tuple, List
 
 __all__ = ["Skill", "Affliction", "init_action", "skill_registry", "affliction_registry"]
 
@@ -39,6 +39,8 @@ class Action(ABC):
     effects: List[Effect]
     shape: ShapeType
     shape_size: int
+    effect_templates: Tuple[EffectTemplate, ...] = ()  # compiled from _compile_effect_templates when first used
+    _effect_templates_version: int = -1  # the library data version the effect templates were compiled from
 
     @abstractmethod
     def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[Effect]:
@@ -47,6 +49,36 @@ class Action(ABC):
         """
         pass
 
+    @classmethod
+    def _compile_effect_templates(cls) -> Iterable[EffectTemplate]:
+        """
+        Describe the effects applied to each entity, for actions whose effects dont depend on the state at the time
+        of use. Called when the effects are first built and again whenever the library data changes, so values can
+        be read from the library. Override in subclass.
+        """
+        return ()
+
+    @classmethod
+    def _get_effect_templates(cls) -> Tuple[EffectTemplate, ...]:
+        """
+        Get the compiled effect templates, compiling them if the library data has changed since they were compiled.
+        """
+        from scripts.engine import library
+
+        if cls._effect_templates_version != library.DATA_VERSION:
+            cls.effect_templates = tuple(cls._compile_effect_templates())
+            cls._effect_templates_version = library.DATA_VERSION
+
+        return cls.effect_templates
+
+    def _build_effects_from_templates(
+        self, origin: EntityID, target: EntityID, potency: float = 1.0, **bound: Any
+    ) -> List[Effect]:
+        """
+        Build the effects from the compiled effect templates.
+        """
+        return [template.build(origin, target, potency, **bound) for template in self._get_effect_templates()]
+
 
 class Skill(Action):
     """
@@ -1,18 +1,55 @@
 from __future__ import annotations
 
+import heapq
 import logging
 from typing import TYPE_CHECKING, cast
 
 from snecs.typedefs import EntityID
 
 from scripts.engine import library, world
-from scripts.engine.component import Afflictions, Knowledge, Tracked
-from scripts.engine.core.constants import INFINITE
+from scripts.engine.component import Afflictions, IsPlayer, Knowledge, LightSource, Tracked, WinCondition
+from scripts.engine.core.constants import INFINITE, SystemTrigger
 from scripts.engine.core.data import store
-from scripts.engine.systems import reaction, vision
+from scripts.engine.core.scheduler import scheduler
+from scripts.engine.systems import activation, reaction, vision
 
 if TYPE_CHECKING:
-    from typing import Dict, Tuple, List, Optional
+    from typing import Dict, Tuple, List, Optional, Type
+    from snecs import Component
+
+
+############ SCHEDULED SYSTEMS ##################
+
+# entities far from the player sleep until the player comes near. checked when the player moves, and each round to
+# catch entities that wandered off.
+scheduler.register(
+    "activation",
+    activation.process_activation,
+    [SystemTrigger.ROUND_END, SystemTrigger.DIRTY_COMPONENTS],
+    components=[IsPlayer],
+)
+
+# visibility only changes when the player or a light moves, the transparency changes within the player's sight, e.g.
+# something blocking sight moves or a tile changes, or a sight range changes. it is also refreshed when the player
+# acts and at the end of each round. other entities moving doesnt trigger it, as nearly every actor blocks.
+_vision_triggers = [
+    SystemTrigger.PLAYER_TURN,
+    SystemTrigger.ROUND_END,
+    SystemTrigger.DIRTY_COMPONENTS,
+    SystemTrigger.SIGHT_CHANGE,
+]
+_vision_components: List[Type[Component]] = [IsPlayer, LightSource]
+scheduler.register("light_map", vision.process_light_map, _vision_triggers, components=_vision_components)
+scheduler.register("fov", vision.process_fov, _vision_triggers, components=_vision_components)
+scheduler.register("tile_visibility", vision.process_tile_visibility, _vision_triggers, components=_vision_components)
+
+# the win condition can only be met when the player, or the win condition, moves
+scheduler.register(
+    "win_condition",
+    reaction.process_win_condition,
+    [SystemTrigger.DIRTY_COMPONENTS],
+    components=[IsPlayer, WinCondition],
+)
 
 
 ############ ACTIONS ##################
@@ -20,8 +57,8 @@ if TYPE_CHECKING:
 
 def rebuild_turn_queue(entity_to_exclude: Optional[EntityID] = None):
     """
-    Build a new turn queue that includes all timed entities. entity_to_exclude is one that should not be added
-    to the queue. Usually used in relation to deletion.
+    Build a new turn queue that includes all timed entities, other than those asleep, who rejoin when woken.
+    entity_to_exclude is one that should not be added to the queue. Usually used in relation to deletion.
     """
     logging.debug(f"Building a new turn queue...")
 
@@ -30,7 +67,7 @@ def rebuild_turn_queue(entity_to_exclude: Optional[EntityID] = None):
     from scripts.engine.core import queries
 
     for entity, (tracked,) in queries.tracked:
-        if entity != entity_to_exclude:
+        if entity != entity_to_exclude and entity not in store.sleeping_entities:
             tracked = cast(Tracked, tracked)
             new_queue[entity] = tracked.time_spent
     set_turn_queue(new_queue)
@@ -45,12 +82,15 @@ def rebuild_turn_queue(entity_to_exclude: Optional[EntityID] = None):
 def next_turn(entity_to_exclude: Optional[EntityID] = None):
     """
     Proceed to the next turn, setting the next entity to act as the turn holder and updating the passage of time.
-    Update game state to reflect turn holder.
+    Update game state to reflect turn holder. entity_to_exclude is removed from the queue first. Usually used in
+    relation to deletion.
     """
     logging.info(f"Moving to the next turn...")
 
-    # update the queue
-    rebuild_turn_queue(entity_to_exclude)
+    # get the next entity in the queue and set as new turn holder
+    if entity_to_exclude is not None:
+        remove_from_turn_queue(entity_to_exclude)
+    set_turn_holder(_get_next_entity_in_queue())
 
     # get next entity in queue
     turn_holder = get_turn_holder()
@@ -74,14 +114,8 @@ def next_turn(entity_to_exclude: Optional[EntityID] = None):
     else:
         set_time_in_round(get_time_in_round() + time_progressed)
 
-    # update visibility
-    # TODO - implement scheduling so this doesnt need to be called here
-    vision.process_light_map()
-    vision.process_fov()
-    vision.process_tile_visibility()
-
-    # check win condition
-    reaction.process_win_condition()
+    # run the systems triggered since the last turn, e.g. visibility and the win condition
+    scheduler.process_turn(turn_holder == world.get_player())
 
     # log new turn holder
     name = world.get_name(turn_holder)
@@ -97,6 +131,10 @@ def next_round(time_progressed: int):
     from scripts.engine.core import queries
 
     for entity, (knowledge,) in queries.knowledge:
+        # sleeping entities catch up when they wake
+        if activation.is_asleep(entity):
+            continue
+
         knowledge = cast(Knowledge, knowledge)
         for skill_name in knowledge.skill_names:
             skill_cooldown = knowledge.cooldowns[skill_name]
@@ -105,6 +143,9 @@ def next_round(time_progressed: int):
 
     ## affliction durations
     for entity, (afflictions,) in queries.affliction:
+        if activation.is_asleep(entity):
+            continue
+
         assert isinstance(afflictions, Afflictions)  # handle mypy type error
         for affliction in afflictions.active:
             if affliction.duration == 0:
@@ -115,6 +156,9 @@ def next_round(time_progressed: int):
                 # reduce duration if not infinite
                 affliction.duration -= 1
 
+    ## scheduled systems
+    scheduler.mark_round_end()
+
     ## time management
     # add progressed time and minus time_in_round to keep the remaining time
     set_time_in_round((get_time_in_round() + time_progressed) - library.GAME_CONFIG.default_values.time_per_round)
@@ -194,9 +238,19 @@ def _get_pretty_queue() -> List[Tuple[str, int]]:
 
 
 def _get_next_entity_in_queue() -> EntityID:
+    """
+    Get the entity with the least time spent, discarding any out of date entries found at the top of the heap.
+    Ties go to the lowest entity.
+    """
     queue = get_turn_queue()
-    next_entity = min(queue, key=queue.get)
-    return next_entity
+    heap = store.turn_heap
+    while heap:
+        time, entity = heap[0]
+        if queue.get(entity) == time:
+            return entity
+        heapq.heappop(heap)
+
+    raise KeyError("Tried to get the next entity in the turn queue, but it is empty.")
 
 
 ############# SET ###################
@@ -221,6 +275,34 @@ def set_turn_queue(queue: Dict[EntityID, int]):
     Set the turn queue
     """
     store.turn_queue = queue
+    _rebuild_turn_heap()
+
+
+def add_to_turn_queue(entity: EntityID, time: int):
+    """
+    Add an entity to the turn queue, or update its time if already in it.
+    """
+    store.turn_queue[entity] = time
+    heapq.heappush(store.turn_heap, (time, entity))
+
+    # out of date entries are only discarded when they reach the top, so clear them out if they build up
+    if len(store.turn_heap) > (len(store.turn_queue) * 2) + 16:
+        _rebuild_turn_heap()
+
+
+def remove_from_turn_queue(entity: EntityID):
+    """
+    Remove an entity from the turn queue. Does nothing if the entity isnt in it.
+    """
+    store.turn_queue.pop(entity, None)
+
+
+def _rebuild_turn_heap():
+    """
+    Rebuild the heap used to find the next entity from the turn queue.
+    """
+    store.turn_heap = [(time, entity) for entity, time in store.turn_queue.items()]
+    heapq.heapify(store.turn_heap)
 
 
 def set_time_of_last_turn(time: int):
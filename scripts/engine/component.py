@@ -7,14 +7,22 @@ import numpy as np
 from snecs import RegisteredComponent
 
 import scripts.engine.utility
-from scripts.engine.core.constants import EffectType, PrimaryStatType, RenderLayerType
+from scripts.engine.core.constants import (
+    AfflictionTriggerType,
+    Direction,
+    EffectType,
+    PrimaryStatType,
+    RenderLayerType,
+)
 
 if TYPE_CHECKING:
     import pygame
-    from typing import List, Dict, Optional, Type, Tuple
+    from typing import Callable, List, Dict, FrozenSet, Optional, Type, Tuple
+    from snecs.typedefs import EntityID
     from scripts.engine.thought import AIBehaviour
     from scripts.engine.action import Affliction, Skill
     from scripts.engine.core.definitions import TraitSpritePathsData, TraitSpritesData
+    from scripts.engine.world_objects.spatial_index import SpatialIndex
 
 
 ##########################################################
@@ -29,8 +37,6 @@ class IsPlayer(RegisteredComponent):
     Whether the entity is the player.
     """
 
-    __slots__ = ()  # reduces memory footprint as it prevents the creation of __dict__ and __weakref__ per instance
-
     def serialize(self):
         return True
 
@@ -44,8 +50,6 @@ class IsActor(RegisteredComponent):
     Whether the entity is an actor.
     """
 
-    __slots__ = ()
-
     def serialize(self):
         return True
 
@@ -59,8 +63,6 @@ class IsGod(RegisteredComponent):
     Whether the entity is a god.
     """
 
-    __slots__ = ()
-
     def serialize(self):
         return True
 
@@ -74,8 +76,6 @@ class HasCombatStats(RegisteredComponent):
     A flag to show if an entity has stats used for combat.
     """
 
-    __slots__ = ()
-
     def serialize(self):
         return True
 
@@ -89,8 +89,6 @@ class WinCondition(RegisteredComponent):
     A flag to show that an entity is a win objective
     """
 
-    __slots__ = ()
-
     def serialize(self):
         return True
 
@@ -115,8 +113,30 @@ class Position(RegisteredComponent):
 
         sorted_positions = sorted(positions, key=lambda x: (x[0] ** 2 + x[1] ** 2))
         top_left = sorted_positions[0]
-        self.offsets = [(x - top_left[0], y - top_left[1]) for x, y in sorted_positions]
-        self.reference_position = top_left
+        self.offsets: Tuple[Tuple[int, int], ...] = tuple(
+            (x - top_left[0], y - top_left[1]) for x, y in sorted_positions
+        )
+        self.reference_position: Tuple[int, int] = (top_left[0], top_left[1])
+
+        # set by the world when the entity is created, so the spatial index can follow the entity's moves
+        self.entity: Optional[EntityID] = None
+        self.spatial_index: Optional[SpatialIndex] = None
+
+        # almost every entity is on a single tile, so those skip the work needed for larger entities
+        self._is_single_tile: bool = len(self.offsets) == 1
+
+        # the outermost offset in each direction, as used by get_outermost
+        self._outermost_offsets: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        if not self._is_single_tile:
+            for member in Direction.__dict__.keys():
+                if member[:2] != "__":
+                    direction = getattr(Direction, member)
+                    self._outermost_offsets[direction] = self._calculate_outermost_offset(direction)
+
+        # absolute coordinates, refreshed whenever the position is set
+        self._coordinates: Tuple[Tuple[int, int], ...] = ()
+        self._coordinate_set: FrozenSet[Tuple[int, int]] = frozenset()
+        self._refresh_coordinates()
 
     def serialize(self):
         return self.coordinates
@@ -127,6 +147,10 @@ class Position(RegisteredComponent):
 
     def set(self, x: int, y: int):
         self.reference_position = (x, y)
+        self._refresh_coordinates()
+
+        if self.spatial_index is not None and self.entity is not None:
+            self.spatial_index.move(self.entity, self._coordinates)
 
     def get_outermost(self, direction: Tuple[int, int]) -> Tuple[int, int]:
         """
@@ -134,17 +158,33 @@ class Position(RegisteredComponent):
         :param direction: Direction to use
         :return: The position of the outermost tile
         """
-        coordinates = self.coordinates
-        # Calculate center
-        center = (sum(c[0] for c in coordinates), sum(c[1] for c in coordinates))
-        transformed = [np.dot((c[0], c[1]), direction) for c in coordinates]
-        # Find the coordinate that is nearest the direction
-        arg_max = np.argwhere(transformed == np.amax(transformed))
-        # From all the nearest coordinates find the one nearest to the center of the entity
-        arg_min = np.argmin(
-            np.sqrt((center[0] - transformed[i[0]][0]) ** 2 + (center[1] - transformed[i[0]][1]) ** 2) for i in arg_max
-        )
-        return coordinates[arg_max[arg_min][0]][0], coordinates[arg_max[arg_min][0]][1]
+        if self._is_single_tile:
+            return self.reference_position
+
+        direction = (direction[0], direction[1])
+        if direction not in self._outermost_offsets:
+            self._outermost_offsets[direction] = self._calculate_outermost_offset(direction)
+
+        offset_x, offset_y = self._outermost_offsets[direction]
+        return self.reference_position[0] + offset_x, self.reference_position[1] + offset_y
+
+    def _calculate_outermost_offset(self, direction: Tuple[int, int]) -> Tuple[int, int]:
+        """
+        Find the first offset furthest along the direction.
+        """
+        transformed = [offset[0] * direction[0] + offset[1] * direction[1] for offset in self.offsets]
+        return self.offsets[transformed.index(max(transformed))]
+
+    def _refresh_coordinates(self):
+        """
+        Update the held absolute coordinates from the reference position.
+        """
+        x, y = self.reference_position
+        if self._is_single_tile:
+            self._coordinates = ((x, y),)
+        else:
+            self._coordinates = tuple((x + offset_x, y + offset_y) for offset_x, offset_y in self.offsets)
+            self._coordinate_set = frozenset(self._coordinates)
 
     @property
     def x(self) -> int:
@@ -161,21 +201,20 @@ class Position(RegisteredComponent):
         return self.reference_position[1]
 
     @property
-    def coordinates(self) -> List[Tuple[int, int]]:
+    def coordinates(self) -> Tuple[Tuple[int, int], ...]:
         """
-        :return: The list of coordinates that this Position represents
+        :return: The coordinates that this Position represents
         """
-        return [(self.x + x, self.y + y) for x, y in self.offsets]
+        return self._coordinates
 
     def __contains__(self, key: Tuple[int, int]):
         """
         :param key: Coordinate to test against
         :return: A bool that represents if the Position contains the provided coordinates
         """
-        for coordinate in self.coordinates:
-            if coordinate == key:
-                return True
-        return False
+        if self._is_single_tile:
+            return key == self.reference_position
+        return key in self._coordinate_set
 
 
 class Aesthetic(RegisteredComponent):
@@ -417,7 +456,8 @@ class Knowledge(RegisteredComponent):
 
 class Afflictions(RegisteredComponent):
     """
-    An entity's Boons and Banes. held in .active as a list of Affliction.
+    An entity's Boons and Banes. held in .active as a list of Affliction. Should only be changed with add and
+    remove, so the index of afflictions by trigger stays correct.
     """
 
     def __init__(
@@ -431,6 +471,11 @@ class Afflictions(RegisteredComponent):
         self.active: List[Affliction] = active
         self.stat_modifiers: Dict[str, Tuple[PrimaryStatType, int]] = stat_modifiers
 
+        # not serialised, rebuilt from the active afflictions
+        self._triggered_by: Dict[AfflictionTriggerType, List[Affliction]] = {}
+        for affliction in active:
+            self._add_to_trigger_index(affliction)
+
     def serialize(self):
         active = {}
         for affliction in self.active:
@@ -460,6 +505,7 @@ class Afflictions(RegisteredComponent):
 
     def add(self, affliction: Affliction):
         self.active.append(affliction)
+        self._add_to_trigger_index(affliction)
 
     def remove(self, affliction: Affliction):
         if affliction in self.active:
@@ -470,6 +516,31 @@ class Afflictions(RegisteredComponent):
             # remove from active list
             self.active.remove(affliction)
 
+            for trigger in affliction.triggers:
+                triggered = self._triggered_by[trigger]
+                triggered.remove(affliction)
+                if not triggered:
+                    del self._triggered_by[trigger]
+
+    def has_trigger(self, trigger: AfflictionTriggerType) -> bool:
+        """
+        Check if any active affliction is triggered by the trigger.
+        """
+        return trigger in self._triggered_by
+
+    def get_triggered(self, trigger: AfflictionTriggerType) -> List[Affliction]:
+        """
+        Get the active afflictions triggered by the trigger, in the order they were added.
+        """
+        return list(self._triggered_by.get(trigger, []))
+
+    def _add_to_trigger_index(self, affliction: Affliction):
+        for trigger in affliction.triggers:
+            if trigger in self._triggered_by:
+                self._triggered_by[trigger].append(affliction)
+            else:
+                self._triggered_by[trigger] = [affliction]
+
 
 class Aspect(RegisteredComponent):
     """
@@ -507,20 +578,131 @@ class Opinion(RegisteredComponent):
 
 class FOV(RegisteredComponent):
     """
-    An entity's field of view.
+    An entity's field of view. Only the window of the map around what the entity can see is held, optionally packed
+    into bits; map gives the full map size version.
     """
 
-    def __init__(self, fov_map: np.array):
-        self.map: np.array = fov_map
+    def __init__(self, fov_map: Optional[np.ndarray] = None, is_packed: bool = False):
+        self.is_packed: bool = is_packed
+        self.start: Tuple[int, int] = (0, 0)  # top left of the window on the map
+        self.map_size: Tuple[int, int] = (0, 0)
+        self._window_shape: Tuple[int, int] = (0, 0)
+        self._window: np.ndarray = np.zeros((0, 0), dtype=bool)
 
-    def serialize(self):
-        fov_map = self.map.tolist()
+        # set by the vision system when the window is out of date, so it is only recalculated when next read
+        self.pending_update: Optional[Callable[[], None]] = None
+
+        # the x, y, radius and transparency version the window was last calculated with
+        self.calculated_with: Optional[Tuple[int, int, int, int]] = None
+
+        if fov_map is not None:
+            self.map = fov_map
+
+    def _update(self):
+        """
+        Recalculate the window, if it is out of date.
+        """
+        if self.pending_update is not None:
+            update = self.pending_update
+            self.pending_update = None
+            update()
+
+    def set_window(self, start: Tuple[int, int], window: np.ndarray, map_size: Tuple[int, int]):
+        """
+        Set what can be seen in the window starting at start, on a map of map_size.
+        """
+        self.start = start
+        self.map_size = map_size
+        self._window_shape = window.shape
+        if self.is_packed:
+            self._window = np.packbits(window, axis=None)
+        else:
+            self._window = np.asarray(window, dtype=bool)
+        self.pending_update = None
+
+    @property
+    def window(self) -> np.ndarray:
+        """
+        What can be seen in the window, as bools indexed [x, y] from start.
+        """
+        self._update()
+        if self.is_packed:
+            width, height = self._window_shape
+            return np.unpackbits(self._window, count=width * height).reshape(self._window_shape).astype(bool)
+        return self._window
+
+    @property
+    def window_slices(self) -> Tuple[slice, slice]:
+        """
+        The slices of the map covered by the window.
+        """
+        self._update()
+        start_x, start_y = self.start
+        width, height = self._window_shape
+        return slice(start_x, start_x + width), slice(start_y, start_y + height)
+
+    @property
+    def map(self) -> np.ndarray:
+        """
+        What can be seen, as a full size map of bools.
+        """
+        window = self.window
+        fov_map = np.zeros(self.map_size, dtype=bool, order="F")
+        fov_map[self.window_slices] = window
         return fov_map
 
+    @map.setter
+    def map(self, fov_map: np.ndarray):
+        # only hold the area around what is visible
+        visible_xs, visible_ys = np.nonzero(fov_map)
+        if visible_xs.size:
+            start = (int(visible_xs.min()), int(visible_ys.min()))
+            window = fov_map[start[0] : visible_xs.max() + 1, start[1] : visible_ys.max() + 1]
+        else:
+            start = (0, 0)
+            window = np.zeros((0, 0), dtype=bool)
+        self.set_window(start, window, fov_map.shape)
+
+    def is_in_fov(self, tile_pos: Tuple[int, int]) -> bool:
+        """
+        Check if the position can be seen.
+        """
+        self._update()
+        x = tile_pos[0] - self.start[0]
+        y = tile_pos[1] - self.start[1]
+        width, height = self._window_shape
+        if not (0 <= x < width and 0 <= y < height):
+            return False
+
+        if self.is_packed:
+            index = (x * height) + y  # packed in row major order
+            return bool((self._window[index // 8] >> (7 - index % 8)) & 1)
+        return bool(self._window[x, y])
+
+    def serialize(self):
+        self._update()
+        if self.is_packed:
+            window = self._window.tolist()
+        else:
+            window = np.packbits(self._window, axis=None).tolist()
+
+        data = {
+            "start": self.start,
+            "map_size": self.map_size,
+            "window_shape": self._window_shape,
+            "window": window,
+            "is_packed": self.is_packed,
+        }
+        return data
+
     @classmethod
     def deserialize(cls, serialised):
-        fov_map = np.array(serialised)
-        return FOV(fov_map)
+        fov = FOV(is_packed=serialised["is_packed"])
+        width, height = serialised["window_shape"]
+        packed = np.array(serialised["window"], dtype=np.uint8)
+        window = np.unpackbits(packed, count=width * height).reshape((width, height)).astype(bool)
+        fov.set_window(tuple(serialised["start"]), window, tuple(serialised["map_size"]))
+        return fov
 
 
 class LightSource(RegisteredComponent):
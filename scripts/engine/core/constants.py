@@ -37,6 +37,7 @@ DATA_PATH = ROOT_PATH / "data/"
 ASSET_PATH = ROOT_PATH / "assets/"
 IMAGE_NOT_FOUND_PATH = ASSET_PATH / "image_not_found.png"
 SAVE_PATH = DATA_PATH / "saves/"
+MAP_CACHE_PATH = DATA_PATH / "map_cache/"
 
 ######################## NEW TYPES ######################################
 # NewType guarantees you don't accidentally pass in a normal str instead of a value explicitly defined as a member of
@@ -64,6 +65,7 @@ TraitGroupType = NewType("TraitGroupType", str)
 AfflictionTriggerType = NewType("AfflictionTriggerType", str)
 RenderLayerType = NewType("RenderLayerType", int)
 TileCategoryType = NewType("TileCategoryType", str)
+SystemTriggerType = NewType("SystemTriggerType", str)
 
 TagType = Union[TargetTagType, DamageTypeType, AfflictionCategoryType]
 
@@ -120,6 +122,19 @@ class GameState(SimpleNamespace):
     MENU = GameStateType(7)  # while using a menu
 
 
+class SystemTrigger(SimpleNamespace):
+    """
+    What causes a system registered with the scheduler to run.
+    """
+
+    PLAYER_TURN = SystemTriggerType("player_turn")  # the player becomes the turn holder
+    MOVE = SystemTriggerType("move")  # any entity moves, or is added to or removed from the map
+    ROUND_END = SystemTriggerType("round_end")  # a round has ended
+    EVERY_N_TURNS = SystemTriggerType("every_n_turns")  # every n turns, n being the system's interval
+    DIRTY_COMPONENTS = SystemTriggerType("dirty_components")  # one of the system's components is marked dirty
+    SIGHT_CHANGE = SystemTriggerType("sight_change")  # a tile's transparency or an entity's sight range changes
+
+
 class UIElement(SimpleNamespace):
     """
     The different, single instance UI elements
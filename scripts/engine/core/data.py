@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import heapq
 import logging
 import os
 from typing import TYPE_CHECKING, Any, Optional
@@ -9,9 +10,12 @@ from snecs.typedefs import EntityID
 
 from scripts.engine.core.constants import GameState, GameStateType
 from scripts.engine.world_objects.game_map import GameMap
+from scripts.engine.world_objects.spatial_index import SpatialIndex
 
 if TYPE_CHECKING:
-    from typing import TYPE_CHECKING, Dict
+    from typing import TYPE_CHECKING, Dict, List, Tuple, Type
+
+    from snecs import Component
 
 __all__ = ["store"]
 
@@ -32,9 +36,15 @@ class Store:
 
         # used in world
         self.current_game_map: Optional[GameMap] = None
+        self.spatial_index: SpatialIndex = SpatialIndex()  # not serialised, rebuilt from Positions when loading
+        self.stat_cache: Dict[EntityID, Dict[str, int]] = {}  # (entity, {stat: value}). not serialised
+        self.flagged_entities: Dict[Type[Component], Dict[EntityID, None]] = {}  # not serialised, rebuilt from world
+        self.stat_cache_data_version: int = -1  # library data version the stat cache was built from
 
         # used in chronicle
         self.turn_queue: Dict[EntityID, int] = {}  # (entity, time)
+        self.turn_heap: List[Tuple[int, EntityID]] = []  # (time, entity). not serialised, rebuilt from turn_queue
+        self.sleeping_entities: Dict[EntityID, int] = {}  # (entity, round slept). not serialised, woken before saving
         self.round: int = 1  # count of the round
         self.time: int = 1  # total time of actions taken
         self.time_of_last_turn: int = 1
@@ -79,6 +89,8 @@ class Store:
                 game_map = None
             self.current_game_map = game_map
             self.turn_queue = serialised["turn_queue"]
+            self.turn_heap = [(time, entity) for entity, time in self.turn_queue.items()]
+            heapq.heapify(self.turn_heap)
             self.round = serialised["round"]
             self.time = serialised["time"]
             self.time_of_last_turn = serialised["time_of_last_turn"]
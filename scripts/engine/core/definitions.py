@@ -459,9 +459,22 @@ class DefaultValueData:
     reduced_effectiveness_multi_tile_modifier: float
 
 
+@register_dataclass_with_json
+@dataclass
+class PerformanceConfigData:
+    vision_workers: int  # threads used to calculate fov and light. 1 or less calculates them one at a time.
+    pack_fov: bool  # hold each entity's fov as bits, rather than bools
+    npc_turn_time_per_frame: float  # ms to spend taking non-player turns each frame. at least one is always taken.
+    sleep_distance: int  # tiles from the player beyond which entities sleep. 0 or less keeps everything awake.
+    map_generation_workers: int  # processes generating maps ahead of time, linux only. 0 or less generates when needed.
+    maps_held_ready: int  # maps generated ahead of time for each map name.
+    map_cache_size: int  # kilobytes of generated maps kept on disk. 0 or less turns the cache off.
+
+
 @register_dataclass_with_json
 @dataclass
 class GameConfigData:
     hit_types: HitTypeData
     base_values: BaseValueData
     default_values: DefaultValueData
+    performance: PerformanceConfigData
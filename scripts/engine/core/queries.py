@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import logging
 from typing import TYPE_CHECKING, Type
 
 from snecs import Query
@@ -20,7 +21,10 @@ from scripts.engine.component import (
 )
 
 if TYPE_CHECKING:
-    pass
+    from typing import Dict, Iterator, List, Tuple
+
+    from snecs import Component
+    from snecs.typedefs import EntityID
 
 __all__ = [
     "tracked",
@@ -35,35 +39,98 @@ __all__ = [
     "position_and_identity_and_aesthetic",
     "position_and_actor",
     "position_and_win_condition",
+    "CachedQuery",
+    "mark_structure_changed",
+    "get_stats",
+    "log_stats",
 ]
 
 
 get_components = Query  # import from snecs to avoid issues with importing from world
 
+# increased whenever an entity is created or deleted or a component added or removed
+_structure_version: int = 0
+_cached_queries: List[CachedQuery] = []
+
+
+class CachedQuery:
+    """
+    A compiled query whose results are held until the structure of the world changes, so iterating it again is only
+    iterating a list. Components are returned as they are, so changes to their values are seen straight away.
+    """
+
+    __slots__ = ("name", "_query", "_results", "_version", "hits", "rebuilds")
+
+    def __init__(self, name: str, components: List[Type[Component]]):
+        self.name = name
+        self._query = get_components(components).compile()
+        self._results: List[Tuple[EntityID, List[Component]]] = []
+        self._version = -1
+        self.hits = 0
+        self.rebuilds = 0
+
+        _cached_queries.append(self)
+
+    def __iter__(self) -> Iterator[Tuple[EntityID, List[Component]]]:
+        if self._version != _structure_version:
+            self._results = list(self._query)
+            self._version = _structure_version
+            self.rebuilds += 1
+        else:
+            self.hits += 1
+
+        return iter(self._results)
+
+
+def mark_structure_changed():
+    """
+    Let the cached queries know they are out of date. Must be called whenever an entity is created or deleted or a
+    component added or removed.
+    """
+    global _structure_version
+    _structure_version += 1
+
+
+def get_stats() -> Dict[str, Tuple[int, int]]:
+    """
+    Get the number of times each query was answered from its held results and the number of times it was rebuilt.
+    """
+    return {query.name: (query.hits, query.rebuilds) for query in _cached_queries}
+
+
+def log_stats():
+    """
+    Log the hits and rebuilds of each query.
+    """
+    for name, (hits, rebuilds) in get_stats().items():
+        logging.info(f"Queries: '{name}' was used {hits + rebuilds} times, rebuilding {rebuilds} times.")
+
 ################### SINGLE QUERIES #######################
 
-tracked = get_components([Tracked]).compile()
+tracked = CachedQuery("tracked", [Tracked])
 
-aesthetic = get_components([Aesthetic]).compile()
+aesthetic = CachedQuery("aesthetic", [Aesthetic])
 
-knowledge = get_components([Knowledge]).compile()
+knowledge = CachedQuery("knowledge", [Knowledge])
 
-affliction = get_components([Afflictions]).compile()
+affliction = CachedQuery("affliction", [Afflictions])
 
-position = get_components([Position]).compile()
+position = CachedQuery("position", [Position])
 
 ################## MULTI QUERIES ##########################
 
-light_source_and_position = get_components([LightSource, Position]).compile()
+light_source_and_position = CachedQuery("light_source_and_position", [LightSource, Position])
 
-position_and_fov_and_combat_stats = get_components([FOV, Position, HasCombatStats]).compile()
+position_and_fov_and_combat_stats = CachedQuery("position_and_fov_and_combat_stats", [FOV, Position, HasCombatStats])
 
-position_and_blocking = get_components([Position, Blocking]).compile()
+position_and_blocking = CachedQuery("position_and_blocking", [Position, Blocking])
 
-position_and_aesthetic = get_components([Position, Aesthetic]).compile()
+position_and_aesthetic = CachedQuery("position_and_aesthetic", [Position, Aesthetic])
 
-position_and_actor = get_components([Position, IsActor]).compile()
+position_and_actor = CachedQuery("position_and_actor", [Position, IsActor])
 
-position_and_win_condition = get_components([Position, WinCondition]).compile()
+position_and_win_condition = CachedQuery("position_and_win_condition", [Position, WinCondition])
 
-position_and_identity_and_aesthetic = get_components([Position, Identity, Aesthetic]).compile()
+position_and_identity_and_aesthetic = CachedQuery(
+    "position_and_identity_and_aesthetic", [Position, Identity, Aesthetic]
+)
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING
+
+import snecs
+from snecs.typedefs import EntityID
+
+from scripts.engine.core.constants import SystemTrigger, SystemTriggerType
+from scripts.engine.core.data import store
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, List, Optional, Set, Tuple, Type
+    from snecs import Component
+
+__all__ = ["scheduler"]
+
+
+class ScheduledSystem:
+    """
+    A system registered with the scheduler, what triggers it and a record of its runs.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[], None],
+        triggers: List[SystemTriggerType],
+        interval: int,
+        components: List[Type[Component]],
+    ):
+        self.name = name
+        self.process = process
+        self.triggers = triggers
+        self.interval = interval
+        self.components = components
+
+        self.runs: int = 0
+        self.total_time: float = 0.0  # in seconds
+
+
+class Scheduler:
+    """
+    Runs systems as turns pass, but only those with a trigger that has happened since the last turn. Moving entities
+    marks their components dirty, as does calling mark_dirty.
+    """
+
+    def __init__(self):
+        self.systems: List[ScheduledSystem] = []
+
+        self._turn: int = 0
+        self._has_moved: bool = False
+        self._has_round_ended: bool = False
+        self._has_sight_changed: bool = False
+        self._dirty_components: Set[Type[Component]] = set()
+        self._watched_components: Set[Type[Component]] = set()
+
+    def register(
+        self,
+        name: str,
+        process: Callable[[], None],
+        triggers: List[SystemTriggerType],
+        interval: int = 1,
+        components: Optional[List[Type[Component]]] = None,
+    ):
+        """
+        Register a system to run when any of its triggers happen. Interval is used by EVERY_N_TURNS and components
+        by DIRTY_COMPONENTS. Systems run in the order registered.
+        """
+        components = components or []
+        self.systems.append(ScheduledSystem(name, process, triggers, max(interval, 1), components))
+        self._watched_components.update(components)
+
+    def mark_dirty(self, component_type: Type[Component]):
+        """
+        Mark a type of component as changed, to trigger the systems that watch it.
+        """
+        self._dirty_components.add(component_type)
+
+    def mark_moved(self, entity: EntityID, coordinates: Optional[List[Tuple[int, int]]] = None):
+        """
+        Note that an entity has moved, marking any of its watched components as dirty.
+        """
+        self._has_moved = True
+
+        if not snecs.exists(entity, snecs.world.default_world):
+            return
+
+        for component_type in self._watched_components:
+            if snecs.has_component(entity, component_type):
+                self._dirty_components.add(component_type)
+
+    def mark_round_end(self):
+        """
+        Note that a round has ended.
+        """
+        self._has_round_ended = True
+
+    def mark_sight_changed(self):
+        """
+        Note that what can be seen has changed without anything moving, e.g. a tile now blocks sight.
+        """
+        self._has_sight_changed = True
+
+    def process_turn(self, is_player_turn: bool):
+        """
+        Run each system that has been triggered since the last turn, then reset the triggers.
+        """
+        self._turn += 1
+
+        for system in self.systems:
+            if self._is_triggered(system, is_player_turn):
+                start_time = time.perf_counter()
+                system.process()
+                system.total_time += time.perf_counter() - start_time
+                system.runs += 1
+
+        self._has_moved = False
+        self._has_round_ended = False
+        self._has_sight_changed = False
+        self._dirty_components.clear()
+
+    def get_stats(self) -> Dict[str, Tuple[int, float]]:
+        """
+        Get the number of runs and total time, in seconds, spent in each system.
+        """
+        return {system.name: (system.runs, system.total_time) for system in self.systems}
+
+    def log_stats(self):
+        """
+        Log the number of runs and time spent in each system.
+        """
+        for name, (runs, total_time) in self.get_stats().items():
+            logging.info(f"Scheduler: '{name}' ran {runs} times, taking {total_time * 1000:.2f}ms.")
+
+    def _is_triggered(self, system: ScheduledSystem, is_player_turn: bool) -> bool:
+        """
+        Check if any of the system's triggers have happened since the last turn.
+        """
+        for trigger in system.triggers:
+            if trigger == SystemTrigger.PLAYER_TURN and is_player_turn:
+                return True
+            elif trigger == SystemTrigger.MOVE and self._has_moved:
+                return True
+            elif trigger == SystemTrigger.ROUND_END and self._has_round_ended:
+                return True
+            elif trigger == SystemTrigger.SIGHT_CHANGE and self._has_sight_changed:
+                return True
+            elif trigger == SystemTrigger.EVERY_N_TURNS and self._turn % system.interval == 0:
+                return True
+            elif trigger == SystemTrigger.DIRTY_COMPONENTS:
+                if any(component in self._dirty_components for component in system.components):
+                    return True
+
+        return False
+
+
+scheduler = Scheduler()
+
+# moving entities dirties their components
+store.spatial_index.add_listener(scheduler.mark_moved)
@@ -1,20 +1,74 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
 import random
+import struct
+import sys
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Dict, Iterator, List, Literal
+from typing import TYPE_CHECKING, Dict, Iterator, List
 
-import tcod
+import numpy as np
+from scipy import ndimage
 
-from scripts.engine import library, utility, world
-from scripts.engine.core.constants import TILE_SIZE, Direction, TileCategory, TileCategoryType
+from scripts.engine import library, world
+from scripts.engine.core.constants import MAP_CACHE_PATH, TILE_SIZE, Direction, TileCategory, TileCategoryType
 from scripts.engine.core.definitions import ActorData, MapData, RoomConceptData
-from scripts.engine.world_objects.tile import Tile
 
 if TYPE_CHECKING:
-    from typing import Optional, Tuple, List
+    from concurrent.futures import Future
+    from typing import Any, Deque, Optional, Tuple, List
+    from scripts.engine.world_objects.game_map import GameMap
+
+__all__ = [
+    "generate",
+    "generate_steps",
+    "generate_map",
+    "start_pregeneration",
+    "pregenerate",
+    "get_generated_map",
+    "stop_pregeneration",
+    "GeneratedMap",
+]
+
+# process pool for generating maps ahead of time, created by start_pregeneration, and the maps being generated for
+# each map name, with their seed and the version of the library data used.
+_executor: Optional[ProcessPoolExecutor] = None
+_pregenerated_maps: Dict[str, Deque[Tuple[Any, int, Future]]] = {}
+
+# layout of a cached map file; a header of marker, format, width and height, followed by the compressed tile
+# categories, one byte each, and the rooms as json. increase the format whenever the layout changes.
+_MAP_CACHE_MARKER = b"NQPM"
+_MAP_CACHE_FORMAT = 1
+_MAP_CACHE_HEADER = struct.Struct("<4sHHH")
+_CACHED_CATEGORIES: List[TileCategoryType] = [
+    getattr(TileCategory, member) for member in TileCategory.__dict__.keys() if member[:2] != "__"
+]
+
+
+def _get_generator_hash() -> str:
+    """
+    Get a hash of this module's source, so cached maps are no longer used once generation changes. Falls back to the
+    cache format if the source cant be read, e.g. when frozen, in which case the format must be increased instead.
+    """
+    try:
+        with open(__file__, "rb") as file:
+            return hashlib.sha1(file.read()).hexdigest()
+    except OSError:
+        return str(_MAP_CACHE_FORMAT)
+
+
+_GENERATOR_HASH = _get_generator_hash()
 
-__all__ = ["generate", "generate_steps"]
+# weights for counting the walls around a tile
+_NEIGHBOUR_KERNEL = np.array([[1, 1, 1], [1, 0, 1], [1, 1, 1]], dtype=np.int8)
+_ADJACENT_KERNEL = np.array([[0, 1, 0], [1, 0, 1], [0, 1, 0]], dtype=np.int8)
 
 
 @dataclass
@@ -26,24 +80,95 @@ class DungeonGenerator:
     rooms_data: Dict[str, RoomConceptData] = field(default_factory=dict)
     actors_data: Dict[str, ActorData] = field(default_factory=dict)
     placed_rooms: List[RoomConcept] = field(default_factory=list)
-    map_of_categories: List[List[TileCategoryType]] = field(default_factory=list)
-    positions_in_rooms: List[Tuple[int, int]] = field(default_factory=list)
+    map_of_categories: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=object))
 
     # parameters/config
     max_generate_room_attempts = 100  # lower number means likely less rooms
-    max_place_room_attempts = 1000  # lower number means likely less rooms
     max_place_entrance_attempts = 50  # lower number means likely less entrances (and poss more ignorant tunnels)
-    max_make_room_accessible_attempts = 100  # lower number means likely more ignorant tunnels
     max_place_entity_attempts = 50  # lower number means likely less entities
     border_size = 4  # tiles to place around the outside of the map
 
-    # info accessed via property but only created once requested
-    _passable_map: List[List[Literal[True]]] = field(default_factory=list)
-    _bools_map: List[List[bool]] = field(default_factory=list)
-    _tiles_map: List[List[Tile]] = field(default_factory=list)
+    # masks over the map, built in __post_init__
+    bounds_mask: np.ndarray = field(init=False)  # True inside the outermost ring of tiles
+    border_mask: np.ndarray = field(init=False)
+    room_mask: np.ndarray = field(init=False)  # rooms and tunnels
+    room_occupancy: np.ndarray = field(init=False)  # placed rooms, including the gap required after them
+    _room_occupancy_table: np.ndarray = field(init=False)  # summed area table of room_occupancy
+
+    # wall counts for every tile, kept up to date as categories are set
+    neighbouring_walls: np.ndarray = field(init=False)
+    adjacent_walls: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        width = self.map_data.width
+        height = self.map_data.height
+        border_size = self.border_size
+
+        self.bounds_mask = np.zeros((width, height), dtype=bool, order="F")
+        self.bounds_mask[1:-1, 1:-1] = True
+
+        self.border_mask = np.ones((width, height), dtype=bool, order="F")
+        self.border_mask[border_size : width - border_size, border_size : height - border_size] = False
+
+        self.reset_map()
+
+    def reset_map(self):
+        """
+        Set every tile to a wall and forget any rooms painted on the map.
+        """
+        shape = (self.map_data.width, self.map_data.height)
+        self.map_of_categories = np.full(shape, TileCategory.WALL, dtype=object, order="F")
+        self.room_mask = np.zeros(shape, dtype=bool, order="F")
+        self.refresh_wall_counts()
+
+        # rooms may start as far in as the border and be as big as the map, so allow for them going past the edge
+        occupancy_shape = (shape[0] + self.border_size + 1, shape[1] + self.border_size + 1)
+        self.room_occupancy = np.zeros(occupancy_shape, dtype=bool, order="F")
+        self._room_occupancy_table = np.zeros((occupancy_shape[0] + 1, occupancy_shape[1] + 1), dtype=np.int32)
+
+    def set_room_occupied(self, room: RoomConcept):
+        """
+        Mark the area of a placed room as occupied, so no other room is placed over it.
+        """
+        # N.B. a room's end is included, in line with RoomConcept.intersects, leaving a gap between rooms
+        self.room_occupancy[room.start_x : room.end_x + 1, room.start_y : room.end_y + 1] = True
+
+        # rebuild the summed area table, where each value is the total of everything above and left of it
+        self._room_occupancy_table[1:, 1:] = self.room_occupancy.cumsum(axis=0).cumsum(axis=1)
+
+    def get_free_room_positions(self, width: int, height: int) -> np.ndarray:
+        """
+        Get a mask of the start positions where a room of the given size would not intersect a placed room. Each
+        position is answered in constant time from the summed area table.
+        """
+        table = self._room_occupancy_table
+        area_width = width + 1
+        area_height = height + 1
+
+        occupied_counts = (
+            table[area_width:, area_height:]
+            - table[:-area_width, area_height:]
+            - table[area_width:, :-area_height]
+            + table[:-area_width, :-area_height]
+        )
+        return occupied_counts == 0
+
+    def refresh_wall_counts(self):
+        """
+        Recount the walls around every tile. Only needed after changing map_of_categories directly, as
+        set_tile_category keeps the counts up to date.
+        """
+        walls = (self.map_of_categories == TileCategory.WALL).astype(np.int8)
+
+        # edges are considered walls; for neighbours only those off the map, for adjacents also the outermost ring
+        self.neighbouring_walls = ndimage.convolve(walls, _NEIGHBOUR_KERNEL, mode="constant", cval=1)
+        self.adjacent_walls = ndimage.convolve(walls | ~self.bounds_mask, _ADJACENT_KERNEL, mode="constant", cval=1)
 
-    # flags
-    is_dirty = False
+    def is_on_map(self, x: int, y: int) -> bool:
+        """
+        Check if a position is anywhere on the map, including the outermost ring of tiles.
+        """
+        return 0 <= x < self.map_data.width and 0 <= y < self.map_data.height
 
     def is_in_bounds(self, x: int, y: int):
         """
@@ -58,10 +183,7 @@ class DungeonGenerator:
         """
         Check if a position is in a placed room.
         """
-        if (x, y) in self.positions_in_rooms:
-            return True
-        else:
-            return False
+        return self.is_on_map(x, y) and bool(self.room_mask[x, y])
 
     def is_only_accessible_diagonally(self, x: int, y: int) -> bool:
         """
@@ -82,153 +204,54 @@ class DungeonGenerator:
         """
         Check if a position is in the border of the map
         """
-        border_size = self.border_size
-        width = self.map_data.width
-        height = self.map_data.height
-
-        # top and bottom
-        for _x in range(0, width):
-            for _y in range(0, border_size):
-                if (_x, _y) == (x, y) or (_x, height - _y - 1) == (x, y):
-                    return True
-
-        # left and right
-        for _x in range(0, border_size):
-            for _y in range(0, height):
-                if (_x, _y) == (x, y) or (width - _x - 1, _y) == (x, y):
-                    return True
-
-        return False
+        return self.is_on_map(x, y) and bool(self.border_mask[x, y])
 
     def count_neighbouring_walls(self, x: int, y: int) -> int:
         """
-        Get the number of walls in 8 directions.
+        Get the number of walls in 8 directions. xy must be on the map.
         """
-        wall_counter = 0
-        width = self.map_data.width
-        height = self.map_data.height
-
-        for neighbor_x in range(x - 1, x + 2):
-            for neighbor_y in range(y - 1, y + 2):
-                # Edges are considered alive. Makes map more likely to appear naturally closed.
-                if neighbor_x < 0 or neighbor_y < 0 or neighbor_y >= height or neighbor_x >= width:
-                    wall_counter += 1
-                elif self.map_of_categories[neighbor_x][neighbor_y] == TileCategory.WALL:
-                    # exclude (x,y) from adjacency check
-                    if (neighbor_x != x) or (neighbor_y != y):
-                        wall_counter += 1
-
-        return wall_counter
+        return int(self.neighbouring_walls[x, y])
 
     def count_adjacent_walls(self, x: int, y: int) -> int:
         """
-        Get the number of walls in 4 directions.
+        Get the number of walls in 4 directions. xy must be on the map.
         """
-        wall_counter = 0
-
-        left = (x - 1, y)
-        right = (x + 1, y)
-        top = (x, y - 1)
-        bot = (x, y + 1)
-
-        for _x, _y in (left, right, top, bot):
-            # count out of bounds as a wall
-            if self.is_in_bounds(_x, _y):
-                if self.map_of_categories[_x][_y] == TileCategory.WALL:
-                    wall_counter += 1
-            else:
-                wall_counter += 1
+        return int(self.adjacent_walls[x, y])
 
-        return wall_counter
-
-    @property
-    def tiles_map(self) -> List[List[Tile]]:
+    def paint_game_map(self, game_map: GameMap):
         """
-        Returns an array of Tiles by converting values from map_of_categories to tiles.
+        Set the tiles of the game map by converting values from map_of_categories to tile types. Tiles in rooms use
+        the room's sprites.
         """
-        generated_level: List[List[Tile]] = []
         map_width = self.map_data.width
         map_height = self.map_data.height
 
-        if self._tiles_map and not self.is_dirty:
-            return self._tiles_map
-
-        # build the full size map and fill with tunnel sprites
-        for x in range(map_width):
-            generated_level.append([])
-            for y in range(map_height):
-                tile = _create_tile_from_category(x, y, self.map_of_categories[x][y], self.map_data.sprite_paths)
-                generated_level[x].append(tile)
+        # fill the full size map with tunnel tiles
+        wall_index, floor_index = _get_tile_type_indices(game_map, self.map_data.sprite_paths)
+        tile_type_map = np.where(self.map_of_categories == TileCategory.WALL, wall_index, floor_index).astype(np.int16)
 
-        # overwrite tunnel sprites with room sprites
+        # overwrite tunnel tiles with room tiles
         for room in self.placed_rooms:
-            sprite_paths = library.ROOMS[room.key].sprite_paths
+            wall_index, floor_index = _get_tile_type_indices(game_map, library.ROOMS[room.key].sprite_paths)
+            room_categories = np.array(room.tile_categories)
+            room_tile_types = np.where(room_categories == TileCategory.WALL, wall_index, floor_index)
+
+            # clip to the map
             start_x = room.start_x
             start_y = room.start_y
-            for x in range(room.width):
-                for y in range(room.height):
-                    target_x = min(start_x + x, map_width - 1)
-                    target_y = min(start_y + y, map_height - 1)
-                    tile = _create_tile_from_category(target_x, target_y, room.tile_categories[x][y], sprite_paths)
-                    generated_level[target_x][target_y] = tile
-
-        # update self
-        self._tiles_map = generated_level
-        self.is_dirty = False
+            width = min(room.width, map_width - start_x)
+            height = min(room.height, map_height - start_y)
+            tile_type_map[start_x : start_x + width, start_y : start_y + height] = room_tile_types[:width, :height]
 
-        return self._tiles_map
+        game_map.set_tile_types(tile_type_map)
 
     @property
-    def bools_map(self) -> List[List[bool]]:
+    def bools_map(self) -> np.ndarray:
         """
         Returns an array of bools by converting values from map_of_categories to bool.
         Floor == True, Wall == False.
         """
-
-        bools_map: List[List[bool]] = []
-        width = self.map_data.width
-        height = self.map_data.height
-
-        if self._bools_map and not self.is_dirty:
-            return self._bools_map
-
-        for x in range(width):
-            bools_map.append([])
-            for y in range(height):
-                if self.map_of_categories[x][y] == TileCategory.FLOOR:
-                    bools_map[x].append(True)
-                else:
-                    bools_map[x].append(False)
-
-        # update self
-        self._bools_map = bools_map
-        self.is_dirty = False
-
-        return self._bools_map
-
-    @property
-    def passable_map(self) -> List[List[Literal[True]]]:
-        """
-        2d array of True, matching map size
-        """
-        passable_map: List[List[Literal[True]]] = []
-        width = self.map_data.width
-        height = self.map_data.height
-
-        # if we have the passable map already created
-        if self._passable_map and not self.is_dirty:
-            return self._passable_map
-
-        for x in range(width):
-            passable_map.append([])
-            for y in range(height):
-                passable_map[x].append(True)
-
-        # update self
-        self._passable_map = passable_map
-        self.is_dirty = False
-
-        return self._passable_map
+        return self.map_of_categories == TileCategory.FLOOR
 
     @property
     def generation_string(self) -> str:
@@ -288,10 +311,28 @@ class DungeonGenerator:
 
     def set_tile_category(self, x: int, y: int, category: TileCategoryType):
         """
-        Set the tile category at xy in map_of_categories. Marks map as dirty
+        Set the tile category at xy in map_of_categories, updating the wall counts of the tiles around it.
         """
-        self.map_of_categories[x][y] = category
-        self.is_dirty = True
+        was_wall = self.map_of_categories[x, y] == TileCategory.WALL
+        is_wall = category == TileCategory.WALL
+        self.map_of_categories[x, y] = category
+
+        if was_wall == is_wall:
+            return
+
+        # clip the area around xy to the map
+        change = 1 if is_wall else -1
+        start_x = max(x - 1, 0)
+        start_y = max(y - 1, 0)
+        end_x = min(x + 2, self.map_data.width)
+        end_y = min(y + 2, self.map_data.height)
+        self.neighbouring_walls[start_x:end_x, start_y:end_y] += change
+        self.neighbouring_walls[x, y] -= change  # a tile isnt its own neighbour
+
+        # tiles on the outermost ring always count as walls to their adjacents
+        if self.bounds_mask[x, y]:
+            for x_dir, y_dir in (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT):
+                self.adjacent_walls[x + x_dir, y + y_dir] += change
 
 
 @dataclass
@@ -403,28 +444,70 @@ class RoomConcept:
         return False
 
 
+@dataclass
+class GeneratedMap:
+    """
+    The layout of a generated map and the actors to place in its rooms. Holds nothing from the world, so it can be
+    passed between processes. The first room is left empty for the player, who is placed when the map is built.
+    """
+
+    map_name: str
+    seed: Any
+    map_of_categories: np.ndarray
+    placed_rooms: List[RoomConcept]
+
+
 ############################ GENERATE MAP ############################
 
 
-def generate(map_name: str, rng: random.Random, player_data: ActorData) -> Tuple[List[List[Tile]], str]:
+def generate(game_map: GameMap, player_data: ActorData, generated_map: Optional[GeneratedMap] = None) -> str:
+    """
+    Generate the map using the game map's details, setting its tiles and creating the entities. A map already
+    generated for the game map's name and seed can be given, to only build it. Returns the generation info.
+    """
+    if generated_map is None:
+        generated_map = generate_map(game_map.name, game_map.seed)
+
+    # create generator holding the generated map
+    dungen = DungeonGenerator(game_map.rng, library.MAPS[game_map.name])
+    dungen.map_of_categories = generated_map.map_of_categories
+    dungen.placed_rooms = generated_map.placed_rooms
+    dungen.refresh_wall_counts()
+
+    # place the player, now we know who they are
+    _place_player(dungen, player_data)
+
+    # set the tiles, then create the generated entities on them
+    dungen.paint_game_map(game_map)
+    dungen.create_entities()
+
+    return dungen.generation_string
+
+
+def generate_map(map_name: str, seed: Any) -> GeneratedMap:
     """
-    Generate the map using the specified details.
+    Generate the layout of a map and choose the actors to place in it, without touching the world. Maps generated
+    before, from the same data, are loaded from the map cache instead.
     """
+    cached_map = _load_cached_map(map_name, seed)
+    if cached_map:
+        return cached_map
+
     # create generator
-    dungen = DungeonGenerator(rng, library.MAPS[map_name])
+    dungen = DungeonGenerator(random.Random(seed), library.MAPS[map_name])
 
     # generate the level
     for _ in _generate_map_in_steps(dungen):
         pass
 
     # generate entities
-    for _ in _generate_entities_in_steps(dungen, player_data):
+    for _ in _generate_entities_in_steps(dungen):
         pass
 
-    # create the generated entities
-    dungen.create_entities()
+    generated_map = GeneratedMap(map_name, seed, dungen.map_of_categories, dungen.placed_rooms)
+    _cache_map(generated_map)
 
-    return dungen.tiles_map, dungen.generation_string
+    return generated_map
 
 
 def generate_steps(map_name: str) -> Iterator:
@@ -447,17 +530,10 @@ def _generate_map_in_steps(dungen: DungeonGenerator) -> Iterator:
     Generate the next step of the map generation.
     """
     rooms_placed = 0
-    placement_attempts = 0
     rooms_generated = 0
 
     # set everything to walls
-    dungen.map_of_categories = []
-    map_width = dungen.map_data.width
-    map_height = dungen.map_data.height
-    for x in range(map_width):
-        dungen.map_of_categories.append([])  # create new list for every col
-        for y in range(map_height):
-            dungen.map_of_categories[x].append(TileCategory.WALL)
+    dungen.reset_map()
 
     yield dungen.map_of_categories
 
@@ -475,30 +551,19 @@ def _generate_map_in_steps(dungen: DungeonGenerator) -> Iterator:
     max_rooms = dungen.rng.randint(dungen.map_data.min_rooms, dungen.map_data.max_rooms)
     max_generate_room_attempts = dungen.max_generate_room_attempts
     while rooms_placed <= max_rooms and rooms_generated <= max_generate_room_attempts:
-        found_place = False
-
         room = _generate_room(dungen, room_names, room_weights)
         rooms_generated += 1
 
         # find place for the room
-        while placement_attempts < dungen.max_place_room_attempts and not found_place:
-            placement_attempts += 1
-            found_place = _place_room(dungen, room)
+        found_place = _place_room(dungen, room)
 
         # if no place found for the room try again
         if not found_place:
             continue
 
-        # doesnt intersect so paint room on map and add room to list
-        for room_x in range(room.width):
-            for room_y in range(room.height):
-                map_x = room.start_x + room_x
-                map_y = room.start_y + room_y
-                in_bounds = dungen.is_in_bounds(map_x, map_y)
-                in_border = dungen.is_in_border(map_x, map_y)
-                if in_bounds and not in_border:
-                    dungen.map_of_categories[map_x][map_y] = room.tile_categories[room_x][room_y]
-                    dungen.positions_in_rooms.append((map_x, map_y))
+        # doesnt intersect so paint room on map, outside of the border, and add room to list
+        _paint_room(dungen, room)
+        dungen.set_room_occupied(room)
 
         # place room
         dungen.placed_rooms.append(room)
@@ -511,16 +576,20 @@ def _generate_map_in_steps(dungen: DungeonGenerator) -> Iterator:
     if rooms_placed == 0:
         raise Exception("No rooms placed on the map.")
 
-    # room placement complete, fill tunnels, without connecting to rooms
-    for x in range(map_width):
-        for y in range(map_height):
-
-            # check is not part of a room
-            if not dungen.is_in_room(x, y):
-                # if its a wall, start a tunnel
-                if dungen.map_of_categories[x][y] == TileCategory.WALL:
-                    if _add_tunnel(dungen, x, y):
-                        yield dungen.map_of_categories
+    # room placement complete, fill tunnels, without connecting to rooms. tunnels only ever turn walls into floors
+    # so anywhere that cant start a tunnel now wont be able to later.
+    can_start_tunnel = (
+        (dungen.map_of_categories == TileCategory.WALL)
+        & ~dungen.room_mask
+        & ~dungen.border_mask
+        & dungen.bounds_mask
+        & (dungen.neighbouring_walls >= 8)
+    )
+    for x, y in np.argwhere(can_start_tunnel).tolist():
+        # check is still not part of a room
+        if not dungen.room_mask[x, y]:
+            if _add_tunnel(dungen, x, y):
+                yield dungen.map_of_categories
 
     # join rooms to tunnels
     for room in dungen.placed_rooms:
@@ -535,51 +604,18 @@ def _generate_map_in_steps(dungen: DungeonGenerator) -> Iterator:
     yield dungen.map_of_categories
 
 
-def _generate_entities_in_steps(dungen: DungeonGenerator, player_data: Optional[ActorData] = None) -> Iterator:
+def _generate_entities_in_steps(dungen: DungeonGenerator) -> Iterator:
     """
-    Add entities to all rooms using the room data. Also places player.
+    Add entities to all rooms using the room data. The first room, after shuffling, is left empty for the player.
     """
     # randomise order of rooms
     rooms = dungen.placed_rooms
     dungen.rng.shuffle(rooms)
 
-    # we might not have player data if we are viewing generations
-    if player_data:
-        # put player in first room
-        player_room = rooms[0]
-        placed = False
-        placement_attempts = 0
-        while placement_attempts <= 1000 and not placed:
-            xy = _find_place_for_actor(dungen, player_room, player_data)
-            placement_attempts += 1
-
-            if xy:
-                x, y = xy
-
-                # add player data to list so we can use it when creating the entities
-                dungen.actors_data["player"] = player_data
-
-                # log actor in room
-                player_room.actors["player"] = (x, y)
-                dungen.set_tile_category(x, y, TileCategory.PLAYER)
-
-                placed = True
-
-        # just in case player hasnt been placed
-        if not placed:
-            raise Exception("Dungen: Unable to place player.")
-
     yield dungen.map_of_categories
 
-    # work through all rooms and populate
-    skipped_player_room = False
-    for room in rooms:
-
-        # make sure to skip player room as that is handled differently
-        if not skipped_player_room:
-            skipped_player_room = True
-            continue
-
+    # work through all rooms and populate, skipping the player room as that is handled when the map is built
+    for room in rooms[1:]:
         room_key = room.key
         room_data = dungen.get_room_data(room_key)
 
@@ -615,6 +651,258 @@ def _generate_entities_in_steps(dungen: DungeonGenerator, player_data: Optional[
                 yield dungen.map_of_categories
 
 
+def _place_player(dungen: DungeonGenerator, player_data: ActorData):
+    """
+    Place the player in the first room.
+    """
+    player_room = dungen.placed_rooms[0]
+    placed = False
+    placement_attempts = 0
+    while placement_attempts <= 1000 and not placed:
+        xy = _find_place_for_actor(dungen, player_room, player_data)
+        placement_attempts += 1
+
+        if xy:
+            x, y = xy
+
+            # add player data to list so we can use it when creating the entities
+            dungen.actors_data["player"] = player_data
+
+            # log actor in room
+            player_room.actors["player"] = (x, y)
+            dungen.set_tile_category(x, y, TileCategory.PLAYER)
+
+            placed = True
+
+    # just in case player hasnt been placed
+    if not placed:
+        raise Exception("Dungen: Unable to place player.")
+
+
+############################ PREGENERATION ############################
+
+
+def start_pregeneration():
+    """
+    Start the workers that generate maps ahead of time, if the config allows any. Off by default, and only supported
+    on linux, as the workers are forked after pygame has started.
+    """
+    global _executor
+
+    # workers must be forked, as starting a new interpreter would import the ui and open another window. forking once
+    # SDL is running crashes on macos and isnt available on windows, so anywhere else maps are generated when needed.
+    workers = library.GAME_CONFIG.performance.map_generation_workers
+    if _executor or workers <= 0 or not sys.platform.startswith("linux"):
+        return
+
+    # forked workers are all started on the first submission, so submit one now rather than when a map is wanted
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+    _executor.submit(int)
+
+
+def pregenerate(map_name: str, seed: Any):
+    """
+    Start generating a map in the background, ready for get_generated_map to be called with the same name and seed.
+    Does nothing if start_pregeneration hasnt started any workers or the map is already being generated. If too many
+    maps are held for the map name the oldest are dropped.
+    """
+    executor = _executor
+    maps_held_ready = library.GAME_CONFIG.performance.maps_held_ready
+    if executor is None or maps_held_ready <= 0:
+        return
+
+    pending = _pregenerated_maps.setdefault(map_name, deque())
+    for _seed, data_version, _ in pending:
+        if _seed == seed and data_version == library.DATA_VERSION:
+            return
+
+    # make room for the new map, cancelling the oldest as they are least likely to still be wanted
+    while len(pending) >= maps_held_ready:
+        _, _, future = pending.popleft()
+        future.cancel()
+
+    pending.append((seed, library.DATA_VERSION, executor.submit(generate_map, map_name, seed)))
+
+
+def get_generated_map(map_name: str, seed: Any) -> GeneratedMap:
+    """
+    Get the generated map for the name and seed. Uses a pregenerated map, waiting for it to finish if needed, if
+    there is one for the seed and the library data hasnt changed since, otherwise generates the map now.
+    """
+    pending = _pregenerated_maps.get(map_name, deque())
+    for item in list(pending):
+        _seed, data_version, future = item
+        if _seed != seed:
+            continue
+
+        pending.remove(item)
+        if data_version != library.DATA_VERSION:
+            future.cancel()
+            continue
+
+        try:
+            return future.result()
+        except Exception as e:
+            logging.warning(f"Dungen: Pregenerating {map_name} ({seed}) failed with '{e}'. Generating it again.")
+            break
+
+    return generate_map(map_name, seed)
+
+
+def stop_pregeneration():
+    """
+    Cancel any maps still waiting to be generated and close the workers.
+    """
+    global _executor
+
+    for pending in _pregenerated_maps.values():
+        for _, _, future in pending:
+            future.cancel()
+    _pregenerated_maps.clear()
+
+    if _executor:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+############################ MAP CACHE ############################
+
+
+def _get_cached_map_path(map_name: str, seed: Any) -> str:
+    """
+    Get the path of the cached map for the name and seed. The path changes whenever the map's data, the data of the
+    rooms and actors it can hold, the generator or the tile categories change.
+    """
+    map_data = library.MAPS[map_name]
+    rooms_data = [library.ROOMS[room_name] for room_name in sorted(map_data.rooms)]
+    actors_data = [library.ACTORS[actor_key] for room_data in rooms_data for actor_key in sorted(room_data.actors)]
+    key = repr(
+        (map_name, seed, _MAP_CACHE_FORMAT, _GENERATOR_HASH, _CACHED_CATEGORIES, map_data, rooms_data, actors_data)
+    )
+
+    return str(MAP_CACHE_PATH / f"{map_name}_{hashlib.sha1(key.encode()).hexdigest()}.map")
+
+
+def _cache_map(generated_map: GeneratedMap):
+    """
+    Write the generated map to the map cache, then remove the least recently used maps until the cache fits in its
+    size.
+    """
+    if library.GAME_CONFIG.performance.map_cache_size <= 0:
+        return
+
+    # encode each category as its position in the list of categories
+    width, height = generated_map.map_of_categories.shape
+    category_indices = np.zeros((width, height), dtype=np.uint8)
+    for index, category in enumerate(_CACHED_CATEGORIES):
+        category_indices[generated_map.map_of_categories == category] = index
+
+    rooms = [
+        {
+            "tile_categories": room.tile_categories,
+            "design": room.design,
+            "key": room.key,
+            "start_x": room.start_x,
+            "start_y": room.start_y,
+            "actors": room.actors,
+        }
+        for room in generated_map.placed_rooms
+    ]
+    body = category_indices.tobytes(order="F") + json.dumps(rooms).encode()
+    header = _MAP_CACHE_HEADER.pack(_MAP_CACHE_MARKER, _MAP_CACHE_FORMAT, width, height)
+
+    # write to a temporary file first, so a map being written is never read
+    path = _get_cached_map_path(generated_map.map_name, generated_map.seed)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(MAP_CACHE_PATH, exist_ok=True)
+        with open(temp_path, "wb") as file:
+            file.write(header + zlib.compress(body))
+        os.replace(temp_path, path)
+    except OSError as e:
+        logging.warning(f"Dungen: Unable to cache {generated_map.map_name} ({generated_map.seed}); '{e}'.")
+        return
+
+    _evict_cached_maps()
+
+
+def _load_cached_map(map_name: str, seed: Any) -> Optional[GeneratedMap]:
+    """
+    Load the generated map for the name and seed from the map cache. Returns None if it isnt cached.
+    """
+    if library.GAME_CONFIG.performance.map_cache_size <= 0:
+        return None
+
+    path = _get_cached_map_path(map_name, seed)
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    try:
+        marker, cache_format, width, height = _MAP_CACHE_HEADER.unpack_from(data)
+        if marker != _MAP_CACHE_MARKER or cache_format != _MAP_CACHE_FORMAT:
+            raise ValueError("unrecognised format")
+
+        body = zlib.decompress(data[_MAP_CACHE_HEADER.size :])
+        category_indices = np.frombuffer(body, dtype=np.uint8, count=width * height).reshape((width, height), order="F")
+        map_of_categories = np.array(_CACHED_CATEGORIES, dtype=object)[category_indices]
+
+        placed_rooms = []
+        for room in json.loads(body[width * height :].decode()):
+            actors = {actor_key: (pos[0], pos[1]) for actor_key, pos in room["actors"].items()}
+            placed_rooms.append(
+                RoomConcept(
+                    room["tile_categories"], room["design"], room["key"], room["start_x"], room["start_y"], actors
+                )
+            )
+
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError, struct.error, zlib.error) as e:
+        logging.warning(f"Dungen: Cached map for {map_name} ({seed}) couldnt be read; '{e}'. Generating it again.")
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    # mark as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+    return GeneratedMap(map_name, seed, np.asfortranarray(map_of_categories), placed_rooms)
+
+
+def _evict_cached_maps():
+    """
+    Remove the least recently used maps from the map cache until it fits in its size.
+    """
+    max_size = library.GAME_CONFIG.performance.map_cache_size * 1024  # kilobytes to bytes
+
+    cached_maps = []
+    for entry in os.scandir(MAP_CACHE_PATH):
+        if entry.name.endswith(".map"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # removed by another process
+            cached_maps.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in cached_maps)
+    cached_maps.sort()
+    for _, size, path in cached_maps:
+        if total_size <= max_size:
+            break
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_size -= size
+
+
 ############################ ROOMS ############################
 
 
@@ -662,32 +950,51 @@ def _generate_room_square(dungen: DungeonGenerator, room_data: RoomConceptData)
 
 def _place_room(dungen: DungeonGenerator, room: RoomConcept) -> bool:
     """
-    Place room in random location. Updates room start_x and start_y. Returns True if valid placement found.
+    Place room in a random location that doesnt intersect any placed room. Updates room start_x and start_y. Returns
+    True if valid placement found.
     """
-    intersects = False
     map_width = dungen.map_data.width
     map_height = dungen.map_data.height
     border_size = dungen.border_size
 
-    # pick random location to place room, not including borders
-    room.start_x = dungen.rng.randint(border_size, max(border_size, map_width - room.width - border_size - 1))
-    room.start_y = dungen.rng.randint(border_size, max(border_size, map_height - room.height - border_size - 1))
+    # find every free location to place room, not including borders
+    max_x = max(border_size, map_width - room.width - border_size - 1)
+    max_y = max(border_size, map_height - room.height - border_size - 1)
+    free_positions = dungen.get_free_room_positions(room.width, room.height)
+    candidates = np.argwhere(free_positions[border_size : max_x + 1, border_size : max_y + 1])
 
-    # if placed there does room overlap any existing rooms?
-    for _room in dungen.placed_rooms:
-        if room.intersects(_room):
-            intersects = True
-            break
-
-    if not intersects:
-        return True
-    else:
+    if not len(candidates):
         return False
 
+    # pick one at random
+    x, y = candidates[dungen.rng.randrange(len(candidates))]
+    room.start_x = border_size + int(x)
+    room.start_y = border_size + int(y)
+
+    return True
+
 
 ####################### MAP AMENDMENTS ##############################
 
 
+def _paint_room(dungen: DungeonGenerator, room: RoomConcept):
+    """
+    Copy the room's tile categories on to the map, clipped to the map and skipping anything in the border.
+    """
+    start_x = room.start_x
+    start_y = room.start_y
+    end_x = min(room.end_x, dungen.map_data.width)
+    end_y = min(room.end_y, dungen.map_data.height)
+    window = (slice(start_x, end_x), slice(start_y, end_y))
+
+    room_categories = np.array(room.tile_categories, dtype=object)[: end_x - start_x, : end_y - start_y]
+    to_paint = dungen.bounds_mask[window] & ~dungen.border_mask[window]
+
+    dungen.map_of_categories[window][to_paint] = room_categories[to_paint]
+    dungen.room_mask[window] |= to_paint
+    dungen.refresh_wall_counts()
+
+
 def _add_tunnel(dungen: DungeonGenerator, x: int, y: int) -> bool:
     """
     Follow a path from origin (xy) setting relevant position in map_of_categories to TileCategory.FLOOR. Uses flood
@@ -714,7 +1021,7 @@ def _add_tunnel(dungen: DungeonGenerator, x: int, y: int) -> bool:
 
         # convert to floor
         dungen.set_tile_category(_x, _y, TileCategory.FLOOR)
-        dungen.positions_in_rooms.append((_x, _y))
+        dungen.room_mask[_x, _y] = True
         added_tunnel = True
 
         # check for appropriate, adjacent wall tiles
@@ -731,7 +1038,7 @@ def _add_tunnel(dungen: DungeonGenerator, x: int, y: int) -> bool:
             # must also not be adjacent to a room - i.e. can connect to a tunnel but not a room.
             # N.B. the lower the num walls the more overlapping and joined up the tunnels are
             if in_bounds and not in_room and not in_border and num_walls >= 3:
-                if dungen.map_of_categories[x_check][y_check] == TileCategory.WALL and not dungen.is_in_room(
+                if dungen.map_of_categories[x_check, y_check] == TileCategory.WALL and not dungen.is_in_room(
                     _x + (x_dir * 2), _y + (y_dir * 2)
                 ):
                     possible_directions.append((x_dir, y_dir))
@@ -758,21 +1065,21 @@ def _add_tunnel(dungen: DungeonGenerator, x: int, y: int) -> bool:
 
 def _add_ignorant_tunnel(dungen: DungeonGenerator, start_x: int, start_y: int, end_x: int, end_y: int):
     """
-    Create a tunnel between two points, ignoring all terrain on the way
+    Create a tunnel between two points, ignoring all terrain on the way. Goes across from the start then up or down
+    to the end. Returns the positions that were turned into floor.
     """
-    x = min(start_x, end_x)
-    y = min(start_y, end_y)
-    max_x = max(start_x, end_x) - 1
-    max_y = max(start_y, end_y) - 1
-
-    while x < max_x:
-        if dungen.is_in_bounds(x, y):
+    carved = []
+    x_step = 1 if end_x >= start_x else -1
+    y_step = 1 if end_y >= start_y else -1
+    positions = [(x, start_y) for x in range(start_x, end_x + x_step, x_step)]
+    positions += [(end_x, y) for y in range(start_y + y_step, end_y + y_step, y_step)]
+
+    for x, y in positions:
+        if dungen.is_in_bounds(x, y) and dungen.map_of_categories[x, y] != TileCategory.FLOOR:
             dungen.set_tile_category(x, y, TileCategory.FLOOR)
-        x += 1
-    while y < max_y:
-        if dungen.is_in_bounds(x, y):
-            dungen.set_tile_category(x, y, TileCategory.FLOOR)
-        y += 1
+            carved.append((x, y))
+
+    return carved
 
 
 def _add_entrances(dungen: DungeonGenerator, room: RoomConcept):
@@ -827,7 +1134,7 @@ def _add_entrances(dungen: DungeonGenerator, room: RoomConcept):
             in_bounds = dungen.is_in_bounds(x, y)
             in_border = dungen.is_in_border(x, y)
             if in_bounds and not in_border:
-                if dungen.map_of_categories[x][y] == TileCategory.FLOOR:
+                if dungen.map_of_categories[x, y] == TileCategory.FLOOR:
                     pos2_is_floor = True
 
             # if target is wall and one after is floor and not already a placed entrance
@@ -850,10 +1157,9 @@ def _remove_deadends(dungen: DungeonGenerator):
     deadends = set()
 
     # find initial deadends
-    for x in range(0, dungen.map_data.width):
-        for y in range(0, dungen.map_data.height):
-            if dungen.map_of_categories[x][y] == TileCategory.FLOOR and dungen.count_adjacent_walls(x, y) >= 3:
-                deadends.add((x, y))
+    is_deadend = (dungen.map_of_categories == TileCategory.FLOOR) & (dungen.adjacent_walls >= 3)
+    for x, y in np.argwhere(is_deadend).tolist():
+        deadends.add((x, y))
 
     while deadends:
         _x, _y = deadends.pop()
@@ -877,7 +1183,7 @@ def _remove_deadends(dungen: DungeonGenerator):
 
             in_bounds = dungen.is_in_bounds(x_check, y_check)
             if in_bounds:
-                tile_cat = dungen.map_of_categories[x_check][y_check]
+                tile_cat = dungen.map_of_categories[x_check, y_check]
                 num_walls = dungen.count_adjacent_walls(x_check, y_check)
 
                 if num_walls >= 3 and tile_cat == TileCategory.FLOOR:
@@ -886,112 +1192,74 @@ def _remove_deadends(dungen: DungeonGenerator):
 
 def _make_rooms_accessible(dungen: DungeonGenerator):
     """
-    Pick a room as the anchor and make sure all other floor tiles can connect to it via pathfinding.
+    Make sure every room can be reached from every other. The floor is split into its separate regions and the
+    regions holding rooms are joined by the shortest set of tunnels that connects them all.
     """
-    connections: Dict[str, List[str]] = {}  # room, connected rooms
-    inaccessible_rooms = dungen.placed_rooms.copy()
-
-    # start by picking one room that all other rooms should connect to
-    anchor_room = dungen.rng.choice(dungen.placed_rooms)
-
-    # pick spot in room as anchor and make sure it is open
-    anchor_x = anchor_room.centre_x
-    anchor_y = anchor_room.centre_y
-    dungen.set_tile_category(anchor_x, anchor_y, TileCategory.FLOOR)
+    # make sure the centre of each room is open, so it can stand for the room
+    for room in dungen.placed_rooms:
+        dungen.set_tile_category(room.centre_x, room.centre_y, TileCategory.FLOOR)
 
-    # loop all rooms until they can all get to the anchor room
-    while inaccessible_rooms:
-        room = inaccessible_rooms.pop()
+    # label each separate region of floor, only moving cardinally
+    labels, _ = ndimage.label(dungen.bools_map)
+    regions: Dict[int, int] = {}  # label, label of the region it has been joined to
 
-        # dont check anchor room
-        if room == anchor_room:
+    # use the first room in each region to stand for the region
+    representatives: Dict[int, Tuple[int, int]] = {}
+    for room in dungen.placed_rooms:
+        label = int(labels[room.centre_x, room.centre_y])
+        if label not in representatives:
+            representatives[label] = (room.centre_x, room.centre_y)
+            regions[label] = label
+
+    # consider the possible tunnels shortest first, to get the minimum spanning tree
+    possible_tunnels = []
+    representative_labels = list(representatives)
+    for i, label in enumerate(representative_labels):
+        x, y = representatives[label]
+        for other_label in representative_labels[i + 1 :]:
+            other_x, other_y = representatives[other_label]
+            distance = abs(x - other_x) + abs(y - other_y)
+            possible_tunnels.append((distance, label, other_label))
+    possible_tunnels.sort()
+
+    for _, label, other_label in possible_tunnels:
+        # skip if already joined, either by an earlier tunnel or one passing through
+        if _find_region(regions, label) == _find_region(regions, other_label):
             continue
 
-        room_x = room.centre_x
-        room_y = room.centre_y
-
-        # ensure the centre of the room is open
-        dungen.set_tile_category(room_x, room_y, TileCategory.FLOOR)
-
-        # check if route is possible between anchor and target
-        pathfinder = tcod.path.Dijkstra(dungen.bools_map, 0)
-        pathfinder.set_goal(room_x, room_y)
-        path = pathfinder.get_path(anchor_x, anchor_y)
-
-        # if no possible route, make one
-        if not path:
-            # get ignore list i.e. connected rooms
-            ignore_list = []
-            for _room_id, connected_rooms_ids in connections.items():
-                if _room_id == room.id:
-                    # if the key matches then add all of the values in the list
-                    ignore_list.extend(connected_rooms_ids)
-                elif room.id in connected_rooms_ids:
-                    # if id in the value list then add the key
-                    ignore_list.append(_room_id)
-
-            # get nearest room and tunnel to that or the anchor
-            nearest_room = _get_nearest_room(dungen, room, ignore_list)
-            if nearest_room:
-                _add_ignorant_tunnel(dungen, room_x, room_y, nearest_room.centre_x, nearest_room.centre_y)
-
-                # log the connection
-                if room.id in connections:
-                    connections[room.id].append(nearest_room.id)
-                else:
-                    connections[room.id] = [nearest_room.id]
-
-                # add back to list to check can now reach anchor
-                inaccessible_rooms.append(room)
+        start_x, start_y = representatives[label]
+        end_x, end_y = representatives[other_label]
+        carved = _add_ignorant_tunnel(dungen, start_x, start_y, end_x, end_y)
 
-            else:
-                _add_ignorant_tunnel(dungen, room_x, room_y, anchor_room.centre_x, anchor_room.centre_y)
-
-        else:
-            # we have a path so log the connection to the anchor room
-            if anchor_room.id in connections:
-                connections[anchor_room.id].append(room.id)
-            else:
-                connections[anchor_room.id] = [room.id]
+        # update the labels, joining any regions the tunnel touches to the region it started from
+        for x, y in carved:
+            labels[x, y] = label
+            for x_dir, y_dir in (Direction.UP, Direction.DOWN, Direction.LEFT, Direction.RIGHT):
+                touched_label = int(labels[x + x_dir, y + y_dir])
+                if touched_label:
+                    _join_regions(regions, label, touched_label)
 
 
-def _get_nearest_room(
-    dungen: DungeonGenerator, base_room: RoomConcept, id_ignore_list: List[str]
-) -> Optional[RoomConcept]:
+def _find_region(regions: Dict[int, int], label: int) -> int:
     """
-    Starting from xy find the directly nearest room. Treats all tiles as floors.
+    Get the label of the region that the labelled region has been joined to. Regions not held are only joined to
+    themselves.
     """
-    nearest_room = None
-    shortest_path_length = 0
-    base_x = base_room.centre_x
-    base_y = base_room.centre_y
-
-    # create pathfinder
-    pathfinder = tcod.path.Dijkstra(dungen.passable_map, 0)
-    pathfinder.set_goal(base_x, base_y)
+    while regions.get(label, label) != label:
+        # point at the grandparent as we go, to keep later lookups short
+        regions[label] = regions.get(regions[label], regions[label])
+        label = regions[label]
+    return label
 
-    # check each room to see which is closest
-    for room in dungen.placed_rooms:
-        # check ignore list
-        if room.id in id_ignore_list or room.id == base_room.id:
-            continue
-
-        # create new path
-        path = pathfinder.get_path(room.centre_x, room.centre_y)
-        path_length = len(path)
-
-        # if we havent got any room yet set values
-        if not nearest_room:
-            nearest_room = room
-            shortest_path_length = path_length
-            continue
 
-        # check length
-        if path_length < shortest_path_length:
-            shortest_path_length = path_length
-            nearest_room = room
-
-    return nearest_room
+def _join_regions(regions: Dict[int, int], label: int, other_label: int):
+    """
+    Join two labelled regions of floor.
+    """
+    root = _find_region(regions, label)
+    other_root = _find_region(regions, other_label)
+    if root != other_root:
+        regions[other_root] = root
 
 
 ####################### ENTITIES ##############################
@@ -1032,7 +1300,7 @@ def _find_place_for_actor(
         offset_y = y + pos[1]
 
         # only need to check tile category as that capture entity placement too
-        if dungen.map_of_categories[offset_x][offset_y] == TileCategory.FLOOR:
+        if dungen.map_of_categories[offset_x, offset_y] == TileCategory.FLOOR:
             blocked = False
         else:
             blocked = True
@@ -1047,22 +1315,11 @@ def _find_place_for_actor(
 ####################### HELPER FUNCTIONS ##############################
 
 
-def _create_tile_from_category(x: int, y: int, tile_category: TileCategoryType, sprite_paths: Dict[str, str]) -> Tile:
+def _get_tile_type_indices(game_map: GameMap, sprite_paths: Dict[str, str]) -> Tuple[int, int]:
     """
-    Convert a tile category into the relevant tile. If it isnt a wall it is floor by default.
+    Get the indices of the wall and floor tile types for the sprite paths given. Anything that isnt a wall is
+    considered a floor.
     """
-    if tile_category == TileCategory.WALL:
-        sprite_path = sprite_paths[TileCategory.WALL]
-        sprite = utility.get_image(sprite_path)
-        blocks_sight = True
-        blocks_movement = True
-    else:
-        # everything else is considered a floor:
-        sprite_path = sprite_paths[TileCategory.FLOOR]
-        sprite = utility.get_image(sprite_path)
-        blocks_sight = False
-        blocks_movement = False
-
-    tile = Tile(x, y, sprite, sprite_path, blocks_sight, blocks_movement)
-
-    return tile
+    wall_index = game_map.get_tile_type_index(sprite_paths[TileCategory.WALL], blocks_sight=True, blocks_movement=True)
+    floor_index = game_map.get_tile_type_index(sprite_paths[TileCategory.FLOOR])
+    return wall_index, floor_index
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import logging
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING
 
+import numpy as np
 from snecs.typedefs import EntityID
 
 from scripts.engine import utility, world
@@ -19,7 +20,9 @@ from scripts.engine.core.constants import (
 )
 
 if TYPE_CHECKING:
-    from typing import Optional, List
+    from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+    from scripts.engine.world_objects.combat_stats import CombatStats
 
 
 class Effect(ABC):
@@ -27,6 +30,9 @@ class Effect(ABC):
     A collection of parameters and instructions to apply a change to an entity's or tile's state.
     """
 
+    # many effects are created per use of an action, so keep them small and quick to create
+    __slots__ = ("origin", "success_effects", "failure_effects", "potency")
+
     def __init__(
         self, origin: EntityID, success_effects: List[Effect], failure_effects: List[Effect], potency: float = 1.0
     ):
@@ -42,11 +48,60 @@ class Effect(ABC):
         """
         pass
 
-    def _create_affliction_trigger(self, trigger_type, target):
-        return TriggerAfflictionsEffect(self.origin, target, trigger_type, [], [])
+    def _create_affliction_triggers(self, trigger_type: AfflictionTriggerType, target: EntityID) -> List[Effect]:
+        """
+        Create the effect to trigger the target's afflictions, if any of them are triggered by the trigger type.
+        """
+        afflictions = world.get_entitys_component(target, Afflictions)
+        if afflictions and afflictions.has_trigger(trigger_type):
+            return [TriggerAfflictionsEffect(self.origin, target, trigger_type, [], [])]
+        return []
+
+
+class EffectTemplate:
+    """
+    An unchanging description of an effect and the effects that follow it. Compiled once per action and built into
+    effects for each use, binding the origin, target and potency. The effect type must take a target.
+    """
+
+    __slots__ = ("effect_type", "params", "potency_params", "success_templates", "failure_templates")
+
+    def __init__(
+        self,
+        effect_type: Type[Effect],
+        params: Dict[str, Any],
+        potency_params: Iterable[str] = (),
+        success_templates: Iterable[EffectTemplate] = (),
+        failure_templates: Iterable[EffectTemplate] = (),
+    ):
+        self.effect_type = effect_type
+        self.params: Tuple[Tuple[str, Any], ...] = tuple(params.items())
+        self.potency_params: Tuple[str, ...] = tuple(potency_params)  # int params multiplied by the potency
+        self.success_templates: Tuple[EffectTemplate, ...] = tuple(success_templates)
+        self.failure_templates: Tuple[EffectTemplate, ...] = tuple(failure_templates)
+
+    def build(self, origin: EntityID, target: EntityID, potency: float = 1.0, **bound: Any) -> Effect:
+        """
+        Build the effect, and those that follow it, for a single use. Bound values are given to every effect built
+        that has a param of the same name, e.g. a direction.
+        """
+        params = dict(self.params)
+        for name in bound.keys() & params.keys():
+            params[name] = bound[name]
+        for name in self.potency_params:
+            params[name] = int(params[name] * potency)
+
+        success_effects = [template.build(origin, target, potency, **bound) for template in self.success_templates]
+        failure_effects = [template.build(origin, target, potency, **bound) for template in self.failure_templates]
+
+        return self.effect_type(  # type: ignore
+            origin=origin, target=target, success_effects=success_effects, failure_effects=failure_effects, **params
+        )
 
 
 class DamageEffect(Effect):
+    __slots__ = ("target", "stat_to_target", "accuracy", "damage", "damage_type", "mod_stat", "mod_amount")
+
     def __init__(
         self,
         origin: EntityID,
@@ -71,39 +126,91 @@ class DamageEffect(Effect):
         self.damage_type = damage_type
         self.mod_amount = mod_amount
         self.mod_stat = mod_stat
-        self.success_triggers = [self._create_affliction_trigger(AfflictionTrigger.TAKE_DAMAGE, self.target)]
 
     def evaluate(self) -> List[Effect]:
         """
         Resolve the damage effect and return the conditional effects based on if the damage is greater than 0.
         """
-        logging.debug("Evaluating Damage Effect...")
-        defenders_stats = world.create_combat_stats(self.target)
-        attackers_stats = world.create_combat_stats(self.origin)
+        return DamageEffect.evaluate_batch([self])[0]
 
-        # get hit type
-        stat_to_target_value = getattr(defenders_stats, self.stat_to_target.lower())
-        to_hit_score = world.calculate_to_hit_score(attackers_stats.accuracy, self.accuracy, stat_to_target_value)
-        hit_type = world.get_hit_type(to_hit_score)
+    def can_batch(self) -> bool:
+        """
+        Check if the effect can be resolved in a batch with others without changing the outcome, i.e. nothing follows
+        from it that could change how the next target is hit.
+        """
+        if self.success_effects or self.failure_effects:
+            return False
 
-        # calculate damage
-        resist_value = getattr(defenders_stats, "resist_" + self.damage_type.lower())
-        mod_value = getattr(attackers_stats, self.mod_stat.lower())
-        damage = world.calculate_damage(self.damage, mod_value, resist_value, hit_type)
+        if not world.entity_has_component(self.target, Afflictions):
+            return True
+        afflictions = world.get_entitys_component(self.target, Afflictions)
+        return not afflictions.has_trigger(AfflictionTrigger.TAKE_DAMAGE)
+
+    @staticmethod
+    def evaluate_batch(damage_effects: List[DamageEffect]) -> List[List[Effect]]:
+        """
+        Resolve many damage effects together, e.g. every target of an area of effect, and return the conditional
+        effects of each. Each entity's stats are got once and the to hit scores and damage worked out for all
+        targets at once, then the damage is applied in the order given, followed by any deaths. Only effects that
+        can_batch should be given together, as nothing that follows from one is resolved before the next.
+        """
+        logging.debug(f"Evaluating {len(damage_effects)} Damage Effect(s)...")
+
+        # get the stats needed for each attack
+        stats: Dict[EntityID, CombatStats] = {}
+        attacker_accuracies = []
+        mod_values = []
+        stat_to_target_values = []
+        resist_values = []
+        for effect in damage_effects:
+            for entity in (effect.origin, effect.target):
+                if entity not in stats:
+                    stats[entity] = world.create_combat_stats(entity)
+            attackers_stats = stats[effect.origin]
+            defenders_stats = stats[effect.target]
+
+            attacker_accuracies.append(attackers_stats.accuracy)
+            mod_values.append(getattr(attackers_stats, effect.mod_stat.lower()))
+            stat_to_target_values.append(getattr(defenders_stats, effect.stat_to_target.lower()))
+            resist_values.append(getattr(defenders_stats, "resist_" + effect.damage_type.lower()))
+
+        # work out the damage for every attack at once
+        to_hit_scores = world.calculate_to_hit_scores(
+            np.array(attacker_accuracies, dtype=np.int64),
+            np.array([effect.accuracy for effect in damage_effects], dtype=np.int64),
+            np.array(stat_to_target_values, dtype=np.int64),
+        )
+        damages = world.calculate_damages(
+            np.array([effect.damage for effect in damage_effects], dtype=np.int64),
+            np.array(mod_values, dtype=np.int64),
+            np.array(resist_values, dtype=np.int64),
+            to_hit_scores,
+        )
+
+        # apply the damage, then kill any that didnt survive it
+        resulting_effects: List[List[Effect]] = []
+        killed: List[EntityID] = []
+        for effect, damage in zip(damage_effects, damages.tolist()):
+            if world.apply_damage(effect.target, damage):
+                defenders_resources = world.get_entitys_component(effect.target, Resources)
+                if defenders_resources:
+                    if damage >= defenders_resources.health and effect.target not in killed:
+                        killed.append(effect.target)
+
+                triggers = effect._create_affliction_triggers(AfflictionTrigger.TAKE_DAMAGE, effect.target)
+                resulting_effects.append(effect.success_effects + triggers)
+            else:
+                resulting_effects.append(list(effect.failure_effects))
 
-        # apply the damage
-        if world.apply_damage(self.target, damage):
-            defenders_resources = world.get_entitys_component(self.target, Resources)
-            if defenders_resources:
-                if damage >= defenders_resources.health:
-                    world.kill_entity(self.target)
+        for entity in killed:
+            world.kill_entity(entity)
 
-            return self.success_effects + self.success_triggers
-        else:
-            return self.failure_effects
+        return resulting_effects
 
 
 class MoveActorEffect(Effect):
+    __slots__ = ("target", "direction", "move_amount")
+
     def __init__(
         self,
         origin: EntityID,
@@ -119,7 +226,6 @@ class MoveActorEffect(Effect):
         self.target = target
         self.direction = direction
         self.move_amount = move_amount
-        self.success_triggers = [self._create_affliction_trigger(AfflictionTrigger.MOVEMENT, self.target)]
 
     def evaluate(self) -> List[Effect]:
         """
@@ -158,7 +264,7 @@ class MoveActorEffect(Effect):
                     aesthetic.current_sprite = aesthetic.sprites.move
 
         if success:
-            return self.success_effects + self.success_triggers
+            return self.success_effects + self._create_affliction_triggers(AfflictionTrigger.MOVEMENT, self.target)
         else:
             return self.failure_effects
 
@@ -200,13 +306,12 @@ class MoveActorEffect(Effect):
 
             # check if entity blocking tile
             elif is_entity_on_tile and target_tile:
-                from scripts.engine.core import queries
+                for blocking_entity in world.get_entities_on_tile(target_tile):
+                    if blocking_entity == entity or not world.entity_has_component(blocking_entity, Blocking):
+                        continue
 
-                for blocking_entity, (position, blocking) in queries.position_and_blocking:
-                    # cast for typing
-                    position = cast(Position, position)
-                    blocking = cast(Blocking, blocking)
-                    if blocking_entity != entity and blocking.blocks_movement and (target_x, target_y) in position:
+                    blocking = world.get_entitys_component(blocking_entity, Blocking)
+                    if blocking.blocks_movement:
                         # blocked by entity
                         blockers_name = world.get_name(blocking_entity)
                         logging.debug(
@@ -220,6 +325,8 @@ class MoveActorEffect(Effect):
 
 
 class TriggerAfflictionsEffect(Effect):
+    __slots__ = ("target", "trigger_type")
+
     def __init__(
         self,
         origin: EntityID,
@@ -243,10 +350,9 @@ class TriggerAfflictionsEffect(Effect):
         success = False
 
         if afflictions:
-            # iterate over each affliction and trigger it if necessary
-            for affliction in afflictions.active:
-                if self.trigger_type in affliction.triggers:
-                    success = world.apply_affliction(affliction)
+            # trigger each affliction listening for the trigger type
+            for affliction in afflictions.get_triggered(self.trigger_type):
+                success = world.apply_affliction(affliction)
 
         if success:
             return self.success_effects
@@ -254,6 +360,8 @@ class TriggerAfflictionsEffect(Effect):
 
 
 class AffectStatEffect(Effect):
+    __slots__ = ("target", "cause_name", "stat_to_target", "affect_amount")
+
     def __init__(
         self,
         origin: EntityID,
@@ -284,6 +392,7 @@ class AffectStatEffect(Effect):
             # if not already applied
             if self.cause_name not in afflictions.stat_modifiers:
                 afflictions.stat_modifiers[self.cause_name] = (self.stat_to_target, self.affect_amount)
+                world.clear_stat_cache(self.target)
                 success = True
 
         if success:
@@ -293,6 +402,8 @@ class AffectStatEffect(Effect):
 
 
 class ApplyAfflictionEffect(Effect):
+    __slots__ = ("target", "affliction_name", "duration")
+
     def __init__(
         self,
         origin: EntityID,
@@ -325,6 +436,8 @@ class ApplyAfflictionEffect(Effect):
 
 
 class ReduceSkillCooldownEffect(Effect):
+    __slots__ = ("target", "skill_name", "amount")
+
     def __init__(
         self,
         origin: EntityID,
@@ -361,6 +474,8 @@ class ReduceSkillCooldownEffect(Effect):
 
 
 class AddAspectEffect(Effect):
+    __slots__ = ()
+
     def __init__(
         self, origin: EntityID, success_effects: List[Effect], failure_effects: List[Effect],
     ):
@@ -377,6 +492,8 @@ class AddAspectEffect(Effect):
 
 
 class RemoveAspectEffect(Effect):
+    __slots__ = ()
+
     def __init__(
         self, origin: EntityID, success_effects: List[Effect], failure_effects: List[Effect],
     ):
@@ -393,6 +510,8 @@ class RemoveAspectEffect(Effect):
 
 
 class TriggerSkillEffect(Effect):
+    __slots__ = ()
+
     def __init__(
         self, origin: EntityID, success_effects: List[Effect], failure_effects: List[Effect],
     ):
@@ -409,6 +528,8 @@ class TriggerSkillEffect(Effect):
 
 
 class KillEffect(Effect):
+    __slots__ = ()
+
     def __init__(
         self, origin: EntityID, success_effects: List[Effect], failure_effects: List[Effect],
     ):
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import itertools
 import json
 import logging
 import os
@@ -8,7 +9,7 @@ from typing import TYPE_CHECKING
 
 import pygame
 
-from scripts.engine.core.constants import DATA_PATH, InputIntent
+from scripts.engine.core.constants import DATA_PATH, InputIntent, PrimaryStat
 from scripts.engine.core.definitions import (
     ActorData,
     AfflictionData,
@@ -23,6 +24,7 @@ from scripts.engine.core.definitions import (
     HitInfoData,
     HitTypeData,
     MapData,
+    PerformanceConfigData,
     RoomConceptData,
     SkillData,
     TraitData,
@@ -31,7 +33,7 @@ from scripts.engine.core.definitions import (
 from scripts.engine.core.extend_json import deserialise_dataclasses
 
 if TYPE_CHECKING:
-    from typing import Dict, Any, List, Union
+    from typing import Dict, Any, Iterable, List, Tuple, Union
 
 
 __all__ = [
@@ -48,7 +50,10 @@ __all__ = [
     "INPUT_CONFIG",
     "VIDEO_CONFIG",
     "GAME_CONFIG",
+    "DATA_VERSION",
+    "TRAIT_STAT_TOTALS",
     "refresh_library",
+    "get_trait_stat_totals",
 ]
 
 
@@ -70,8 +75,15 @@ GAME_CONFIG: GameConfigData = GameConfigData(
     HitTypeData(HitInfoData(0, 0.0), HitInfoData(0, 0.0), HitInfoData(0, 0.0)),
     BaseValueData(0, 0, 0),
     DefaultValueData(0, True, 0.0),
+    PerformanceConfigData(1, False, 0.0, 0, 0, 0, 0),
 )  # load empty object
 
+# incremented each time the library is refreshed
+DATA_VERSION: int = 0
+
+# the primary stats given by each combination of traits, keyed by the sorted trait names. built when traits are loaded.
+TRAIT_STAT_TOTALS: Dict[Tuple[str, ...], Dict[str, int]] = {}
+
 # build default list for input - needed in case json doesnt include all required values
 for member in InputIntent.__dict__.keys():
     if member[:2] != "__":
@@ -102,12 +114,36 @@ def refresh_library():
         _load_video_config()
         _load_game_config()
 
+    # let anything worked out from the old data know it is out of date
+    global DATA_VERSION
+    DATA_VERSION += 1
+
     logging.info(f"Library data refreshed...")
 
     end_time = time.time()
     logging.debug(f"-> loaded data in {format(end_time - start_time, '.5f')}")
 
 
+####################### GET ##############################
+
+
+def get_trait_stat_totals(trait_names: Iterable[str]) -> Dict[str, int]:
+    """
+    Get the total of each primary stat given by the traits. Combinations not seen before, such as two traits from
+    the same group, are summed and added to the table.
+    """
+    key = tuple(sorted(trait_names))
+    if key not in TRAIT_STAT_TOTALS:
+        totals = {}
+        for member in PrimaryStat.__dict__.keys():
+            if member[:2] != "__":
+                stat = getattr(PrimaryStat, member)
+                totals[stat] = sum(getattr(TRAITS[name], stat) for name in key)
+        TRAIT_STAT_TOTALS[key] = totals
+
+    return TRAIT_STAT_TOTALS[key]
+
+
 ####################### LOAD ##############################
 
 
@@ -132,6 +168,25 @@ def _load_traits_data():
     global TRAITS
     TRAITS = data
 
+    _build_trait_stat_totals()
+
+
+def _build_trait_stat_totals():
+    """
+    Sum the primary stats of every combination of up to one trait from each trait group.
+    """
+    global TRAIT_STAT_TOTALS
+    TRAIT_STAT_TOTALS = {}
+
+    groups: Dict[str, List[str]] = {}
+    for name, trait in TRAITS.items():
+        groups.setdefault(trait.group, []).append(name)
+
+    # None for having no trait from that group
+    options = [[None] + names for names in groups.values()]
+    for combination in itertools.product(*options):
+        get_trait_stat_totals([name for name in combination if name is not None])
+
 
 def _load_base_stat_primary_data():
     with open(str(DATA_PATH / "game/base_stats_primary.json")) as file:
@@ -9,6 +9,7 @@ from typing import TYPE_CHECKING
 from scripts.engine import library, utility, world
 from scripts.engine.core.constants import MAX_SAVES, SAVE_PATH, VERSION, GameState, GameStateType
 from scripts.engine.core.data import store
+from scripts.engine.systems import activation
 
 if TYPE_CHECKING:
     pass
@@ -97,6 +98,10 @@ def save_game():
     if not os.path.isdir(full_save_path):
         os.makedirs(full_save_path)
 
+    # wake anything asleep, catching it up, as sleep isnt saved and everything is awake on load
+    for entity in list(store.sleeping_entities):
+        activation.wake(entity)
+
     # add data to dict
     save["version"] = VERSION
     save["world"] = world.serialise()
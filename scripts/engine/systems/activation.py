@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import logging
+
+import snecs
+from snecs.typedefs import EntityID
+
+from scripts.engine import chronicle, library, world
+from scripts.engine.component import Afflictions, Knowledge, Position, Tracked
+from scripts.engine.core.constants import INFINITE
+from scripts.engine.core.data import store
+
+__all__ = ["process_activation", "is_asleep", "sleep", "wake"]
+
+
+def process_activation():
+    """
+    Put entities further than the sleep distance from the player to sleep and wake those that are within it. Sleeping
+    entities are taken out of the turn queue and skipped at the end of each round, then caught up when woken.
+    """
+    sleep_distance = library.GAME_CONFIG.performance.sleep_distance
+    if sleep_distance <= 0:
+        return
+
+    player = world.get_player()
+    player_pos = world.get_entitys_component(player, Position)
+    turn_holder = chronicle.get_turn_holder()
+
+    # put the far away entities to sleep
+    for entity in list(chronicle.get_turn_queue()):
+        if entity in (player, turn_holder) or not world.entity_has_component(entity, Position):
+            continue
+
+        if _get_distance(player_pos, world.get_entitys_component(entity, Position)) > sleep_distance:
+            sleep(entity)
+
+    # wake those close enough, only checking the area around the player. an entity is in the area if any of its tiles
+    # are, matching the distance used to put it to sleep.
+    if store.sleeping_entities:
+        start_pos = (player_pos.x - sleep_distance, player_pos.y - sleep_distance)
+        size = (sleep_distance * 2) + 1
+        for entity in world.get_entities_in_rect(start_pos, size, size):
+            if entity in store.sleeping_entities:
+                wake(entity)
+
+
+def is_asleep(entity: EntityID) -> bool:
+    """
+    Check if the entity is asleep.
+    """
+    return entity in store.sleeping_entities
+
+
+def sleep(entity: EntityID):
+    """
+    Put an entity to sleep, taking it out of the turn queue.
+    """
+    store.sleeping_entities[entity] = chronicle.get_round()
+    chronicle.remove_from_turn_queue(entity)
+
+    logging.debug(f"'{world.get_name(entity)}' is now asleep.")
+
+
+def wake(entity: EntityID):
+    """
+    Wake a sleeping entity, catching up on the rounds it slept through in one step and putting it back in the turn
+    queue to act from now.
+    """
+    round_slept = store.sleeping_entities.pop(entity)
+    if not snecs.exists(entity, snecs.world.default_world):
+        return
+
+    # catch up on the end of each round missed
+    rounds_asleep = chronicle.get_round() - round_slept
+    if rounds_asleep > 0:
+        _catch_up_rounds(entity, rounds_asleep)
+
+    # rejoin the queue no earlier than now
+    tracked = world.get_entitys_component(entity, Tracked)
+    tracked.time_spent = max(tracked.time_spent, chronicle.get_time_of_last_turn())
+    chronicle.add_to_turn_queue(entity, tracked.time_spent)
+
+    logging.debug(f"'{world.get_name(entity)}' woke after {rounds_asleep} rounds.")
+
+
+def _catch_up_rounds(entity: EntityID, rounds: int):
+    """
+    Apply the end of round changes for the number of rounds given, as chronicle.next_round would have.
+    """
+    # skill cooldowns
+    if world.entity_has_component(entity, Knowledge):
+        knowledge = world.get_entitys_component(entity, Knowledge)
+        for skill_name in knowledge.skill_names:
+            skill_cooldown = knowledge.cooldowns[skill_name]
+            if skill_cooldown > 0:
+                knowledge.set_skill_cooldown(skill_name, max(skill_cooldown - rounds, 0))
+
+    # affliction durations. an affliction is removed in the round after its duration reaches 0.
+    if world.entity_has_component(entity, Afflictions):
+        afflictions = world.get_entitys_component(entity, Afflictions)
+        for affliction in list(afflictions.active):
+            if affliction.duration == INFINITE:
+                continue
+
+            if rounds > affliction.duration:
+                world.remove_affliction(entity, affliction)
+            else:
+                affliction.duration -= rounds
+
+
+def _get_distance(pos: Position, other_pos: Position) -> int:
+    """
+    Get the number of tiles, moving diagonally as needed, from the reference position of the first position to the
+    nearest tile of the other.
+    """
+    x, y = pos.x, pos.y
+    return min(max(abs(x - other_x), abs(y - other_y)) for other_x, other_y in other_pos.coordinates)
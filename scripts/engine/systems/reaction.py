@@ -3,8 +3,7 @@ from __future__ import annotations
 import pygame
 
 from scripts.engine import world
-from scripts.engine.component import Position
-from scripts.engine.core import queries
+from scripts.engine.component import Position, WinCondition
 from scripts.engine.core.constants import GameEvent
 
 __all__ = ["process_win_condition"]
@@ -18,7 +17,11 @@ def process_win_condition():
     player = world.get_player()
     player_pos = world.get_entitys_component(player, Position)
 
-    for entity, (position, _) in queries.position_and_win_condition:
+    for entity in world.get_entities_with_flag(WinCondition):
+        if not world.entity_has_component(entity, Position):
+            continue
+
+        position = world.get_entitys_component(entity, Position)
         if player_pos.x == position.x and player_pos.y == position.y:
             event = pygame.event.Event(GameEvent.WIN_CONDITION_MET)
             pygame.event.post(event)
@@ -1,23 +1,33 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import TYPE_CHECKING
 
+import numpy as np
 import tcod
 
-from scripts.engine import world
+from scripts.engine import library, world
 from scripts.engine.component import FOV, LightSource, Position
 from scripts.engine.core import queries
 from scripts.engine.core.constants import FOV_ALGORITHM, FOV_LIGHT_WALLS, MAX_ACTIVATION_DISTANCE
 
 if TYPE_CHECKING:
-    pass
+    from concurrent.futures import Future
+    from typing import List, Optional, Tuple
+    from snecs.typedefs import EntityID
 
 __all__ = ["process_light_map", "process_fov", "process_tile_visibility"]
 
+# thread pool for fov and light calculations, created when first needed. tcod releases the GIL while calculating.
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_workers: int = 0
+
 
 def process_light_map():
     """
-    Update light map using light sources of all entities
+    Update light map using light sources of all entities within MAX_ACTIVATION_DISTANCE of player. Only light
+    sources that have moved, changed radius or had the transparency change in range are recalculated.
     """
     # get player details
     player = world.get_player()
@@ -25,13 +35,8 @@ def process_light_map():
 
     # get game map details
     game_map = world.get_game_map()
-    light_map = game_map.light_map
-
-    # create transparency layer
-    transparency = world.create_fov_map()
-
-    # reset light map
-    light_map[:] = False
+    active_sources = set()
+    out_of_date: List[Tuple[EntityID, Tuple[int, int], int]] = []
 
     for entity, (light_source, pos) in queries.light_source_and_position:
         light_source: LightSource
@@ -42,22 +47,49 @@ def process_light_map():
         offset_x = player_pos.x - pos.x
         offset_y = player_pos.y - pos.y
         if max(abs(offset_x), abs(offset_y)) < MAX_ACTIVATION_DISTANCE:
+            active_sources.add(entity)
+
+            if not game_map.is_lit_area_current(entity, (pos.x, pos.y), radius):
+                out_of_date.append((entity, (pos.x, pos.y), radius))
+
+    # create fov for each out of date light source, using the map's transparency layer, which includes blocking
+    # entities
+    transparency = game_map.transparency_map
+
+    def _compute_light(source: Tuple[EntityID, Tuple[int, int], int]) -> np.ndarray:
+        _, centre, radius = source
+        return _compute_fov(transparency, game_map.get_window(centre, radius), centre, radius)
 
-            # create fov for light source
-            fov = tcod.map.compute_fov(transparency, (pos.x, pos.y), radius, FOV_LIGHT_WALLS, FOV_ALGORITHM)
-            light_map |= fov
+    executor = _get_executor()
+    if executor:
+        fovs = executor.map(_compute_light, out_of_date)
+    else:
+        fovs = map(_compute_light, out_of_date)
+    for (entity, centre, radius), fov in zip(out_of_date, fovs):
+        game_map.set_lit_area(entity, centre, radius, fov)
+
+    # remove light from sources that are no longer active, or no longer exist
+    for entity in game_map.get_lighting_entities():
+        if entity not in active_sources:
+            game_map.remove_lit_area(entity)
 
 
 def process_fov():
     """
-    Update FOV for all entities within MAX_ACTIVATION_DISTANCE of player.
+    Mark the FOV of entities within MAX_ACTIVATION_DISTANCE of player as out of date, if they have moved, their sight
+    range has changed or the transparency has changed within their sight range. Out of date FOV is recalculated the
+    next time it is read.
     """
     # get player details
     player = world.get_player()
     player_pos: Position = world.get_entitys_component(player, Position)
 
-    # create transparency layer
-    transparency = world.create_fov_map()
+    # when using threads, calculate straight away from a copy of the transparency, so it cant change under them
+    game_map = world.get_game_map()
+    executor = _get_executor()
+    if executor:
+        transparency = game_map.transparency_map.copy(order="F")
+        transparency_version = game_map.transparency_version
 
     for entity, (fov, pos, stats) in queries.position_and_fov_and_combat_stats:
 
@@ -69,7 +101,95 @@ def process_fov():
             stats = world.create_combat_stats(entity)
             sight_range = stats.sight_range
 
-            fov.map = tcod.map.compute_fov(transparency, (pos.x, pos.y), sight_range, FOV_LIGHT_WALLS, FOV_ALGORITHM)
+            if _is_fov_current(fov, pos, sight_range):
+                continue
+
+            if executor:
+                window = game_map.get_window((pos.x, pos.y), sight_range)
+                future = executor.submit(_compute_fov, transparency, window, (pos.x, pos.y), sight_range)
+                calculated_with = (pos.x, pos.y, sight_range, transparency_version)
+                fov.pending_update = partial(_receive_fov, fov, future, calculated_with)
+            else:
+                fov.pending_update = partial(_calculate_fov, fov, pos, sight_range)
+
+
+def _is_fov_current(fov: FOV, pos: Position, sight_range: int) -> bool:
+    """
+    Check if the fov was calculated from the same position and sight range, with nothing in range changing since.
+    """
+    if fov.calculated_with is None:
+        return False
+
+    x, y, radius, transparency_version = fov.calculated_with
+    if (x, y, radius) != (pos.x, pos.y, sight_range):
+        return False
+
+    game_map = world.get_game_map()
+    return not game_map.has_transparency_changed(transparency_version, (x, y), radius)
+
+
+def _calculate_fov(fov: FOV, pos: Position, sight_range: int):
+    """
+    Calculate the fov from the current position, noting what it was calculated with.
+    """
+    game_map = world.get_game_map()
+    x, y = pos.x, pos.y
+
+    # use the map's transparency layer, which includes blocking entities
+    window = game_map.get_window((x, y), sight_range)
+    fov_window = _compute_fov(game_map.transparency_map, window, (x, y), sight_range)
+    fov.set_window(_get_window_start(window), fov_window, (game_map.width, game_map.height))
+    fov.calculated_with = (x, y, sight_range, game_map.transparency_version)
+
+
+def _receive_fov(fov: FOV, future: Future, calculated_with: Tuple[int, int, int, int]):
+    """
+    Wait for the fov being calculated by the thread pool, noting what it was calculated with.
+    """
+    game_map = world.get_game_map()
+    x, y, sight_range, _ = calculated_with
+    window = game_map.get_window((x, y), sight_range)
+    fov.set_window(_get_window_start(window), future.result(), (game_map.width, game_map.height))
+    fov.calculated_with = calculated_with
+
+
+def _compute_fov(
+    transparency: np.ndarray, window: Tuple[slice, slice], centre: Tuple[int, int], radius: int
+) -> np.ndarray:
+    """
+    Compute the fov from the centre, only looking at the window of the map that is in range. Returns the fov for the
+    window. Safe to call from other threads, as long as the transparency isnt changed.
+    """
+    start_x, start_y = _get_window_start(window)
+    window_centre = (centre[0] - start_x, centre[1] - start_y)
+    return tcod.map.compute_fov(transparency[window], window_centre, radius, FOV_LIGHT_WALLS, FOV_ALGORITHM)
+
+
+def _get_window_start(window: Tuple[slice, slice]) -> Tuple[int, int]:
+    """
+    Get the top left of the window on the map.
+    """
+    return window[0].start or 0, window[1].start or 0
+
+
+def _get_executor() -> Optional[ThreadPoolExecutor]:
+    """
+    Get the thread pool to calculate fov and light with, or None if they should be calculated one at a time. The
+    pool is rebuilt if the number of workers in the config changes.
+    """
+    global _executor, _executor_workers
+
+    workers = library.GAME_CONFIG.performance.vision_workers
+    if workers <= 1:
+        return None
+
+    if _executor is None or _executor_workers != workers:
+        if _executor:
+            _executor.shutdown(wait=False)
+        _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vision")
+        _executor_workers = workers
+
+    return _executor
 
 
 def process_tile_visibility():
@@ -78,24 +198,10 @@ def process_tile_visibility():
     """
     # get player info
     player = world.get_player()
-    fov_map = world.get_entitys_component(player, FOV).map
+    fov: FOV = world.get_entitys_component(player, FOV)
 
-    # get game map details
+    # combine maps, setting every tile at once. only the tiles in the fov window can be visible.
     game_map = world.get_game_map()
-    width = game_map.width
-    height = game_map.height
-    light_map = game_map.light_map
-    tile_map = game_map.tile_map
-
-    # set all tiles to not visible
-    for x in range(0, width):
-        for y in range(0, height):
-            game_map.tile_map[x][y].is_visible = False
-
-    # combine maps
-    visible_map = fov_map & light_map
-
-    # loop all map
-    for x in range(0, width):
-        for y in range(0, height):
-            tile_map[x][y].is_visible = bool(visible_map[x, y])  # cast to bool as it is numpy _bool
+    window = fov.window_slices
+    game_map.visibility_map[:] = False
+    game_map.visibility_map[window] = fov.window & game_map.light_map[window]
@@ -12,7 +12,7 @@ from pygame_gui.core import UIContainer
 from pygame_gui.elements import UIButton, UIImage, UIPanel
 
 from scripts.engine import utility, world
-from scripts.engine.component import Aesthetic, Position
+from scripts.engine.component import Aesthetic
 from scripts.engine.core.constants import TILE_SIZE, DirectionType, InputEvent, RenderLayer, UIElement
 from scripts.engine.utility import clamp, convert_tile_string_to_xy
 from scripts.engine.world_objects.tile import Tile
@@ -148,14 +148,11 @@ class Camera(UIPanel):
             elif event.user_type == pygame_gui.UI_BUTTON_ON_HOVERED:
                 updated_tile_info = False
                 from scripts.engine.ui.manager import ui
-                from scripts.engine.core import queries
-
-                for entity, (position,) in queries.position:
-                    position: Position
-                    if (x, y) in position:
-                        ui.set_selected_tile_pos((x, y))
-                        ui.set_element_visibility(UIElement.TILE_INFO, True)
-                        updated_tile_info = True
+
+                if world.get_entities_on_position((x, y)):
+                    ui.set_selected_tile_pos((x, y))
+                    ui.set_element_visibility(UIElement.TILE_INFO, True)
+                    updated_tile_info = True
                 # entity not found at location so hide
                 if not updated_tile_info:
                     if ui.element_is_visible(UIElement.TILE_INFO):
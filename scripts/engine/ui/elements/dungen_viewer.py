@@ -56,7 +56,7 @@ class DungenViewer(UIPanel):
             self.timer += time_delta
             if self.timer > self.sleep_per_room:
                 self.map = next(self.iterator, None)  # type: ignore
-                if self.map:
+                if self.map is not None:
                     self._update_view()
                 self.timer = 0
 
@@ -4,6 +4,7 @@ import dataclasses
 import logging
 from typing import TYPE_CHECKING, Dict, List, Tuple
 
+import numpy as np
 import pygame
 
 from scripts.engine.core.constants import (
@@ -32,6 +33,8 @@ __all__ = [
     "get_euclidean_distance",
     "get_chebyshev_distance",
     "get_coords_from_shape",
+    "get_shape_template",
+    "ShapeTemplate",
     "is_close",
     "value_to_member",
     "convert_tile_string_to_xy",
@@ -274,10 +277,58 @@ def is_close(current_pos: Tuple[float, float], target_pos: Tuple[float, float],
 ################################### SHAPES  ########################################
 
 
+class ShapeTemplate:
+    """
+    The tiles covered by a shape, relative to its centre. Held as a list of coordinates, an array of offsets and a
+    mask [x, y] with the centre at (radius, radius). Templates are shared, so must not be changed.
+    """
+
+    __slots__ = ("coordinates", "offsets", "mask", "radius")
+
+    def __init__(self, coordinates: List[Tuple[int, int]]):
+        self.coordinates: Tuple[Tuple[int, int], ...] = tuple(coordinates)
+        self.offsets: np.ndarray = np.array(coordinates, dtype=np.int32).reshape(-1, 2)
+        self.radius: int = int(np.abs(self.offsets).max()) if coordinates else 0
+
+        diameter = (self.radius * 2) + 1
+        self.mask: np.ndarray = np.zeros((diameter, diameter), dtype=bool, order="F")
+        self.mask[self.offsets[:, 0] + self.radius, self.offsets[:, 1] + self.radius] = True
+
+        self.offsets.flags.writeable = False
+        self.mask.flags.writeable = False
+
+
+# (shape, size, direction) to the shape's template. direction is None for shapes that dont use it.
+_shape_templates: Dict[Tuple[ShapeType, int, Optional[Tuple[int, int]]], ShapeTemplate] = {}
+
+
+def get_shape_template(shape: ShapeType, size: int, direction: Optional[Tuple[int, int]] = None) -> ShapeTemplate:
+    """
+    Get the template of a shape, size and direction. Each is only calculated the first time it is needed.
+    """
+    if shape != Shape.CONE:
+        direction = None
+    elif direction is not None:
+        direction = (direction[0], direction[1])
+
+    key = (shape, size, direction)
+    if key not in _shape_templates:
+        _shape_templates[key] = ShapeTemplate(_calculate_shape(shape, size, direction))
+
+    return _shape_templates[key]
+
+
 def get_coords_from_shape(shape: ShapeType, size: int, direction: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
     """
     Get a list of coordinates from a shape, size and direction.
     """
+    return list(get_shape_template(shape, size, direction).coordinates)
+
+
+def _calculate_shape(shape: ShapeType, size: int, direction: Optional[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Calculate the coordinates of a shape, size and direction.
+    """
     if shape == Shape.TARGET:
         return [(0, 0)]  # single target, centred on selection
 
@@ -28,6 +28,7 @@ from scripts.engine.component import (
     Resources,
     Tracked,
     Traits,
+    WinCondition,
 )
 from scripts.engine.core.constants import (
     INFINITE,
@@ -48,8 +49,10 @@ from scripts.engine.core.constants import (
     TravelMethod,
     TravelMethodType,
 )
+from scripts.engine.core import queries
 from scripts.engine.core.data import store
 from scripts.engine.core.definitions import ActorData, ProjectileData
+from scripts.engine.core.scheduler import scheduler
 from scripts.engine.thought import ProjectileBehaviour, SkipTurnBehaviour
 from scripts.engine.ui.manager import ui
 from scripts.engine.utility import build_sprites_from_paths
@@ -58,8 +61,9 @@ from scripts.engine.world_objects.game_map import GameMap
 from scripts.engine.world_objects.tile import Tile
 
 if TYPE_CHECKING:
-    from typing import Optional, Tuple, List
+    from typing import Dict, Optional, Tuple, List
     from scripts.engine.action import Affliction, Skill
+    from scripts.engine.effect import Effect
 
 ########################### LOCAL DEFINITIONS ##########################
 
@@ -69,7 +73,9 @@ get_components = Query
 entity_has_component = snecs.has_component
 serialise = snecs.serialize_world
 deserialise = snecs.deserialize_world
-move_world = snecs.ecs.move_world
+
+# flag components whose entities are indexed, so they can be found without a query
+_indexed_flags: Tuple[Type[Component], ...] = (IsPlayer, IsGod, WinCondition)
 
 
 ################################ CREATE - INIT OBJECT - RETURN NEW OBJECT ###############################
@@ -86,6 +92,16 @@ def create_entity(components: List[Component] = None) -> EntityID:
 
     # create the entity
     entity = new_entity(_components)
+    queries.mark_structure_changed()
+
+    # track where it is, when it acts and what it is flagged as
+    for component in _components:
+        if isinstance(component, Position):
+            _register_position(entity, component)
+        elif isinstance(component, Tracked):
+            chronicle.add_to_turn_queue(entity, component.time_spent)
+        elif isinstance(component, _indexed_flags):
+            _index_flag(entity, component)
 
     return entity
 
@@ -132,7 +148,7 @@ def create_actor(actor_data: ActorData, spawn_pos: Tuple[int, int], is_player: b
     components.append(HasCombatStats())
     components.append(Blocking(True, library.GAME_CONFIG.default_values.entity_blocks_sight))
     components.append(Traits(actor_data.trait_names))
-    components.append(FOV(create_fov_map()))
+    components.append(FOV(is_packed=library.GAME_CONFIG.performance.pack_fov))
     components.append(LightSource(2))
     components.append(Tracked(chronicle.get_time()))
 
@@ -243,16 +259,6 @@ def create_affliction(name: str, creator: EntityID, target: EntityID, duration:
     return affliction
 
 
-def create_fov_map() -> np.array:
-    """
-    Create a blank fov map
-    """
-    game_map = get_game_map()
-    return np.array(
-        [[not tile.blocks_sight for tile in column] for column in game_map.tile_map], dtype=bool, order="F",
-    )
-
-
 def create_combat_stats(entity: EntityID) -> CombatStats:
     """
     Create and return a stat object  for an entity.
@@ -283,11 +289,7 @@ def get_tile(tile_pos: Tuple[int, int]) -> Tile:
     x = tile_pos[0]
     y = tile_pos[1]
 
-    try:
-        _tile = game_map.tile_map[x][y]
-
-    except IndexError:
-        raise Exception(f"Tried to get tile({x},{y}), which doesnt exist.")
+    _tile = Tile(game_map, x, y)
 
     if _is_tile_in_bounds(_tile):
         return _tile
@@ -301,7 +303,6 @@ def get_tiles(start_pos: Tuple[int, int], coords: List[Tuple[int, int]]) -> List
     position given.
     """
     start_x, start_y = start_pos
-    game_map = get_game_map()
     tiles = []
 
     for coord in coords:
@@ -312,7 +313,7 @@ def get_tiles(start_pos: Tuple[int, int], coords: List[Tuple[int, int]]) -> List
         tile = get_tile((x, y))
         if tile:
             if _is_tile_in_bounds(tile):
-                tiles.append(game_map.tile_map[x][y])
+                tiles.append(tile)
 
     return tiles
 
@@ -561,11 +562,20 @@ def get_player() -> EntityID:
     """
     Get the player.
     """
-    for entity, (flag,) in get_components([IsPlayer]):
-        return entity
+    players = store.flagged_entities.get(IsPlayer)
+    if players:
+        return next(iter(players))
     raise ValueError
 
 
+def get_entities_with_flag(flag: Type[Component]) -> List[EntityID]:
+    """
+    Get the entities with a flag component, in the order they were given it. Only flags in _indexed_flags, such as
+    IsGod, are held.
+    """
+    return list(store.flagged_entities.get(flag, ()))
+
+
 def get_entitys_component(entity: EntityID, component: Type[_C]) -> _C:
     """
     Get an entity's component. Will raise exception if entity does not have the component.  Use entity_has_component
@@ -593,9 +603,13 @@ def get_name(entity: EntityID) -> str:
 
 def get_primary_stat(entity: EntityID, primary_stat: PrimaryStatType) -> int:
     """
-    Get an entity's primary stat.
+    Get an entity's primary stat. Cached until the entity's traits or stat modifiers change.
     """
     stat = primary_stat
+    stats = _get_cached_stats(entity)
+    if stat in stats:
+        return stats[stat]
+
     value = 0
 
     stat_data = library.BASE_STATS_PRIMARY[stat]
@@ -603,9 +617,7 @@ def get_primary_stat(entity: EntityID, primary_stat: PrimaryStatType) -> int:
 
     trait = get_entitys_component(entity, Traits)
     if trait:
-        for name in trait.names:
-            data = library.TRAITS[name]
-            value += getattr(data, stat)
+        value += library.get_trait_stat_totals(trait.names)[stat]
 
     afflictions = get_entitys_component(entity, Afflictions)
     if afflictions:
@@ -616,15 +628,20 @@ def get_primary_stat(entity: EntityID, primary_stat: PrimaryStatType) -> int:
     # ensure no dodgy numbers, like floats or negative
     value = max(1, int(value))
 
+    stats[stat] = value
     return value
 
 
 def get_secondary_stat(entity: EntityID, secondary_stat: SecondaryStatType) -> int:
     """
-    Get an entity's secondary stat.
+    Get an entity's secondary stat. Cached until the entity's traits or stat modifiers change.
     """
     # FIXME - this doesnt work for sight range
     stat = secondary_stat
+    stats = _get_cached_stats(entity)
+    if stat in stats:
+        return stats[stat]
+
     value = 0
 
     # base values
@@ -648,9 +665,21 @@ def get_secondary_stat(entity: EntityID, secondary_stat: SecondaryStatType) -> i
     # ensure no dodgy numbers, like floats or negative
     value = max(1, int(value))
 
+    stats[stat] = value
     return value
 
 
+def _get_cached_stats(entity: EntityID) -> Dict[str, int]:
+    """
+    Get the stats worked out so far for an entity. All cached stats are dropped if the library has been refreshed.
+    """
+    if store.stat_cache_data_version != library.DATA_VERSION:
+        store.stat_cache.clear()
+        store.stat_cache_data_version = library.DATA_VERSION
+
+    return store.stat_cache.setdefault(entity, {})
+
+
 def get_known_skill(entity: EntityID, skill_name: str) -> Type[Skill]:
     """
     Get an entity's known skill from their Knowledge component.
@@ -674,23 +703,70 @@ def get_affected_entities(
     have Position, Resources to be eligible.
     """
     affected_entities = []
-    affected_positions = []
-    target_x = target_pos[0]
-    target_y = target_pos[1]
+    for entity in get_entities_in_shape(target_pos, shape, shape_size, shape_direction):
+        if entity_has_component(entity, Resources):
+            affected_entities.append(entity)
 
-    # get affected tiles
-    coords = utility.get_coords_from_shape(shape, shape_size, shape_direction)
-    for coord in coords:
-        affected_positions.append((coord[0] + target_x, coord[1] + target_y))
+    return affected_entities
 
-    # get relevant entities in target area
-    for entity, (position, *others) in get_components([Position, Resources]):
-        assert isinstance(position, Position)  # for mypy typing
-        for affected_pos in affected_positions:
-            if affected_pos in position:
-                affected_entities.append(entity)
 
-    return affected_entities
+def get_entities_in_shape(
+    target_pos: Tuple[int, int], shape: ShapeType, shape_size: int, shape_direction: Optional[Tuple[int, int]] = None
+) -> List[EntityID]:
+    """
+    Return a list of entities on the tiles within the shape given, centred on the target position. Entities on more
+    than one tile in the shape are included once per tile. Tiles are checked column by column.
+    """
+    game_map = get_game_map()
+    template = utility.get_shape_template(shape, shape_size, shape_direction)
+    radius = template.radius
+    target_x, target_y = target_pos
+
+    # clip the shape to the map
+    start_x = max(target_x - radius, 0)
+    start_y = max(target_y - radius, 0)
+    end_x = min(target_x + radius + 1, game_map.width)
+    end_y = min(target_y + radius + 1, game_map.height)
+    if start_x >= end_x or start_y >= end_y:
+        return []
+
+    # stamp the shape onto the occupied tiles
+    mask = template.mask[
+        start_x - (target_x - radius) : end_x - (target_x - radius),
+        start_y - (target_y - radius) : end_y - (target_y - radius),
+    ]
+    hits = mask & (game_map.occupancy_map[start_x:end_x, start_y:end_y] > 0)
+
+    entities = []
+    hit_xs, hit_ys = np.nonzero(hits)
+    for x, y in zip((hit_xs + start_x).tolist(), (hit_ys + start_y).tolist()):
+        entities.extend(store.spatial_index.get_entities((x, y)))
+
+    return entities
+
+
+def get_entities_on_position(tile_pos: Tuple[int, int]) -> List[EntityID]:
+    """
+    Return a list of all the entities on the position given.
+    """
+    return store.spatial_index.get_entities(tile_pos)
+
+
+def get_entities_in_rect(start_pos: Tuple[int, int], width: int, height: int) -> List[EntityID]:
+    """
+    Return a list of all the entities with any part inside the rectangle that starts at start_pos and extends width
+    and height tiles. Each entity is only listed once.
+    """
+    start_x, start_y = start_pos
+    return store.spatial_index.get_entities_in_rect(start_x, start_y, width, height)
+
+
+def get_entities_in_radius(centre_pos: Tuple[int, int], radius: int) -> List[EntityID]:
+    """
+    Return a list of all the entities with any part within radius tiles, as the crow flies, of centre_pos. Each
+    entity is only listed once.
+    """
+    return store.spatial_index.get_entities_in_radius(centre_pos, radius)
 
 
 ############################# QUERIES - CAN, IS, HAS - RETURN BOOL #############################
@@ -700,81 +776,106 @@ def tile_has_tag(tile: Tile, tag: TargetTagType, active_entity: Optional[int] =
     """
     Check if a given tag applies to the tile.  True if tag applies.
     """
-    # before we even check tags, lets confirm it is in bounds
-    if not _is_tile_in_bounds(tile):
-        return False
+    return tile_has_tags(tile, [tag], active_entity)
 
+
+def tile_has_tags(tile: Tile, tags: List[TargetTagType], active_entity: Optional[int] = None) -> bool:
+    """
+    Check a tile has all required tags
+    """
+    return bool(get_tags_mask((tile.x, tile.y), 1, 1, tags, active_entity)[0, 0])
+
+
+def get_tags_mask(
+    start_pos: Tuple[int, int], width: int, height: int, tags: List[TargetTagType], active_entity: Optional[int] = None
+) -> np.ndarray:
+    """
+    Get a mask [x, y] of the tiles in the rectangle starting at start_pos, extending width and height tiles, that have
+    all of the tags. Tiles off the map have no tags.
+    """
+    game_map = get_game_map()
+    start_x, start_y = start_pos
+    mask = np.zeros((width, height), dtype=bool, order="F")
+
+    # clip the rectangle to the map
+    map_start_x = max(start_x, 0)
+    map_start_y = max(start_y, 0)
+    map_end_x = min(start_x + width, game_map.width)
+    map_end_y = min(start_y + height, game_map.height)
+    if map_start_x >= map_end_x or map_start_y >= map_end_y:
+        return mask
+
+    window = (slice(map_start_x, map_end_x), slice(map_start_y, map_end_y))
+    window_mask = np.ones((map_end_x - map_start_x, map_end_y - map_start_y), dtype=bool, order="F")
+    for tag in tags:
+        window_mask &= _get_tag_mask(game_map, window, tag, active_entity)
+
+        # no need to check the rest once nothing is left
+        if not window_mask.any():
+            return mask
+
+    mask[map_start_x - start_x : map_end_x - start_x, map_start_y - start_y : map_end_y - start_y] = window_mask
+    return mask
+
+
+def _get_tag_mask(
+    game_map: GameMap, window: Tuple[slice, slice], tag: TargetTagType, active_entity: Optional[int] = None
+) -> np.ndarray:
+    """
+    Get a mask of the tiles in the window, which must be on the map, that the tag applies to. Worked out from the
+    game map's layers.
+    """
     if tag == TargetTag.OPEN_SPACE:
         # if nothing is blocking movement
-        if not _is_tile_blocking_movement(tile) and not _tile_has_entity_blocking_movement(tile):
-            return True
+        return game_map.walkable_map[window]
     elif tag == TargetTag.BLOCKED_MOVEMENT:
         # if anything is blocking
-        if _is_tile_blocking_movement(tile) or _tile_has_entity_blocking_movement(tile):
-            return True
+        return ~game_map.walkable_map[window]
     elif tag == TargetTag.SELF:
         # if entity on tile is same as active entity
         if active_entity:
             assert isinstance(active_entity, EntityID)
-            return _tile_has_specific_entity(tile, active_entity)
+            return _get_entitys_tiles_mask(window, active_entity)
         else:
             logging.warning("Tried to get TargetTag.SELF but gave no active_entity.")
     elif tag == TargetTag.OTHER_ENTITY:
         # if entity on tile is not active entity
         if active_entity:
             assert isinstance(active_entity, EntityID)
-            # check both possibilities. either the tile containing the active entity or not
-            return _tile_has_other_entities(tile, active_entity)
+            # discount the active entity from the tiles it is on
+            others = game_map.occupancy_map[window] - _get_entitys_tiles_mask(window, active_entity)
+            return others > 0
         else:
             logging.warning("Tried to get TargetTag.OTHER_ENTITY but gave no active_entity.")
     elif tag == TargetTag.NO_ENTITY:
         # if the tile has no entity
-        return not _tile_has_any_entity(tile)
+        return game_map.occupancy_map[window] == 0
     elif tag == TargetTag.ANY:
         # if the tile is anything at all
-        return True
+        return np.ones(game_map.occupancy_map[window].shape, dtype=bool)
     elif tag == TargetTag.IS_VISIBLE:
         # if player can see the tile
-        return _is_tile_visible_to_player(tile)
+        return game_map.visibility_map[window]
     elif tag == TargetTag.NO_BLOCKING_TILE:
         # if tile isnt blocking movement
-        if _is_tile_in_bounds(tile):
-            return not _is_tile_blocking_movement(tile)
+        return ~game_map.blocks_movement_map[window]
 
     # If we've hit here it must be false!
-    return False
+    return np.zeros(game_map.occupancy_map[window].shape, dtype=bool)
 
 
-def tile_has_tags(tile: Tile, tags: List[TargetTagType], active_entity: int = None) -> bool:
+def _get_entitys_tiles_mask(window: Tuple[slice, slice], entity: EntityID) -> np.ndarray:
     """
-    Check a tile has all required tags
+    Get a mask of the tiles in the window, which must be on the map, that the entity is on.
     """
-    tags_checked = {}
+    start_x, end_x = window[0].start, window[0].stop
+    start_y, end_y = window[1].start, window[1].stop
+    mask = np.zeros((end_x - start_x, end_y - start_y), dtype=bool, order="F")
+    for x, y in store.spatial_index.get_entitys_tiles(entity):
+        if start_x <= x < end_x and start_y <= y < end_y:
+            mask[x - start_x, y - start_y] = True
 
-    # assess all tags
-    for tag in tags:
-        tags_checked[tag] = tile_has_tag(tile, tag, active_entity)
-
-    # if all tags came back true return true
-    if all(value for value in tags_checked.values()):
-        return True
-    else:
-        return False
-
-
-def _is_tile_blocking_sight(tile: Tile) -> bool:
-    """
-    Check if a tile is blocking sight
-    """
-    # Does the tile block sight?
-    return tile.blocks_sight
-
-
-def _is_tile_visible_to_player(tile: Tile) -> bool:
-    """
-    Check if the specified tile is visible to the player
-    """
-    return tile.is_visible
+    return mask
 
 
 def _is_tile_in_bounds(tile: Tile) -> bool:
@@ -796,77 +897,11 @@ def _is_tile_blocking_movement(tile: Tile) -> bool:
     return tile.blocks_movement
 
 
-def _tile_has_any_entity(tile: Tile) -> bool:
-    """
-    Check if the specified tile  has an entity on it
-    """
-    return len(get_entities_on_tile(tile)) > 0
-
-
 def get_entities_on_tile(tile: Tile) -> List[EntityID]:
     """
     Return a list of all the entities in that tile
     """
-    x = tile.x
-    y = tile.y
-    entities = []
-    from scripts.engine.core import queries
-
-    for entity, (position,) in queries.position:
-        position = cast(Position, position)
-        if (x, y) in position:
-            entities.append(entity)
-    return entities
-
-
-def _tile_has_other_entities(tile: Tile, active_entity: EntityID) -> bool:
-    """
-    Check if the specified tile has other entities apart from the provided active entity
-    """
-    entities_on_tile = get_entities_on_tile(tile)
-    active_entity_is_on_tile = active_entity in entities_on_tile
-    return (len(entities_on_tile) > 0 and not active_entity_is_on_tile) or (
-        len(entities_on_tile) > 1 and active_entity_is_on_tile
-    )
-
-
-def _tile_has_specific_entity(tile: Tile, active_entity: EntityID) -> bool:
-    """
-    Check if the specified tile  has the specified entity on it
-    """
-    return active_entity in get_entities_on_tile(tile)
-
-
-def _tile_has_entity_blocking_movement(tile: Tile) -> bool:
-    x = tile.x
-    y = tile.y
-    # Any entities that block movement?
-    for entity, (position, blocking) in get_components([Position, Blocking]):
-        position = cast(Position, position)
-        blocking = cast(Blocking, blocking)
-        if (x, y) in position and blocking.blocks_movement:
-            return True
-    return False
-
-
-def _tile_has_entity_blocking_sight(tile: Tile) -> bool:
-    x = tile.x
-    y = tile.y
-    # Any entities that block sight?
-    for entity, (position, blocking) in get_components([Position, Blocking]):
-        position = cast(Position, position)
-        blocking = cast(Blocking, blocking)
-        if (x, y) in position and blocking.blocks_sight:
-            return True
-    return False
-
-
-def is_tile_in_fov(tile_pos: Tuple[int, int], fov_map) -> bool:
-    """
-    Check if  target tile is in player`s FOV
-    """
-    x, y = tile_pos
-    return fov_map[x][y]
+    return store.spatial_index.get_entities((tile.x, tile.y))
 
 
 def _can_afford_cost(entity: EntityID, resource: ResourceType, cost: int) -> bool:
@@ -992,12 +1027,11 @@ def apply_skill(skill_instance: Skill) -> bool:
     skill = skill_instance
     # ensure they are the right target type
     if tile_has_tags(skill.target_tile, skill.target_tags, skill.user):
-        for entity, effects in skill_instance.apply():
+        effects: List[List[Effect]] = []
+        for entity, entitys_effects in skill_instance.apply():
             if entity not in skill.ignore_entities:
-                effect_queue = list(effects)
-                while effect_queue:
-                    effect = effect_queue.pop()
-                    effect_queue.extend(effect.evaluate())
+                effects.append(list(entitys_effects))
+        _resolve_effects(effects)
         return True
     else:
         logging.info(
@@ -1033,11 +1067,10 @@ def apply_affliction(affliction_instance: Affliction) -> bool:
 
         # ensure they are the right target type
         if tile_has_tags(target_tile, affliction.target_tags, affliction.origin):
-            for entity, effects in affliction.apply():
-                effect_queue = list(effects)
-                while effect_queue:
-                    effect = effect_queue.pop()
-                    effect_queue.extend(effect.evaluate())
+            effects: List[List[Effect]] = []
+            for entity, entitys_effects in affliction.apply():
+                effects.append(list(entitys_effects))
+            _resolve_effects(effects)
             return True
         else:
             logging.info(
@@ -1048,6 +1081,43 @@ def apply_affliction(affliction_instance: Affliction) -> bool:
     return False
 
 
+def _resolve_effects(effect_lists: List[List[Effect]]):
+    """
+    Evaluate each list of effects in turn, and the effects that follow from them, until none are left. Each list is
+    a stack, so its last effect is evaluated first and the effects that follow an effect are evaluated before the
+    rest of its list. Damage effects next to each other at the top of the same stack are resolved together in one
+    batch, so an area of effect is worked out in one go rather than per target, but only those with nothing
+    following them, so the outcome is as if each were resolved in turn. The lists given count as one stack for this.
+    """
+    from scripts.engine.effect import DamageEffect  # imported here to avoid a circular import with effect
+
+    # hold each effect with the stack it belongs to, putting the first list on top so it is evaluated first
+    effect_queue: List[Tuple[Effect, int]] = []
+    for effects in reversed(effect_lists):
+        effect_queue.extend((effect, 0) for effect in effects)
+    stack_count = 1
+
+    while effect_queue:
+        effect, stack = effect_queue.pop()
+
+        if isinstance(effect, DamageEffect) and effect.can_batch():
+            # take the rest of the damage effects that can be batched at the top of the same stack
+            batch = [effect]
+            while effect_queue and effect_queue[-1][1] == stack:
+                next_effect = effect_queue[-1][0]
+                if not (isinstance(next_effect, DamageEffect) and next_effect.can_batch()):
+                    break
+                batch.append(cast(DamageEffect, effect_queue.pop()[0]))
+            resulting_effects = DamageEffect.evaluate_batch(batch)
+        else:
+            resulting_effects = [effect.evaluate()]
+
+        # each set of resulting effects is a new stack, with the first effect's on top
+        for effects in reversed(resulting_effects):
+            effect_queue.extend((resulting_effect, stack_count) for resulting_effect in effects)
+            stack_count += 1
+
+
 def take_turn(entity: EntityID) -> bool:
     """
     Process the entity's Behaviour component. If no component found then EndTurn event is fired.
@@ -1084,6 +1154,8 @@ def spend_time(entity: EntityID, time_spent: int) -> bool:
     tracked = get_entitys_component(entity, Tracked)
     if tracked:
         tracked.time_spent += time_spent
+        if entity in chronicle.get_turn_queue():
+            chronicle.add_to_turn_queue(entity, tracked.time_spent)
         return True
     else:
         logging.warning(f"'{get_name(entity)}' has no tracked to spend time.")
@@ -1097,21 +1169,15 @@ def spend_time(entity: EntityID, time_spent: int) -> bool:
 def kill_entity(entity: EntityID):
     # if not player
     if entity != get_player():
-        # delete from world
+        # delete from world, which also removes them from the turn queue
         delete(entity)
 
-        turn_queue = chronicle.get_turn_queue()
-
-        # if turn holder create new queue without them
+        # if turn holder move on to the next in the queue
         if entity == chronicle.get_turn_holder():
 
             # ensure the game state reflects the new queue
             chronicle.next_turn(entity)
 
-        elif entity in turn_queue:
-            # remove from turn queue
-            turn_queue.pop(entity)
-
     else:
         # placeholder for player death
         ui.log_message("I should have died just then.")
@@ -1124,6 +1190,15 @@ def delete(entity: EntityID):
     if entity:
         if snecs.exists(entity, snecs.world.default_world):
             snecs.schedule_for_deletion(entity)
+
+            # stop it being found on the map or taking a turn straight away, rather than waiting for the deletion
+            store.spatial_index.remove(entity)
+            chronicle.remove_from_turn_queue(entity)
+            store.sleeping_entities.pop(entity, None)
+            store.stat_cache.pop(entity, None)
+            for flagged_entities in store.flagged_entities.values():
+                flagged_entities.pop(entity, None)
+
             name = get_name(entity)
             logging.info(f"'{name}' ({entity}) added to stack to be deleted on next frame.")
         else:
@@ -1132,11 +1207,156 @@ def delete(entity: EntityID):
         logging.error("Tried to delete an entity but entity was None.")
 
 
+def process_pending_deletions():
+    """
+    Remove the entities queued for deletion from the world. Does nothing if none are queued.
+    """
+    # snecs has no public way to see what is queued, so peek at its private set, processing anyway if that goes
+    default_world = snecs.world.default_world
+    if getattr(default_world, "_entities_to_delete", True):
+        snecs.process_pending_deletions(default_world)
+        queries.mark_structure_changed()
+
+
 def add_component(entity: EntityID, component: Component):
     """
     Add a component to the entity
     """
     snecs.add_component(entity, component)
+    queries.mark_structure_changed()
+
+    if isinstance(component, Position):
+        _register_position(entity, component)
+    elif isinstance(component, Blocking):
+        _update_blocking(entity, store.spatial_index.get_entitys_tiles(entity))
+    elif isinstance(component, Tracked):
+        chronicle.add_to_turn_queue(entity, component.time_spent)
+    elif isinstance(component, (Traits, Afflictions)):
+        clear_stat_cache(entity)
+    elif isinstance(component, _indexed_flags):
+        _index_flag(entity, component)
+
+
+def remove_component(entity: EntityID, component_type: Type[Component]):
+    """
+    Remove a component from the entity
+    """
+    component = get_entitys_component(entity, component_type)
+    snecs.remove_component(entity, component_type)
+    queries.mark_structure_changed()
+
+    if isinstance(component, Position):
+        # unlink it so later moves dont re-add the entity
+        component.entity = None
+        component.spatial_index = None
+        store.spatial_index.remove(entity)
+    elif isinstance(component, Blocking):
+        _update_blocking(entity, store.spatial_index.get_entitys_tiles(entity))
+    elif isinstance(component, Tracked):
+        chronicle.remove_from_turn_queue(entity)
+        store.sleeping_entities.pop(entity, None)
+    elif isinstance(component, (Traits, Afflictions)):
+        clear_stat_cache(entity)
+    elif isinstance(component, _indexed_flags):
+        store.flagged_entities.get(component_type, {}).pop(entity, None)
+
+
+def move_world(new_world: snecs.World):
+    """
+    Replace the default world with the new world and rebuild anything derived from the old world's entities.
+    """
+    snecs.ecs.move_world(new_world)
+    queries.mark_structure_changed()
+
+    store.spatial_index.clear()
+    if store.current_game_map:
+        store.current_game_map.clear_entity_blocking()
+        store.current_game_map.clear_entity_occupancy()
+    for entity, (position,) in get_components([Position]):
+        _register_position(entity, cast(Position, position))
+
+    store.flagged_entities.clear()
+    for flag in _indexed_flags:
+        for entity, (component,) in get_components([flag]):
+            _index_flag(entity, component)
+
+    # everything starts awake, sleepers having been woken before saving, and with stats to work out
+    store.sleeping_entities.clear()
+    store.stat_cache.clear()
+    turn_queue = {entity: cast(Tracked, tracked).time_spent for entity, (tracked,) in get_components([Tracked])}
+    chronicle.set_turn_queue(turn_queue)
+
+
+def _index_flag(entity: EntityID, flag: Component):
+    """
+    Hold the entity against the flag component's type, so it can be found without a query.
+    """
+    flag_type = type(flag)
+    if flag_type in store.flagged_entities:
+        store.flagged_entities[flag_type][entity] = None
+    else:
+        store.flagged_entities[flag_type] = {entity: None}
+
+
+def _register_position(entity: EntityID, position: Position):
+    """
+    Add the position to the spatial index and link the two, so the index follows any later moves.
+    """
+    position.entity = entity
+    position.spatial_index = store.spatial_index
+    store.spatial_index.add(entity, position.coordinates)
+
+
+def _update_blocking(entity: EntityID, coordinates: List[Tuple[int, int]]):
+    """
+    Update the game map's transparency and walkable layers with what the entity blocks on its tiles. Called by the
+    spatial index whenever an entity is added, moved or removed. Triggers vision if the transparency changed within
+    the player's sight.
+    """
+    game_map = store.current_game_map
+    if not game_map:
+        return
+
+    transparency_version = game_map.transparency_version
+    if coordinates and entity_has_component(entity, Blocking):
+        blocking = get_entitys_component(entity, Blocking)
+        game_map.set_entity_blocking(entity, coordinates, blocking.blocks_sight, blocking.blocks_movement)
+    else:
+        game_map.remove_entity_blocking(entity)
+
+    if game_map.transparency_version != transparency_version:
+        try:
+            player = get_player()
+        except ValueError:
+            return
+
+        # check against where the player's fov was last worked out; if the player has moved vision runs anyway
+        if entity_has_component(player, FOV):
+            calculated_with = get_entitys_component(player, FOV).calculated_with
+            if calculated_with:
+                x, y, sight_range, _ = calculated_with
+                if game_map.has_transparency_changed(transparency_version, (x, y), sight_range):
+                    scheduler.mark_sight_changed()
+
+
+def _update_occupancy(entity: EntityID, coordinates: List[Tuple[int, int]]):
+    """
+    Update the game map's occupancy layer with the entity's tiles. Called by the spatial index whenever an entity is
+    added, moved or removed.
+    """
+    game_map = store.current_game_map
+    if not game_map:
+        return
+
+    if coordinates:
+        game_map.set_entity_occupancy(entity, coordinates)
+    else:
+        game_map.remove_entity_occupancy(entity)
+
+
+# keep the blocking and occupancy layers in step with the entities' positions
+store.spatial_index.add_listener(_update_blocking)
+store.spatial_index.add_listener(_update_occupancy)
 
 
 def judge_action(entity: EntityID, action_name: str):
@@ -1144,10 +1364,12 @@ def judge_action(entity: EntityID, action_name: str):
     Have all entities alter opinions of the entity based on the skill used, if they have an attitude towards
     the tags in that skill.
     """
-    for god, (is_god, opinion, identity) in get_components([IsGod, Opinion, Identity]):
-        # cast for typing
-        opinion = cast(Opinion, opinion)
-        identity = cast(Identity, identity)
+    for god in get_entities_with_flag(IsGod):
+        if not (entity_has_component(god, Opinion) and entity_has_component(god, Identity)):
+            continue
+
+        opinion = get_entitys_component(god, Opinion)
+        identity = get_entitys_component(god, Identity)
 
         attitudes = library.GODS[identity.name].attitudes
 
@@ -1173,6 +1395,19 @@ def remove_affliction(entity: EntityID, affliction: Affliction):
     afflictions = get_entitys_component(entity, Afflictions)
     if afflictions:
         afflictions.remove(affliction)
+        clear_stat_cache(entity)
+
+
+def clear_stat_cache(entity: EntityID):
+    """
+    Forget an entity's cached stats, so they are worked out again when next needed. Needed whenever the entity's
+    traits or stat modifiers change.
+    """
+    store.stat_cache.pop(entity, None)
+
+    # their sight range may have changed
+    if entity_has_component(entity, FOV):
+        scheduler.mark_sight_changed()
 
 
 def learn_skill(entity: EntityID, skill_name: str):
@@ -1243,6 +1478,38 @@ def calculate_to_hit_score(attacker_accuracy: int, skill_accuracy: int, stat_to_
     return mitigated_to_hit_score
 
 
+def calculate_to_hit_scores(
+    attacker_accuracies: np.ndarray, skill_accuracies: np.ndarray, stat_to_target_values: np.ndarray
+) -> np.ndarray:
+    """
+    Get the to hit scores of many attacks at once, each with its own random roll. As calculate_to_hit_score.
+    """
+    # roll with numpy, seeded from random so seeded games still play out the same
+    rng = np.random.default_rng(random.getrandbits(64))
+    rolls = rng.integers(-3, 3, size=len(attacker_accuracies), endpoint=True, dtype=np.int64)
+
+    return (attacker_accuracies + skill_accuracies + rolls) - stat_to_target_values
+
+
+def calculate_damages(
+    base_damages: np.ndarray, damage_mod_amounts: np.ndarray, resist_values: np.ndarray, to_hit_scores: np.ndarray
+) -> np.ndarray:
+    """
+    Work out the damage dealt by many attacks at once, using the hit type of each to hit score. As calculate_damage.
+    """
+    hit_types_data = library.GAME_CONFIG.hit_types
+
+    mitigated_damages = (base_damages + damage_mod_amounts) - resist_values
+    modifiers = np.where(
+        to_hit_scores >= hit_types_data.crit.value,
+        hit_types_data.crit.modifier,
+        np.where(to_hit_scores >= hit_types_data.hit.value, hit_types_data.hit.modifier, hit_types_data.graze.modifier),
+    )
+
+    # round down the dmg, towards 0 as int() does
+    return (mitigated_damages * modifiers).astype(np.int64)
+
+
 def choose_interventions(entity: EntityID, action_name: str) -> List[Tuple[EntityID, str]]:
     """
     Have all entities consider intervening. Action can be str if matching name, e.g. affliction name,
@@ -1252,11 +1519,13 @@ def choose_interventions(entity: EntityID, action_name: str) -> List[Tuple[Entit
     desire_to_intervene = 10
     desire_to_do_nothing = 75  # weighting for doing nothing
 
-    for entity, (is_god, opinion, identity, knowledge) in get_components([IsGod, Opinion, Identity, Knowledge]):
-        # cast for typing
-        opinion = cast(Opinion, opinion)
-        identity = cast(Identity, identity)
-        knowledge = cast(Knowledge, knowledge)
+    for entity in get_entities_with_flag(IsGod):
+        if not all(entity_has_component(entity, component) for component in (Opinion, Identity, Knowledge)):
+            continue
+
+        opinion = get_entitys_component(entity, Opinion)
+        identity = get_entitys_component(entity, Identity)
+        knowledge = get_entitys_component(entity, Knowledge)
 
         attitudes = library.GODS[identity.name].attitudes
 
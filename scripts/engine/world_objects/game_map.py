@@ -3,22 +3,26 @@ from __future__ import annotations
 import json
 import logging
 import random
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from numpy import ndarray
+from snecs.typedefs import EntityID
 
 from scripts.engine import dungen, world
 from scripts.engine.component import Blocking, Position
 from scripts.engine.core.constants import TILE_SIZE, TileCategory
 from scripts.engine.core.definitions import ActorData
-from scripts.engine.world_objects.tile import Tile
+from scripts.engine.world_objects.tile import TileType
 
 
 class GameMap:
     """
-    Holds tiles for a map. Handles generation of the map and placement of the entities. Fills map with floors on
+    Holds tiles for a map. Handles generation of the map and placement of the entities. Fills map with walls on
     init.
+
+    Tiles are held as arrays, indexed [x, y]; tile_type_map holds the index of each tile's TileType in tile_types,
+    with the flags for each tile held in their own map. Use world.get_tile to get a Tile view of a single position.
     """
 
     def __init__(self, map_name: str, seed: Any):
@@ -34,30 +38,245 @@ class GameMap:
         _map_data = library.MAPS[map_name]
         self.width = _map_data.width
         self.height = _map_data.height
-        self.light_map: np.array = np.zeros((self.width, self.height), dtype=bool, order="F")
-        self.tile_map: List[List[Tile]] = []
+        self.light_map: ndarray = np.zeros((self.width, self.height), dtype=bool, order="F")
 
-        # get details for a wall tile
-        from scripts.engine import utility
+        # how many light sources light each tile, and the area lit by each source
+        self.light_counts: ndarray = np.zeros((self.width, self.height), dtype=np.int16, order="F")
+        self._lit_areas: Dict[EntityID, Tuple[Tuple[int, int, int, int], Tuple[slice, slice], ndarray]] = {}
 
-        wall_sprite_path = _map_data.sprite_paths[TileCategory.WALL]
-        wall_sprite = utility.get_image(wall_sprite_path)
-        blocks_sight = True
-        blocks_movement = True
+        # tile details
+        self.tile_types: List[TileType] = []
+        self._tile_type_indices: Dict[Tuple[str, bool, bool], int] = {}
+        self.tile_type_map: ndarray = np.zeros((self.width, self.height), dtype=np.int16, order="F")
+        self.blocks_sight_map: ndarray = np.zeros((self.width, self.height), dtype=bool, order="F")
+        self.blocks_movement_map: ndarray = np.zeros((self.width, self.height), dtype=bool, order="F")
+        self.visibility_map: ndarray = np.zeros((self.width, self.height), dtype=bool, order="F")
+
+        # layers combining the tiles and any blocking entities. Kept up to date as either change, so they can be
+        # handed straight to fov and pathfinding.
+        self.transparency_map: ndarray = np.zeros((self.width, self.height), dtype=bool, order="F")
+        self.walkable_map: ndarray = np.zeros((self.width, self.height), dtype=bool, order="F")
+        self._entity_sight_blockers: ndarray = np.zeros((self.width, self.height), dtype=np.int16, order="F")
+        self._entity_movement_blockers: ndarray = np.zeros((self.width, self.height), dtype=np.int16, order="F")
+        self._blocking_entities: Dict[EntityID, Tuple[List[Tuple[int, int]], bool, bool]] = {}
+
+        # how many entities are on each tile, and the tiles each entity is on, so areas can be checked for entities
+        # without looking at each tile in turn
+        self.occupancy_map: ndarray = np.zeros((self.width, self.height), dtype=np.int16, order="F")
+        self._occupied_tiles: Dict[EntityID, List[Tuple[int, int]]] = {}
 
-        # populate tile_map with wall tiles
-        for x in range(self.width):
-            self.tile_map.append([])  # create new list for every col
-            for y in range(self.height):
-                self.tile_map[x].append(Tile(x, y, wall_sprite, wall_sprite_path, blocks_sight, blocks_movement))
+        # version of the transparency layer, increased on every change, and the version each tile last changed at
+        self.transparency_version: int = 0
+        self._transparency_changes: ndarray = np.zeros((self.width, self.height), dtype=np.int64, order="F")
+
+        # fill the map with wall tiles
+        wall_sprite_path = _map_data.sprite_paths[TileCategory.WALL]
+        wall_index = self.get_tile_type_index(wall_sprite_path, blocks_sight=True, blocks_movement=True)
+        self.set_tile_types(np.full((self.width, self.height), wall_index, dtype=np.int16, order="F"))
 
         self.generation_info: str = ""
 
-    def generate_new_map(self, player_data: ActorData):
+    def generate_new_map(self, player_data: ActorData, generated_map: Optional[dungen.GeneratedMap] = None):
+        """
+        Generate the map for the current game map. Creates tiles. Saves the values directly to the GameMap. If the
+        map has already been generated, e.g. by dungen.pregenerate, it is only built.
+        """
+        self.generation_info = dungen.generate(self, player_data, generated_map)
+
+    def get_tile_type_index(self, sprite_path: str, blocks_sight: bool = False, blocks_movement: bool = False) -> int:
+        """
+        Get the index of the TileType matching the details given, adding a new TileType if there isnt one.
+        """
+        key = (sprite_path, blocks_sight, blocks_movement)
+        if key in self._tile_type_indices:
+            return self._tile_type_indices[key]
+
+        from scripts.engine import utility
+
+        sprite = utility.get_image(sprite_path)
+        self.tile_types.append(TileType(sprite, sprite_path, blocks_sight, blocks_movement))
+        index = len(self.tile_types) - 1
+        self._tile_type_indices[key] = index
+        return index
+
+    def set_tile_types(self, tile_type_map: ndarray):
+        """
+        Set the type of every tile, resetting the flags of each tile to those of its type.
+        """
+        self.tile_type_map[:] = tile_type_map
+
+        # look up the flags of each type
+        blocks_sight = np.array([tile_type.blocks_sight for tile_type in self.tile_types], dtype=bool)
+        blocks_movement = np.array([tile_type.blocks_movement for tile_type in self.tile_types], dtype=bool)
+        self.blocks_sight_map[:] = blocks_sight[self.tile_type_map]
+        self.blocks_movement_map[:] = blocks_movement[self.tile_type_map]
+
+        self.refresh_layers()
+
+    def refresh_layers(self):
+        """
+        Rebuild the transparency and walkable layers for the whole map.
+        """
+        np.logical_not(self.blocks_sight_map, out=self.transparency_map)
+        self.transparency_map &= self._entity_sight_blockers == 0
+        self.transparency_version += 1
+        self._transparency_changes[:] = self.transparency_version
+        np.logical_not(self.blocks_movement_map, out=self.walkable_map)
+        self.walkable_map &= self._entity_movement_blockers == 0
+
+    def refresh_tile_layers(self, x: int, y: int):
+        """
+        Update the transparency and walkable layers for a single tile.
+        """
+        is_transparent = not self.blocks_sight_map[x, y] and self._entity_sight_blockers[x, y] == 0
+        if is_transparent != self.transparency_map[x, y]:
+            self.transparency_map[x, y] = is_transparent
+            self.transparency_version += 1
+            self._transparency_changes[x, y] = self.transparency_version
+
+        self.walkable_map[x, y] = not self.blocks_movement_map[x, y] and self._entity_movement_blockers[x, y] == 0
+
+    def has_transparency_changed(self, since_version: int, centre: Tuple[int, int], radius: int) -> bool:
+        """
+        Check if the transparency of any tile within radius of the centre has changed since the version given. A
+        radius of 0 or less covers the whole map, as it does for fov.
+        """
+        if since_version == self.transparency_version:
+            return False
+
+        changes = self._transparency_changes[self.get_window(centre, radius)]
+        return changes.size > 0 and bool(changes.max() > since_version)
+
+    def is_lit_area_current(self, entity: EntityID, centre: Tuple[int, int], radius: int) -> bool:
+        """
+        Check if the area lit by the entity was calculated from the same centre and radius, with no change to the
+        transparency in range since.
+        """
+        if entity not in self._lit_areas:
+            return False
+
+        x, y, _radius, transparency_version = self._lit_areas[entity][0]
+        if (x, y, _radius) != (centre[0], centre[1], radius):
+            return False
+
+        return not self.has_transparency_changed(transparency_version, centre, radius)
+
+    def set_lit_area(self, entity: EntityID, centre: Tuple[int, int], radius: int, lit: ndarray):
+        """
+        Set the area lit by the entity, replacing any area it lit before. lit is the tiles lit from the centre, e.g.
+        from fov, covering the window from get_window.
+        """
+        self.remove_lit_area(entity)
+
+        window = self.get_window(centre, radius)
+        lit_window = lit.astype(np.int16)
+        calculated_with = (centre[0], centre[1], radius, self.transparency_version)
+        self._lit_areas[entity] = (calculated_with, window, lit_window)
+
+        self.light_counts[window] += lit_window
+        self.light_map[window] = self.light_counts[window] > 0
+
+    def remove_lit_area(self, entity: EntityID):
+        """
+        Remove the light from the area lit by the entity. Does nothing if the entity isnt lighting anything.
+        """
+        if entity in self._lit_areas:
+            _, window, lit_window = self._lit_areas.pop(entity)
+            self.light_counts[window] -= lit_window
+            self.light_map[window] = self.light_counts[window] > 0
+
+    def get_lighting_entities(self) -> List[EntityID]:
+        """
+        Get the entities currently lighting an area of the map.
+        """
+        return list(self._lit_areas)
+
+    def get_window(self, centre: Tuple[int, int], radius: int) -> Tuple[slice, slice]:
+        """
+        Get the slices covering the tiles within radius of the centre. A radius of 0 or less covers the whole map,
+        as it does for fov.
+        """
+        if radius <= 0:
+            return slice(None), slice(None)
+
+        x, y = centre
+        return (
+            slice(max(x - radius, 0), max(x + radius + 1, 0)),
+            slice(max(y - radius, 0), max(y + radius + 1, 0)),
+        )
+
+    def set_entity_blocking(
+        self, entity: EntityID, coordinates: List[Tuple[int, int]], blocks_sight: bool, blocks_movement: bool
+    ):
+        """
+        Set the tiles an entity blocks, replacing anything previously set for that entity.
+        """
+        self.remove_entity_blocking(entity)
+
+        # only hold entities that block something, on the tiles that are on the map
+        coordinates = [(x, y) for x, y in coordinates if 0 <= x < self.width and 0 <= y < self.height]
+        if not coordinates or not (blocks_sight or blocks_movement):
+            return
+
+        self._blocking_entities[entity] = (coordinates, blocks_sight, blocks_movement)
+        self._apply_entity_blocking(coordinates, blocks_sight, blocks_movement, 1)
+
+    def remove_entity_blocking(self, entity: EntityID):
         """
-        Generate the map for the current game map. Creates tiles. Saves the values directly to the GameMap.
+        Remove anything previously set as blocked by the entity. Does nothing if the entity isnt blocking.
         """
-        self.tile_map, self.generation_info = dungen.generate(self.name, self.rng, player_data)
+        if entity in self._blocking_entities:
+            coordinates, blocks_sight, blocks_movement = self._blocking_entities.pop(entity)
+            self._apply_entity_blocking(coordinates, blocks_sight, blocks_movement, -1)
+
+    def clear_entity_blocking(self):
+        """
+        Remove all blocking entities from the layers.
+        """
+        self._blocking_entities.clear()
+        self._entity_sight_blockers[:] = 0
+        self._entity_movement_blockers[:] = 0
+        self.refresh_layers()
+
+    def set_entity_occupancy(self, entity: EntityID, coordinates: List[Tuple[int, int]]):
+        """
+        Set the tiles an entity is on, replacing anything previously set for that entity.
+        """
+        self.remove_entity_occupancy(entity)
+
+        coordinates = [(x, y) for x, y in coordinates if 0 <= x < self.width and 0 <= y < self.height]
+        if coordinates:
+            self._occupied_tiles[entity] = coordinates
+            for x, y in coordinates:
+                self.occupancy_map[x, y] += 1
+
+    def remove_entity_occupancy(self, entity: EntityID):
+        """
+        Remove the tiles previously set as occupied by the entity. Does nothing if the entity isnt held.
+        """
+        if entity in self._occupied_tiles:
+            for x, y in self._occupied_tiles.pop(entity):
+                self.occupancy_map[x, y] -= 1
+
+    def clear_entity_occupancy(self):
+        """
+        Remove all entities from the occupancy layer.
+        """
+        self._occupied_tiles.clear()
+        self.occupancy_map[:] = 0
+
+    def _apply_entity_blocking(
+        self, coordinates: List[Tuple[int, int]], blocks_sight: bool, blocks_movement: bool, change: int
+    ):
+        """
+        Add the change to the count of blocking entities on each tile and update the layers to match.
+        """
+        for x, y in coordinates:
+            if blocks_sight:
+                self._entity_sight_blockers[x, y] += change
+            if blocks_movement:
+                self._entity_movement_blockers[x, y] += change
+            self.refresh_tile_layers(x, y)
 
     def dump(self, path: str):
         """
@@ -71,16 +290,17 @@ class GameMap:
         """
         Serialise the game map to dict.
         """
-        tiles: List[List[Dict]] = []
-        # build list of lists
-        for x in range(self.width):
-            # give each new row an empty list
-            tiles.append([])
-            for y in range(self.height):
-                # add to the column
-                tiles[x].append(self.tile_map[x][y].serialise())
-
-        _dict = {"width": self.width, "height": self.height, "tiles": tiles, "seed": self.seed}
+        _dict = {
+            "name": self.name,
+            "width": self.width,
+            "height": self.height,
+            "seed": self.seed,
+            "tile_types": [tile_type.serialise() for tile_type in self.tile_types],
+            "tile_type_map": self.tile_type_map.tolist(),
+            "blocks_sight_map": self.blocks_sight_map.tolist(),
+            "blocks_movement_map": self.blocks_movement_map.tolist(),
+            "visibility_map": self.visibility_map.tolist(),
+        }
         return _dict
 
     @classmethod
@@ -89,19 +309,22 @@ class GameMap:
         Loads the details from the serialised data back into the GameMap.
         """
         try:
-            seed = serialised["seed"]
-            algo_name = serialised["algorithm_name"]
-            width = serialised["width"]
-            height = serialised["height"]
-
-            tiles: List[List[Tile]] = []
-            for x in range(width):
-                tiles.append([])
-                for y in range(height):
-                    tiles[x].append(Tile.deserialise(serialised["tiles"][x][y]))
-
-            game_map = GameMap(seed, algo_name)
-            game_map.tile_map = tiles
+            game_map = GameMap(serialised["name"], serialised["seed"])
+
+            # rebuild the tile types, mapping the saved indices to the new ones
+            indices = [
+                game_map.get_tile_type_index(
+                    tile_type["sprite_path"], tile_type["blocks_sight"], tile_type["blocks_movement"]
+                )
+                for tile_type in serialised["tile_types"]
+            ]
+            saved_tile_type_map = np.array(serialised["tile_type_map"], dtype=np.int16)
+            game_map.tile_type_map[:] = np.array(indices, dtype=np.int16)[saved_tile_type_map]
+
+            game_map.blocks_sight_map[:] = np.array(serialised["blocks_sight_map"], dtype=bool)
+            game_map.blocks_movement_map[:] = np.array(serialised["blocks_movement_map"], dtype=bool)
+            game_map.visibility_map[:] = np.array(serialised["visibility_map"], dtype=bool)
+            game_map.refresh_layers()
             return game_map
         except KeyError as e:
             logging.warning(f"GameMap.Deserialise: Incorrect key ({e.args[0]}) given. Data not loaded correctly.")
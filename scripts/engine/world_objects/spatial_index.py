@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from snecs.typedefs import EntityID
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Iterable, List, Tuple
+
+
+class SpatialIndex:
+    """
+    A lookup of tile coordinates to the entities occupying them. Kept up to date by the world and by Position, so
+    that tile queries only need to look at the entities on the tiles in question.
+    """
+
+    def __init__(self):
+        self._entities_on_tile: Dict[Tuple[int, int], List[EntityID]] = {}
+        self._entitys_tiles: Dict[EntityID, List[Tuple[int, int]]] = {}
+        self._listeners: List[Callable[[EntityID, List[Tuple[int, int]]], None]] = []
+
+    def __contains__(self, entity: EntityID) -> bool:
+        """
+        :param entity: Entity to check for
+        :return: A bool that represents if the entity is held in the index
+        """
+        return entity in self._entitys_tiles
+
+    def __len__(self) -> int:
+        return len(self._entitys_tiles)
+
+    def add_listener(self, listener: Callable[[EntityID, List[Tuple[int, int]]], None]):
+        """
+        Add a function to be called with the entity and its tiles whenever an entity is added, moved or removed.
+        Removed entities have no tiles. Not called on clear.
+        """
+        self._listeners.append(listener)
+
+    def add(self, entity: EntityID, coordinates: Iterable[Tuple[int, int]]):
+        """
+        Add an entity to the index at the given coordinates. If the entity is already held it is moved instead.
+        """
+        if entity in self._entitys_tiles:
+            self._remove(entity)
+
+        tiles = list(coordinates)
+        self._entitys_tiles[entity] = tiles
+        for tile in tiles:
+            if tile in self._entities_on_tile:
+                self._entities_on_tile[tile].append(entity)
+            else:
+                self._entities_on_tile[tile] = [entity]
+
+        for listener in self._listeners:
+            listener(entity, tiles)
+
+    def remove(self, entity: EntityID):
+        """
+        Remove an entity from the index. Does nothing if the entity isnt held.
+        """
+        if entity in self._entitys_tiles:
+            self._remove(entity)
+
+            for listener in self._listeners:
+                listener(entity, [])
+
+    def _remove(self, entity: EntityID):
+        """
+        Remove a held entity from the index, without telling the listeners.
+        """
+        tiles = self._entitys_tiles.pop(entity)
+        for tile in tiles:
+            entities = self._entities_on_tile[tile]
+            entities.remove(entity)
+
+            # dont keep empty tiles around, so the number of keys reflects the number of occupied tiles
+            if not entities:
+                del self._entities_on_tile[tile]
+
+    def move(self, entity: EntityID, coordinates: Iterable[Tuple[int, int]]):
+        """
+        Update the coordinates held for an entity.
+        """
+        self.add(entity, coordinates)
+
+    def clear(self):
+        """
+        Remove all entities from the index.
+        """
+        self._entities_on_tile.clear()
+        self._entitys_tiles.clear()
+
+    def get_entities(self, coordinate: Tuple[int, int]) -> List[EntityID]:
+        """
+        Get the entities on a single tile.
+        """
+        if coordinate in self._entities_on_tile:
+            return list(self._entities_on_tile[coordinate])
+        return []
+
+    def get_entitys_tiles(self, entity: EntityID) -> List[Tuple[int, int]]:
+        """
+        Get the tiles an entity is held against. Empty if the entity isnt held.
+        """
+        return list(self._entitys_tiles.get(entity, []))
+
+    def get_entities_in_rect(self, start_x: int, start_y: int, width: int, height: int) -> List[EntityID]:
+        """
+        Get the entities with any part inside the rectangle starting at start_xy, extending width and height tiles.
+        Each entity is only included once.
+        """
+        end_x = start_x + width
+        end_y = start_y + height
+
+        def _in_rect(tile: Tuple[int, int]) -> bool:
+            return start_x <= tile[0] < end_x and start_y <= tile[1] < end_y
+
+        # check whichever is smaller; the tiles in the area or the occupied tiles
+        if width * height <= len(self._entities_on_tile):
+            tiles = [(x, y) for x in range(start_x, end_x) for y in range(start_y, end_y)]
+        else:
+            tiles = [tile for tile in self._entities_on_tile.keys() if _in_rect(tile)]
+
+        return self._collect_entities(tiles)
+
+    def get_entities_in_radius(self, centre: Tuple[int, int], radius: int) -> List[EntityID]:
+        """
+        Get the entities with any part within radius tiles, as the crow flies, of centre. Each entity is only
+        included once.
+        """
+        centre_x, centre_y = centre
+        radius_squared = radius * radius
+
+        def _in_radius(tile: Tuple[int, int]) -> bool:
+            offset_x = tile[0] - centre_x
+            offset_y = tile[1] - centre_y
+            return offset_x * offset_x + offset_y * offset_y <= radius_squared
+
+        # check whichever is smaller; the tiles in the area or the occupied tiles
+        diameter = (radius * 2) + 1
+        if diameter * diameter <= len(self._entities_on_tile):
+            tiles = [
+                (x, y)
+                for x in range(centre_x - radius, centre_x + radius + 1)
+                for y in range(centre_y - radius, centre_y + radius + 1)
+                if _in_radius((x, y))
+            ]
+        else:
+            tiles = [tile for tile in self._entities_on_tile.keys() if _in_radius(tile)]
+
+        return self._collect_entities(tiles)
+
+    def _collect_entities(self, tiles: List[Tuple[int, int]]) -> List[EntityID]:
+        """
+        Get the unique entities on the tiles given, in the order they are found.
+        """
+        entities: Dict[EntityID, None] = {}  # dict rather than set to keep the order stable
+        for tile in tiles:
+            for entity in self._entities_on_tile.get(tile, ()):
+                entities[entity] = None
+        return list(entities)
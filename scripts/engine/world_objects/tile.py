@@ -1,34 +1,118 @@
 from __future__ import annotations
 
-import logging
 from typing import TYPE_CHECKING, Any, Dict
 
 if TYPE_CHECKING:
     import pygame
 
+    from scripts.engine.world_objects.game_map import GameMap
 
-class Tile:
+
+class TileType:
     """
-    A Tile on the GameMap.
+    The details shared by every tile of a kind, e.g. all the cave walls. Held once in the GameMap's table of tile
+    types and referred to by index from the tile type map.
     """
 
+    __slots__ = ("sprite", "sprite_path", "blocks_sight", "blocks_movement")
+
     def __init__(
-        self,
-        x: int,
-        y: int,
-        sprite: pygame.Surface,
-        sprite_path: str,
-        blocks_sight: bool = False,
-        blocks_movement: bool = False,
+        self, sprite: pygame.Surface, sprite_path: str, blocks_sight: bool = False, blocks_movement: bool = False,
     ):
-        self.x = x
-        self.y = y
         self.sprite = sprite
         self.sprite_path = sprite_path
-        self.is_visible = False
         self.blocks_sight = blocks_sight
         self.blocks_movement = blocks_movement
 
+    def serialise(self) -> Dict[str, Any]:
+        """
+        Serialise the TileType. The sprite is not included as it is loaded from the sprite path.
+        """
+        _dict = {
+            "sprite_path": self.sprite_path,
+            "blocks_sight": self.blocks_sight,
+            "blocks_movement": self.blocks_movement,
+        }
+        return _dict
+
+
+class Tile:
+    """
+    A Tile on the GameMap. A lightweight view of a single position in the GameMap's tile arrays; reading or setting
+    values reads or sets them on the GameMap.
+    """
+
+    __slots__ = ("x", "y", "_game_map")
+
+    def __init__(self, game_map: GameMap, x: int, y: int):
+        self.x = x
+        self.y = y
+        self._game_map = game_map
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Tile):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y and self._game_map is other._game_map
+
+    def __hash__(self) -> int:
+        return hash((self.x, self.y, id(self._game_map)))
+
+    def __repr__(self) -> str:
+        return f"Tile({self.x}, {self.y})"
+
+    @property
+    def tile_type(self) -> TileType:
+        """
+        The shared details for this kind of tile.
+        """
+        return self._game_map.tile_types[self._game_map.tile_type_map[self.x, self.y]]
+
+    @property
+    def sprite(self) -> pygame.Surface:
+        return self.tile_type.sprite
+
+    @property
+    def sprite_path(self) -> str:
+        return self.tile_type.sprite_path
+
+    @property
+    def is_visible(self) -> bool:
+        return bool(self._game_map.visibility_map[self.x, self.y])  # cast to bool as it is numpy _bool
+
+    @is_visible.setter
+    def is_visible(self, value: bool):
+        self._game_map.visibility_map[self.x, self.y] = value
+
+    @property
+    def blocks_sight(self) -> bool:
+        return bool(self._game_map.blocks_sight_map[self.x, self.y])
+
+    @blocks_sight.setter
+    def blocks_sight(self, value: bool):
+        self._game_map.blocks_sight_map[self.x, self.y] = value
+        self._refresh_layers()
+
+    @property
+    def blocks_movement(self) -> bool:
+        return bool(self._game_map.blocks_movement_map[self.x, self.y])
+
+    @blocks_movement.setter
+    def blocks_movement(self, value: bool):
+        self._game_map.blocks_movement_map[self.x, self.y] = value
+        self._refresh_layers()
+
+    def _refresh_layers(self):
+        """
+        Update the GameMap's layers for this tile, triggering vision if the tile's transparency changed.
+        """
+        # imported here to avoid a circular import, as the store holds the game map
+        from scripts.engine.core.scheduler import scheduler
+
+        transparency_version = self._game_map.transparency_version
+        self._game_map.refresh_tile_layers(self.x, self.y)
+        if self._game_map.transparency_version != transparency_version:
+            scheduler.mark_sight_changed()
+
     def serialise(self) -> Dict[str, Any]:
         """
         Serialise the Tile
@@ -42,27 +126,3 @@ class Tile:
             "blocks_movement": self.blocks_movement,
         }
         return _dict
-
-    @classmethod
-    def deserialise(cls, serialised: Dict[str, Any]):
-        """
-        Loads the details from the serialised data back into the Tile.
-        """
-        try:
-            x = serialised["x"]
-            y = serialised["y"]
-            sprite_path = serialised["sprite_path"]
-            from scripts.engine import utility
-
-            sprite = utility.get_image(sprite_path)
-            is_visible = serialised["is_visible"]
-            blocks_sight = serialised["blocks_sight"]
-            blocks_movement = serialised["blocks_movement"]
-
-            tile = Tile(x, y, sprite, sprite_path, blocks_sight, blocks_movement)
-            tile.is_visible = is_visible
-            return tile
-
-        except KeyError as e:
-            logging.warning(f"Tile.Deserialise: Incorrect key ({e.args[0]}) given. Data not loaded correctly.")
-            raise Exception  # throw exception to hit outer error handler and exit
@@ -7,7 +7,7 @@ from snecs.typedefs import EntityID
 from scripts.engine import library
 from scripts.engine.action import Affliction, init_action
 from scripts.engine.core.constants import DamageType, PrimaryStat
-from scripts.engine.effect import AffectStatEffect, DamageEffect
+from scripts.engine.effect import AffectStatEffect, DamageEffect, Effect, EffectTemplate
 
 if TYPE_CHECKING:
     from typing import List
@@ -17,40 +17,38 @@ if TYPE_CHECKING:
 class BoggedDown(Affliction):
     key = "bogged_down"
 
-    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[AffectStatEffect]:  # type: ignore
-
-        affect_stat_effect = AffectStatEffect(
-            origin=self.origin,
-            cause_name=self.key,
-            success_effects=[],
-            failure_effects=[],
-            target=self.affected_entity,
-            stat_to_target=PrimaryStat.BUSTLE,
-            affect_amount=2,
+    @classmethod
+    def _compile_effect_templates(cls) -> List[EffectTemplate]:
+        affect_stat_template = EffectTemplate(
+            AffectStatEffect, {"cause_name": cls.key, "stat_to_target": PrimaryStat.BUSTLE, "affect_amount": 2}
         )
+        return [affect_stat_template]
 
-        return [affect_stat_effect]
+    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[Effect]:
+        return self._build_effects_from_templates(self.origin, self.affected_entity, potency)
 
 
 @init_action
 class Flaming(Affliction):
     key = "flaming"
 
-    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[DamageEffect]:  # type: ignore
+    @classmethod
+    def _compile_effect_templates(cls) -> List[EffectTemplate]:
+        damage_template = EffectTemplate(
+            DamageEffect,
+            {
+                "stat_to_target": PrimaryStat.BUSTLE,
+                "accuracy": library.GAME_CONFIG.base_values.accuracy,
+                "damage": int(library.GAME_CONFIG.base_values.damage / 2),
+                "damage_type": DamageType.BURN,
+                "mod_stat": PrimaryStat.SKULLDUGGERY,
+                "mod_amount": 0.1,
+            },
+        )
+        return [damage_template]
+
+    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[Effect]:
         """
         Build the effects of this skill applying to a single entity.
         """
-        damage_effect = DamageEffect(
-            origin=self.origin,
-            success_effects=[],
-            failure_effects=[],
-            target=entity,
-            stat_to_target=PrimaryStat.BUSTLE,
-            accuracy=library.GAME_CONFIG.base_values.accuracy,
-            damage=int(library.GAME_CONFIG.base_values.damage / 2),
-            damage_type=DamageType.BURN,
-            mod_stat=PrimaryStat.SKULLDUGGERY,
-            mod_amount=0.1,
-        )
-
-        return [damage_effect]
+        return self._build_effects_from_templates(self.origin, entity, potency)
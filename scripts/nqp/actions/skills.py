@@ -13,6 +13,7 @@ from scripts.engine.effect import (
     ApplyAfflictionEffect,
     DamageEffect,
     Effect,
+    EffectTemplate,
     MoveActorEffect,
     ReduceSkillCooldownEffect,
 )
@@ -42,20 +43,16 @@ class Move(Skill):
 
         super().__init__(user, tile, direction)
 
-    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[MoveActorEffect]:  # type:ignore
+    @classmethod
+    def _compile_effect_templates(cls) -> List[EffectTemplate]:
+        move_template = EffectTemplate(MoveActorEffect, {"direction": None, "move_amount": 1})
+        return [move_template]
+
+    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[Effect]:
         """
         Build the effects of this skill applying to a single entity.
         """
-        move_effect = MoveActorEffect(
-            origin=self.user,
-            target=entity,
-            success_effects=[],
-            failure_effects=[],
-            direction=self.direction,
-            move_amount=1,
-        )
-
-        return [move_effect]
+        return self._build_effects_from_templates(self.user, entity, potency, direction=self.direction)
 
     def get_animation(self, aesthetic: Aesthetic):
         # this special case is handled in the MoveActorEffect
@@ -70,24 +67,27 @@ class BasicAttack(Skill):
 
     key = "basic_attack"
 
-    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[DamageEffect]:  # type:ignore
+    @classmethod
+    def _compile_effect_templates(cls) -> List[EffectTemplate]:
+        damage_template = EffectTemplate(
+            DamageEffect,
+            {
+                "stat_to_target": PrimaryStat.VIGOUR,
+                "accuracy": library.GAME_CONFIG.base_values.accuracy,
+                "damage": library.GAME_CONFIG.base_values.damage,
+                "damage_type": DamageType.MUNDANE,
+                "mod_stat": PrimaryStat.CLOUT,
+                "mod_amount": 0.1,
+            },
+            potency_params=["damage"],
+        )
+        return [damage_template]
+
+    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[Effect]:
         """
         Build the effects of this skill applying to a single entity.
         """
-        damage_effect = DamageEffect(
-            origin=self.user,
-            success_effects=[],
-            failure_effects=[],
-            target=entity,
-            stat_to_target=PrimaryStat.VIGOUR,
-            accuracy=library.GAME_CONFIG.base_values.accuracy,
-            damage=int(library.GAME_CONFIG.base_values.damage * potency),
-            damage_type=DamageType.MUNDANE,
-            mod_stat=PrimaryStat.CLOUT,
-            mod_amount=0.1,
-        )
-
-        return [damage_effect]
+        return self._build_effects_from_templates(self.user, entity, potency)
 
     def get_animation(self, aesthetic: Aesthetic):
         # we can show animations depending on the direction with self.direction
@@ -7,7 +7,7 @@ from typing import List
 import snecs
 from snecs import Component
 
-from scripts.engine import chronicle, state, utility, world
+from scripts.engine import chronicle, dungen, state, utility, world
 from scripts.engine.component import Aesthetic, Position, WinCondition
 from scripts.engine.core.constants import ASSET_PATH, SAVE_PATH, GameState, RenderLayer, UIElement
 from scripts.engine.core.data import store
@@ -18,6 +18,10 @@ from scripts.engine.world_objects.game_map import GameMap
 
 __all__ = ["initialise_game", "goto_character_select", "load_game", "exit_game", "win_game"]
 
+# the map a new game starts on
+_START_MAP_NAME = "cave"
+_START_MAP_SEED = 10
+
 
 def initialise_game():
     """
@@ -26,6 +30,9 @@ def initialise_game():
     state.set_new(GameState.MENU)
     ui.set_element_visibility(UIElement.TITLE_SCREEN, True)
 
+    # get the first map ready while on the menus
+    dungen.pregenerate(_START_MAP_NAME, _START_MAP_SEED)
+
 
 def goto_character_select():
     """
@@ -43,11 +50,15 @@ def start_game(player_data: ActorData):
     world.move_world(empty_world)
 
     # init and save map
-    game_map = GameMap("cave", 10)
+    game_map = GameMap(_START_MAP_NAME, _START_MAP_SEED)
     store.current_game_map = game_map
 
-    # populate the map
-    game_map.generate_new_map(player_data)
+    # populate the map, using the map generated in the background if there is one
+    generated_map = dungen.get_generated_map(game_map.name, game_map.seed)
+    game_map.generate_new_map(player_data, generated_map)
+
+    # get the map for the next new game ready
+    dungen.pregenerate(_START_MAP_NAME, _START_MAP_SEED)
 
     # init the player
     player = world.get_player()
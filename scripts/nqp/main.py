@@ -2,15 +2,18 @@ from __future__ import annotations
 
 import logging
 import sys
+import time
 import traceback
 
 import pygame
-import snecs
-from snecs.world import default_world
+from snecs.typedefs import EntityID
 
 import scripts.nqp.processors.input
-from scripts.engine import chronicle, debug, state, world
+from scripts.engine import chronicle, debug, dungen, library, state, world
+from scripts.engine.component import Aesthetic, Position
+from scripts.engine.core import queries
 from scripts.engine.core.constants import GameState
+from scripts.engine.core.scheduler import scheduler
 from scripts.engine.debug import enable_profiling, initialise_logging, kill_logging
 from scripts.engine.ui.manager import ui
 from scripts.nqp import processors
@@ -23,6 +26,9 @@ def main():
     """
     The entry for the game initialisation and game loop
     """
+    # start the map generation workers, if enabled, before the game starts any threads of its own
+    dungen.start_pregeneration()
+
     # initialise logging
     if debug.is_logging():
         initialise_logging()
@@ -50,8 +56,13 @@ def main():
     # dump any held save data
     state.dump_save_game()
 
+    # stop generating maps no one will play
+    dungen.stop_pregeneration()
+
     # we've left the game loop so now close everything down
     if debug.is_logging():
+        scheduler.log_stats()
+        queries.log_stats()
         kill_logging()
         # print debug values
         debug.print_values_to_console()
@@ -75,18 +86,13 @@ def game_loop():
 
         # get info to support UI updates and handling events
         current_state = state.get_current()
-        turn_holder = chronicle.get_turn_holder()
 
         # process any deletions from last frame
-        snecs.process_pending_deletions(default_world)
+        world.process_pending_deletions()
 
-        # have enemy take turn
-        if current_state == GameState.GAMEMAP and turn_holder != world.get_player():
-            # just in case the turn holder has died but not been replaced as expected
-            try:
-                world.take_turn(turn_holder)
-            except AttributeError:
-                chronicle.rebuild_turn_queue()
+        # have enemies take their turns
+        if current_state == GameState.GAMEMAP:
+            take_npc_turns()
 
         # update based on input events
         for event in pygame.event.get():
@@ -103,5 +109,53 @@ def game_loop():
         ui.draw()
 
 
+def take_npc_turns():
+    """
+    Have each non-player turn holder take their turn, until it is the player's turn, the game state changes, the
+    time allowed per frame is used up or a turn starts an animation the player can see. At least one turn is taken,
+    if it isnt the player's turn.
+    """
+    time_budget = library.GAME_CONFIG.performance.npc_turn_time_per_frame / 1000  # ms to seconds
+    start_time = time.perf_counter()
+    player = world.get_player()
+
+    while state.get_current() == GameState.GAMEMAP:
+        turn_holder = chronicle.get_turn_holder()
+        if turn_holder == player:
+            break
+
+        # just in case the turn holder has died but not been replaced as expected
+        try:
+            world.take_turn(turn_holder)
+        except AttributeError:
+            chronicle.rebuild_turn_queue()
+
+        if time.perf_counter() - start_time >= time_budget:
+            break
+
+        # leave the rest for later frames so the animation isnt skipped
+        if _is_animating_in_view(turn_holder):
+            break
+
+        # clear out anything killed in that turn before the next
+        world.process_pending_deletions()
+
+
+def _is_animating_in_view(entity: EntityID) -> bool:
+    """
+    Check if the entity is animating, moving or showing a sprite other than idle, on a tile the player can see.
+    """
+    if not world.entity_has_component(entity, Aesthetic) or not world.entity_has_component(entity, Position):
+        return False
+
+    aesthetic = world.get_entitys_component(entity, Aesthetic)
+    is_moving = aesthetic.draw_x != aesthetic.target_draw_x or aesthetic.draw_y != aesthetic.target_draw_y
+    if not is_moving and aesthetic.current_sprite is aesthetic.sprites.idle:
+        return False
+
+    visibility_map = world.get_game_map().visibility_map
+    return any(visibility_map[x, y] for x, y in world.get_entitys_component(entity, Position).coordinates)
+
+
 if __name__ == "__main__":  # prevents being run from other modules
     main()
@@ -0,0 +1,117 @@
+from typing import List
+
+from snecs.typedefs import EntityID
+
+from scripts.engine import chronicle, world
+from scripts.engine.action import Affliction
+from scripts.engine.component import Afflictions, Identity, Knowledge, Position, Tracked
+from scripts.engine.core.data import store
+from scripts.engine.effect import Effect
+from scripts.engine.systems import activation
+
+
+class MockSkill:
+    key = "mock_skill"
+
+
+class MockAffliction(Affliction):
+    name = "mock_affliction"
+    identity_tags = []
+    triggers = []
+    target_tags = []
+
+    def build_effects(self, entity: EntityID, potency: float = 1.0) -> List[Effect]:
+        return []
+
+
+class TestActivation:
+
+    @staticmethod
+    def _create_sleeper(components: list) -> EntityID:
+        entity = world.create_entity([Identity("mock_sleeper"), Tracked(0)] + components)
+        activation.sleep(entity)
+        return entity
+
+    @staticmethod
+    def _delete(entity: EntityID):
+        store.sleeping_entities.pop(entity, None)
+        chronicle.remove_from_turn_queue(entity)
+        world.delete(entity)
+        world.process_pending_deletions()
+
+    def test_catch_up_cooldowns(self):
+        """
+        Test skill cooldowns are reduced by the rounds slept, to no less than 0
+        """
+        knowledge = Knowledge([MockSkill], cooldowns={"mock_skill": 3})
+        entity = world.create_entity([Identity("mock_sleeper"), knowledge])
+
+        activation._catch_up_rounds(entity, 2)
+        assert knowledge.cooldowns["mock_skill"] == 1
+
+        activation._catch_up_rounds(entity, 5)
+        assert knowledge.cooldowns["mock_skill"] == 0
+
+        self._delete(entity)
+
+    def test_catch_up_afflictions(self):
+        """
+        Test affliction durations are reduced by the rounds slept, the affliction being removed in the round after its
+        duration reaches 0, as it would be at the end of each round
+        """
+        entity = world.create_entity([Identity("mock_sleeper")])
+        kept, expired = MockAffliction(entity, entity, 2), MockAffliction(entity, entity, 2)
+        afflictions = Afflictions([kept, expired])
+        world.add_component(entity, afflictions)
+
+        activation._catch_up_rounds(entity, 2)
+        assert afflictions.active == [kept, expired] and kept.duration == 0
+
+        afflictions.remove(kept)
+        activation._catch_up_rounds(entity, 1)
+        assert afflictions.active == []
+
+        # the same result in one step as one round at a time
+        affliction = MockAffliction(entity, entity, 2)
+        afflictions.add(affliction)
+        activation._catch_up_rounds(entity, 3)
+        assert afflictions.active == []
+
+        self._delete(entity)
+
+    def test_sleep_and_wake(self):
+        """
+        Test sleeping leaves the turn queue and waking catches up the rounds slept and rejoins the queue no earlier
+        than the last turn
+        """
+        knowledge = Knowledge([MockSkill], cooldowns={"mock_skill": 3})
+        entity = self._create_sleeper([knowledge])
+        assert activation.is_asleep(entity) and entity not in chronicle.get_turn_queue()
+
+        round_, time_of_last_turn = store.round, store.time_of_last_turn
+        store.round, store.time_of_last_turn = round_ + 2, time_of_last_turn + 50
+        try:
+            activation.wake(entity)
+            assert not activation.is_asleep(entity)
+            assert knowledge.cooldowns["mock_skill"] == 1
+            assert chronicle.get_turn_queue()[entity] >= chronicle.get_time_of_last_turn()
+            assert world.get_entitys_component(entity, Tracked).time_spent == chronicle.get_time_of_last_turn()
+        finally:
+            store.round, store.time_of_last_turn = round_, time_of_last_turn
+            self._delete(entity)
+
+    def test_distance_uses_nearest_tile(self):
+        """
+        Test the distance used to sleep an entity agrees with the area checked to wake it, for large entities
+        """
+        player_pos = Position((20, 10))
+        entity = world.create_entity([Identity("mock_large"), Position((8, 10), (9, 10), (8, 11), (9, 11))])
+        entity_pos = world.get_entitys_component(entity, Position)
+
+        for sleep_distance in range(8, 13):
+            start_pos = (player_pos.x - sleep_distance, player_pos.y - sleep_distance)
+            size = (sleep_distance * 2) + 1
+            in_wake_area = entity in world.get_entities_in_rect(start_pos, size, size)
+            assert in_wake_area == (activation._get_distance(player_pos, entity_pos) <= sleep_distance)
+
+        self._delete(entity)
@@ -0,0 +1,43 @@
+from scripts.engine import chronicle, world
+from scripts.engine.component import Identity, Tracked
+from scripts.engine.core.data import store
+
+
+class TestChronicle:
+
+    def test_turn_queue_order(self):
+        """
+        Test the turn queue gives the entity with the least time spent, following updates and removals
+        """
+        chronicle.set_turn_queue({1: 10, 2: 5, 3: 5})
+        assert chronicle._get_next_entity_in_queue() == 2
+
+        chronicle.add_to_turn_queue(2, 20)
+        assert chronicle._get_next_entity_in_queue() == 3
+
+        chronicle.remove_from_turn_queue(3)
+        assert chronicle._get_next_entity_in_queue() == 1
+
+        chronicle.add_to_turn_queue(4, 1)
+        assert chronicle._get_next_entity_in_queue() == 4
+
+        chronicle.set_turn_queue({})
+
+    def test_rebuild_turn_queue_skips_sleepers(self):
+        """
+        Test rebuilding the turn queue leaves out sleeping entities, so waking them doesnt queue them twice
+        """
+        awake = world.create_entity([Identity("mock_awake"), Tracked(5)])
+        asleep = world.create_entity([Identity("mock_asleep"), Tracked(3)])
+        store.sleeping_entities[asleep] = chronicle.get_round()
+
+        try:
+            chronicle.rebuild_turn_queue()
+            assert awake in chronicle.get_turn_queue()
+            assert asleep not in chronicle.get_turn_queue()
+        finally:
+            store.sleeping_entities.pop(asleep, None)
+            world.delete(awake)
+            world.delete(asleep)
+            world.process_pending_deletions()
+            chronicle.set_turn_queue({})
@@ -1,8 +1,9 @@
 from typing import List, Tuple
 
+import numpy as np
 import pytest  # type: ignore
 
-from scripts.engine.component import Position
+from scripts.engine.component import FOV, Position
 
 
 class TestPosition:
@@ -42,3 +43,49 @@ class TestPosition:
         """
         pos = Position(*coordinates)
         assert pos.get_outermost(direction) == expected
+
+    def test_position_set(self):
+        """
+        Test the Position coordinates and contains follow a set, for single and multiple tile positions
+        """
+        single = Position((1, 1))
+        single.set(3, 4)
+        assert single.coordinates == ((3, 4),)
+        assert (3, 4) in single and (1, 1) not in single
+        assert single.get_outermost((1, 0)) == (3, 4)
+
+        multiple = Position((1, 1), (2, 1))
+        multiple.set(3, 4)
+        assert set(multiple.coordinates) == {(3, 4), (4, 4)}
+        assert (4, 4) in multiple and (2, 1) not in multiple
+        assert multiple.get_outermost((1, 0)) == (4, 4)
+
+
+class TestFOV:
+    @pytest.mark.parametrize("is_packed", [False, True])
+    def test_fov_window(self, is_packed: bool):
+        """
+        Test the FOV only holds the window but answers for the whole map
+        """
+        fov_map = np.zeros((20, 10), dtype=bool)
+        fov_map[4:7, 2:4] = True
+        fov_map[5, 3] = False
+        fov = FOV(fov_map, is_packed)
+
+        assert fov.start == (4, 2)
+        assert fov.window.shape == (3, 2)
+        assert np.array_equal(fov.map, fov_map)
+        assert fov.is_in_fov((4, 2)) and fov.is_in_fov((6, 3))
+        assert not fov.is_in_fov((5, 3)) and not fov.is_in_fov((0, 0)) and not fov.is_in_fov((19, 9))
+
+    @pytest.mark.parametrize("is_packed", [False, True])
+    def test_fov_serialisation(self, is_packed: bool):
+        """
+        Test the FOV survives serialisation
+        """
+        fov_map = np.zeros((8, 8), dtype=bool)
+        fov_map[1:4, 2:7] = True
+        fov = FOV.deserialize(FOV(fov_map, is_packed).serialize())
+
+        assert fov.is_packed == is_packed
+        assert np.array_equal(fov.map, fov_map)
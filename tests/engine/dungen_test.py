@@ -0,0 +1,165 @@
+import dataclasses
+import os
+import pickle
+import random
+import sys
+import zlib
+
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from scripts.engine import dungen, library
+from scripts.engine.core.constants import TileCategory
+
+
+class TestDungen:
+
+    @pytest.fixture(autouse=True)
+    def _no_map_cache(self, tmp_path, monkeypatch):
+        """
+        Keep the map cache off, and away from the real one, unless a test turns it on
+        """
+        monkeypatch.setattr(dungen, "MAP_CACHE_PATH", tmp_path)
+        monkeypatch.setattr(library.GAME_CONFIG.performance, "map_cache_size", 0)
+
+    def test_wall_counts_match_map(self):
+        """
+        Test the wall counts kept while generating match counting the walls around each tile of the finished map
+        """
+        generator = dungen.DungeonGenerator(random.Random(1), library.MAPS["cave"])
+        for _ in dungen._generate_map_in_steps(generator):
+            pass
+
+        categories = generator.map_of_categories
+        width, height = categories.shape
+
+        def _is_wall(x, y, outer_ring_is_wall):
+            if not (0 <= x < width and 0 <= y < height):
+                return True
+            if outer_ring_is_wall and not generator.is_in_bounds(x, y):
+                return True
+            return categories[x, y] == TileCategory.WALL
+
+        for x in range(width):
+            for y in range(height):
+                neighbours = [(x + i, y + j) for i in (-1, 0, 1) for j in (-1, 0, 1) if (i, j) != (0, 0)]
+                adjacents = [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]
+
+                assert generator.count_neighbouring_walls(x, y) == sum(_is_wall(*pos, False) for pos in neighbours)
+                assert generator.count_adjacent_walls(x, y) == sum(_is_wall(*pos, True) for pos in adjacents)
+
+        assert generator.is_in_border(0, 0) and not generator.is_in_border(width // 2, height // 2)
+        assert not generator.is_in_border(-1, 0) and not generator.is_in_room(-1, 0)
+
+    def test_rooms_accessible(self):
+        """
+        Test every room can be reached from every other, only moving cardinally
+        """
+        for seed in range(5):
+            generator = dungen.DungeonGenerator(random.Random(seed), library.MAPS["cave"])
+            for _ in dungen._generate_map_in_steps(generator):
+                pass
+
+            labels, _ = ndimage.label(generator.bools_map)
+            room_labels = {labels[room.centre_x, room.centre_y] for room in generator.placed_rooms}
+
+            assert len(room_labels) == 1 and 0 not in room_labels
+
+    def test_free_room_positions_match_intersects(self):
+        """
+        Test the free room positions are exactly those where a room wouldnt intersect a placed room
+        """
+        generator = dungen.DungeonGenerator(random.Random(1), library.MAPS["cave"])
+        for _ in dungen._generate_map_in_steps(generator):
+            pass
+
+        rooms = generator.placed_rooms
+        assert all(not room.intersects(other) for i, room in enumerate(rooms) for other in rooms[i + 1 :])
+
+        room = dungen.RoomConcept([[TileCategory.FLOOR] * 4] * 3, "square", "mock_room")
+        free_positions = generator.get_free_room_positions(room.width, room.height)
+        for x in range(generator.map_data.width):
+            for y in range(generator.map_data.height):
+                room.start_x, room.start_y = x, y
+                assert free_positions[x, y] == (not any(room.intersects(other) for other in rooms))
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="maps are only pregenerated on linux")
+    def test_pregenerated_map_matches_generated(self):
+        """
+        Test a map generated in a worker process matches the same map generated here, and survives pickling
+        """
+        performance = library.GAME_CONFIG.performance
+        workers, held_ready = performance.map_generation_workers, performance.maps_held_ready
+        performance.map_generation_workers, performance.maps_held_ready = 1, 1
+
+        try:
+            dungen.start_pregeneration()
+            dungen.pregenerate("cave", 3)
+            pregenerated_map = dungen.get_generated_map("cave", 3)
+        finally:
+            dungen.stop_pregeneration()
+            performance.map_generation_workers, performance.maps_held_ready = workers, held_ready
+
+        generated_map = pickle.loads(pickle.dumps(dungen.generate_map("cave", 3)))
+
+        assert np.array_equal(pregenerated_map.map_of_categories, generated_map.map_of_categories)
+        assert pregenerated_map.placed_rooms == generated_map.placed_rooms
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="maps are only pregenerated on linux")
+    def test_pregenerate_drops_oldest(self, monkeypatch):
+        """
+        Test pregenerating more maps than are held ready drops the oldest, rather than ignoring the new map
+        """
+        performance = library.GAME_CONFIG.performance
+        monkeypatch.setattr(performance, "map_generation_workers", 1)
+        monkeypatch.setattr(performance, "maps_held_ready", 1)
+
+        try:
+            dungen.start_pregeneration()
+            dungen.pregenerate("cave", 1)
+            dungen.pregenerate("cave", 2)
+            dungen.pregenerate("cave", 2)
+            assert [seed for seed, _, _ in dungen._pregenerated_maps["cave"]] == [2]
+        finally:
+            dungen.stop_pregeneration()
+
+    def test_map_cache(self, tmp_path, monkeypatch):
+        """
+        Test cached maps load as they were generated, are missed when the data changes and the least recently used
+        are removed to keep the cache in its size
+        """
+        monkeypatch.setattr(library.GAME_CONFIG.performance, "map_cache_size", 10240)
+
+        generated_map = dungen.generate_map("cave", 5)
+        cached_map = dungen.generate_map("cave", 5)
+
+        assert cached_map is not generated_map
+        assert np.array_equal(cached_map.map_of_categories, generated_map.map_of_categories)
+        assert cached_map.placed_rooms == generated_map.placed_rooms
+
+        # a cache of 1 kilobyte only has room for the newest couple of maps
+        monkeypatch.setattr(library.GAME_CONFIG.performance, "map_cache_size", 1)
+        for seed in (6, 7, 8):
+            dungen.generate_map("cave", seed)
+
+        cached_files = [file.name for file in tmp_path.iterdir()]
+        assert sum(file.stat().st_size for file in tmp_path.iterdir()) <= 1024
+        assert os.path.basename(dungen._get_cached_map_path("cave", 8)) in cached_files
+        assert os.path.basename(dungen._get_cached_map_path("cave", 5)) not in cached_files
+
+        # a file that doesnt hold a map is generated again
+        path = dungen._get_cached_map_path("cave", 8)
+        with open(path, "wb") as file:
+            file.write(
+                dungen._MAP_CACHE_HEADER.pack(b"NQPM", dungen._MAP_CACHE_FORMAT, 1, 1) + zlib.compress(b"\x00[1]")
+            )
+        assert dungen.generate_map("cave", 8).placed_rooms
+
+        # changing the generator or the data means a different file
+        with monkeypatch.context() as patch:
+            patch.setattr(dungen, "_GENERATOR_HASH", "mock_hash")
+            assert dungen._get_cached_map_path("cave", 8) != path
+        with monkeypatch.context() as patch:
+            patch.setitem(library.MAPS, "cave", dataclasses.replace(library.MAPS["cave"], max_rooms=1))
+            assert dungen._get_cached_map_path("cave", 8) != path
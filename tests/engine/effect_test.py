@@ -1,20 +1,30 @@
 
 from typing import List
+
+import numpy as np
 from snecs.typedefs import EntityID
 
-from scripts.engine import world
-from scripts.engine.action import Affliction, Skill
+from scripts.engine import library, world
+from scripts.engine.action import Affliction, Skill, skill_registry
 from scripts.engine.component import Aesthetic, Afflictions, Identity, Knowledge, Position
 from scripts.engine.core.constants import (
     AfflictionTrigger,
     Direction,
     EffectType,
+    HitType,
     Resource,
     Shape,
     TargetingMethod,
     TargetTag,
 )
-from scripts.engine.effect import Effect, ReduceSkillCooldownEffect, TriggerAfflictionsEffect
+from scripts.engine.effect import (
+    DamageEffect,
+    Effect,
+    EffectTemplate,
+    MoveActorEffect,
+    ReduceSkillCooldownEffect,
+    TriggerAfflictionsEffect,
+)
 from tests.mocks import world_mock
 
 
@@ -83,6 +93,19 @@ class MockSkill(Skill):
         pass
 
 
+class MockEffect(Effect):
+    __slots__ = ("name", "log")
+
+    def __init__(self, name, log):
+        super().__init__(0, [], [])
+        self.name = name
+        self.log = log
+
+    def evaluate(self):
+        self.log.append(self.name)
+        return []
+
+
 class TestEffects:
 
     @staticmethod
@@ -114,6 +137,25 @@ class TestEffects:
 
         assert affliction_called == mock_affliction_movement
 
+    def test_affliction_triggers_only_created_with_listeners(self):
+        """
+        Test the trigger afflictions effect is only created when the target has an affliction with that trigger
+        """
+        entity = TestEffects._create_default_entity()
+        afflictions = Afflictions()
+        world.add_component(entity, afflictions)
+        effect = ReduceSkillCooldownEffect(entity, entity, "mock_skill", 5, [], [])
+
+        assert effect._create_affliction_triggers(AfflictionTrigger.MOVEMENT, entity) == []
+
+        mock_affliction_movement = MockAfflictionMovement(entity, entity, 5)
+        afflictions.add(mock_affliction_movement)
+        triggers = effect._create_affliction_triggers(AfflictionTrigger.MOVEMENT, entity)
+
+        assert len(triggers) == 1 and isinstance(triggers[0], TriggerAfflictionsEffect)
+        assert afflictions.get_triggered(AfflictionTrigger.MOVEMENT) == [mock_affliction_movement]
+        assert not afflictions.has_trigger(AfflictionTrigger.TAKE_DAMAGE)
+
     def test_reduce_skill_cooldown_effect(self):
         """
         Test for the reduce skill cooldown effect
@@ -128,3 +170,122 @@ class TestEffects:
         effect.evaluate()
 
         assert knowledge.cooldowns["mock_skill"] == 10
+
+    def test_effect_template(self):
+        """
+        Test effects built from a template bind the use's values and scale the potency params
+        """
+        move_template = EffectTemplate(MoveActorEffect, {"direction": None, "move_amount": 1})
+        cooldown_template = EffectTemplate(
+            ReduceSkillCooldownEffect,
+            {"skill_name": "mock_skill", "amount": 4},
+            potency_params=["amount"],
+            success_templates=[move_template],
+        )
+
+        effect = cooldown_template.build(1, 2, 0.5, direction=Direction.UP)
+
+        assert isinstance(effect, ReduceSkillCooldownEffect)
+        assert (effect.origin, effect.target, effect.amount) == (1, 2, 2)
+
+        move_effect = effect.success_effects[0]
+        assert isinstance(move_effect, MoveActorEffect)
+        assert (move_effect.target, move_effect.direction, move_effect.move_amount) == (2, Direction.UP, 1)
+
+        # the template is unchanged by a build
+        assert cooldown_template.build(1, 3).amount == 4
+
+    def test_batched_damage_matches_single(self):
+        """
+        Test the damage worked out for many attacks at once matches that worked out for each attack alone
+        """
+        hit_types_data = library.GAME_CONFIG.hit_types
+        to_hit_scores = [hit_types_data.crit.value, hit_types_data.hit.value, hit_types_data.hit.value - 1]
+        hit_types = [HitType.CRIT, HitType.HIT, HitType.GRAZE]
+        base_damages = [10, 7, 3]
+        mod_values = [2, 3, 1]
+        resist_values = [1, 4, 9]
+
+        damages = world.calculate_damages(
+            np.array(base_damages), np.array(mod_values), np.array(resist_values), np.array(to_hit_scores)
+        )
+
+        for i, hit_type in enumerate(hit_types):
+            assert damages[i] == world.calculate_damage(base_damages[i], mod_values[i], resist_values[i], hit_type)
+
+    def test_resolve_effects_order(self, monkeypatch):
+        """
+        Test effects are resolved last first, each effect's resulting effects before the rest, with only damage
+        effects next to each other in the same stack batched together
+        """
+        log = []
+        targets = [TestEffects._create_default_entity() for _ in range(7)]
+        self._mock_evaluate_batch(monkeypatch, log, targets)
+        _damage = self._create_damage_effect_factory(targets)
+
+        following_effects = [MockEffect("c", log), _damage(4), _damage(5)]
+        effect_lists = [
+            [_damage(1), MockEffect("a", log)],
+            [_damage(2)],
+            [_damage(3, following_effects), MockEffect("b", log), _damage(6)],
+        ]
+        world._resolve_effects(effect_lists)
+
+        assert log == ["a", (1, 2, 6), "b", (3,), (5, 4), "c"]
+
+    def test_resolve_effects_keeps_target_order(self, monkeypatch):
+        """
+        Test damage effects with effects following them, or whose target has afflictions triggered by damage, arent
+        batched, so each target is resolved in full before the next as if nothing were batched
+        """
+        log = []
+        targets = [TestEffects._create_default_entity() for _ in range(7)]
+        self._mock_evaluate_batch(monkeypatch, log, targets)
+        _damage = self._create_damage_effect_factory(targets)
+
+        world.add_component(targets[5], Afflictions([MockAfflictionDamage(targets[5], targets[5], 5)]))
+        effects = [_damage(1), _damage(2), _damage(3, [MockEffect("a", log)]), _damage(4), _damage(5), _damage(6)]
+        world._resolve_effects([effects])
+
+        assert log == [(6,), (5,), (4,), (3,), "a", (2, 1)]
+
+    @staticmethod
+    def _mock_evaluate_batch(monkeypatch, log, targets):
+        """
+        Replace evaluate_batch with one that logs the index of each target in the batch
+        """
+
+        def _evaluate_batch_mock(damage_effects):
+            log.append(tuple(targets.index(effect.target) for effect in damage_effects))
+            return [list(effect.success_effects) for effect in damage_effects]
+
+        monkeypatch.setattr(DamageEffect, "evaluate_batch", staticmethod(_evaluate_batch_mock))
+
+    @staticmethod
+    def _create_damage_effect_factory(targets):
+        """
+        Get a function to create a damage effect against the target at the index given
+        """
+
+        def _damage(target, success_effects=None):
+            return DamageEffect(
+                0, targets[target], success_effects or [], [], "mock_stat", 0, 0, "mock_type", "mock_stat", 0
+            )
+
+        return _damage
+
+    def test_effect_templates_follow_library(self, monkeypatch):
+        """
+        Test effect templates are compiled again once the library data changes, so config values arent stale
+        """
+        import scripts.nqp.actions.skills  # noqa: F401, registers the skills
+
+        basic_attack = skill_registry["basic_attack"]
+        damage = basic_attack._get_effect_templates()[0].build(1, 2).damage
+        assert damage == library.GAME_CONFIG.base_values.damage
+
+        monkeypatch.setattr(library.GAME_CONFIG.base_values, "damage", damage + 5)
+        assert basic_attack._get_effect_templates()[0].build(1, 2).damage == damage
+
+        monkeypatch.setattr(library, "DATA_VERSION", library.DATA_VERSION + 1)
+        assert basic_attack._get_effect_templates()[0].build(1, 2).damage == damage + 5
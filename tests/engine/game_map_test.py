@@ -0,0 +1,129 @@
+import random
+
+import numpy as np
+
+from scripts.engine import library, world
+from scripts.engine.component import Blocking, Identity, Position
+from scripts.engine.core.constants import TileCategory
+from scripts.engine.core.data import store
+from scripts.engine.world_objects.tile import Tile
+from tests.mocks import game_map_mock
+
+
+class TestGameMap:
+
+    def test_tile_types(self):
+        """
+        Test tile types are shared between tiles with the same details, and tiles read and write the map's arrays
+        """
+        game_map = game_map_mock.create_game_map(1)
+        sprite_paths = library.MAPS["cave"].sprite_paths
+        floor_index = game_map.get_tile_type_index(sprite_paths[TileCategory.FLOOR])
+        wall_index = game_map.get_tile_type_index(sprite_paths[TileCategory.WALL], True, True)
+        assert len(game_map.tile_types) == 2
+
+        is_wall = game_map.tile_type_map == wall_index
+        assert np.array_equal(game_map.blocks_sight_map, is_wall)
+        assert np.array_equal(game_map.blocks_movement_map, is_wall)
+
+        x, y = np.argwhere(~is_wall)[0]
+        tile = Tile(game_map, int(x), int(y))
+        assert tile == Tile(game_map, int(x), int(y)) and tile.tile_type is game_map.tile_types[floor_index]
+        assert not tile.blocks_sight and not tile.blocks_movement
+
+        tile.blocks_sight = True
+        tile.is_visible = True
+        assert game_map.blocks_sight_map[x, y] and game_map.visibility_map[x, y]
+        assert tile.blocks_sight and tile.is_visible
+
+    def test_layers_follow_entities_and_tiles(self, monkeypatch):
+        """
+        Test the transparency, walkable and occupancy layers match working them out from scratch as blocking
+        entities are created, moved and deleted and tiles are changed
+        """
+        game_map = game_map_mock.create_game_map(2)
+        monkeypatch.setattr(store, "current_game_map", game_map)
+        rng = random.Random(2)
+
+        def _random_position():
+            return rng.randrange(game_map.width - 1), rng.randrange(game_map.height - 1)
+
+        entities = []
+        for i in range(30):
+            x, y = _random_position()
+            positions = [(x, y), (x + 1, y)] if i % 5 == 0 else [(x, y)]
+            blocking = Blocking(blocks_movement=rng.random() < 0.7, blocks_sight=rng.random() < 0.5)
+            entities.append(world.create_entity([Identity("mock_blocker"), Position(*positions), blocking]))
+
+        for _ in range(200):
+            transparency, transparency_version = game_map.transparency_map.copy(), game_map.transparency_version
+            choice = rng.random()
+            if choice < 0.6:
+                world.get_entitys_component(rng.choice(entities), Position).set(*_random_position())
+            elif choice < 0.7 and len(entities) > 10:
+                entity = entities.pop(rng.randrange(len(entities)))
+                world.delete(entity)
+                world.process_pending_deletions()
+            else:
+                tile = Tile(game_map, *_random_position())
+                tile.blocks_sight, tile.blocks_movement = rng.random() < 0.5, rng.random() < 0.5
+
+            sight_blockers = np.zeros((game_map.width, game_map.height), dtype=int)
+            movement_blockers = np.zeros_like(sight_blockers)
+            occupancy = np.zeros_like(sight_blockers)
+            for entity in entities:
+                blocking = world.get_entitys_component(entity, Blocking)
+                for x, y in world.get_entitys_component(entity, Position).coordinates:
+                    sight_blockers[x, y] += blocking.blocks_sight
+                    movement_blockers[x, y] += blocking.blocks_movement
+                    occupancy[x, y] += 1
+
+            assert np.array_equal(game_map.transparency_map, ~game_map.blocks_sight_map & (sight_blockers == 0))
+            assert np.array_equal(game_map.walkable_map, ~game_map.blocks_movement_map & (movement_blockers == 0))
+            assert np.array_equal(game_map.occupancy_map, occupancy)
+
+            # the version only moves on when the transparency does
+            has_changed = not np.array_equal(transparency, game_map.transparency_map)
+            assert game_map.has_transparency_changed(transparency_version, (0, 0), 0) == has_changed
+
+        for entity in entities:
+            world.delete(entity)
+        world.process_pending_deletions()
+        assert not game_map.occupancy_map.any()
+
+    def test_light_counts(self):
+        """
+        Test the light counts and light map match adding up the areas lit by each source from scratch, as sources
+        are lit, moved and removed, and lit areas go out of date when the transparency in range changes
+        """
+        game_map = game_map_mock.create_game_map(5)
+        rng, np_rng = random.Random(5), np.random.default_rng(5)
+        lit_areas = {}
+
+        for _ in range(100):
+            entity = rng.randrange(8)
+            if rng.random() < 0.2:
+                game_map.remove_lit_area(entity)
+                lit_areas.pop(entity, None)
+            else:
+                centre = (rng.randrange(game_map.width), rng.randrange(game_map.height))
+                radius = rng.randrange(1, 8)
+                window = game_map.get_window(centre, radius)
+                lit = np_rng.random(game_map.light_counts[window].shape) < 0.5
+                game_map.set_lit_area(entity, centre, radius, lit)
+                lit_areas[entity] = (window, lit)
+                assert game_map.is_lit_area_current(entity, centre, radius)
+                assert not game_map.is_lit_area_current(entity, centre, radius + 1)
+
+            light_counts = np.zeros((game_map.width, game_map.height), dtype=int)
+            for window, lit in lit_areas.values():
+                light_counts[window] += lit
+            assert np.array_equal(game_map.light_counts, light_counts)
+            assert np.array_equal(game_map.light_map, light_counts > 0)
+            assert sorted(game_map.get_lighting_entities()) == sorted(lit_areas)
+
+        # a transparency change in range puts the lit area out of date
+        game_map.set_lit_area(0, (20, 20), 3, np.ones((7, 7), dtype=bool))
+        tile = Tile(game_map, 21, 22)
+        tile.blocks_sight = not tile.blocks_sight
+        assert not game_map.is_lit_area_current(0, (20, 20), 3)
@@ -0,0 +1,19 @@
+from scripts.engine import library
+from scripts.engine.core.constants import PrimaryStat
+
+
+class TestLibrary:
+
+    def test_trait_stat_totals(self):
+        """
+        Test the trait stat totals match the sum of each trait's stats, whatever the order of the names
+        """
+        trait_names = list(library.TRAITS)[:2]
+        totals = library.get_trait_stat_totals(trait_names)
+        reversed_totals = library.get_trait_stat_totals(reversed(trait_names))
+
+        assert totals is reversed_totals
+        for stat in (PrimaryStat.VIGOUR, PrimaryStat.CLOUT, PrimaryStat.BUSTLE):
+            assert totals[stat] == sum(getattr(library.TRAITS[name], stat) for name in trait_names)
+
+        assert library.get_trait_stat_totals([])[PrimaryStat.VIGOUR] == 0
@@ -0,0 +1,39 @@
+import pytest
+
+from scripts.engine import world
+from scripts.engine.component import Identity, Position
+from scripts.engine.core import queries
+from scripts.engine.core.queries import CachedQuery
+
+
+class TestQueries:
+
+    @pytest.fixture
+    def query(self):
+        """
+        A cached query for the test, removed from the module's queries afterwards
+        """
+        query = CachedQuery("mock_identity_and_position", [Identity, Position])
+        yield query
+        queries._cached_queries.remove(query)
+
+    def test_cached_query_rebuilds_on_structural_change(self, query):
+        """
+        Test a cached query reuses its results until an entity is created, a component added or an entity deleted
+        """
+        entity = world.create_entity([Identity("mock_entity")])
+
+        assert entity not in [found for found, _ in query]
+        rebuilds = query.rebuilds
+        list(query)
+        assert query.rebuilds == rebuilds and query.hits > 0
+
+        world.add_component(entity, Position((0, 0)))
+        assert entity in [found for found, _ in query]
+        assert query.rebuilds == rebuilds + 1
+
+        world.delete(entity)
+        world.process_pending_deletions()
+        assert entity not in [found for found, _ in query]
+
+        assert queries.get_stats()["mock_identity_and_position"] == (query.hits, query.rebuilds)
@@ -0,0 +1,38 @@
+from scripts.engine.core.constants import SystemTrigger
+from scripts.engine.core.scheduler import Scheduler
+
+
+class MockComponent:
+    pass
+
+
+class TestScheduler:
+
+    def test_triggers(self):
+        """
+        Test systems only run when one of their triggers has happened, and their runs are recorded
+        """
+        scheduler = Scheduler()
+        runs = []
+        scheduler.register("player", lambda: runs.append("player"), [SystemTrigger.PLAYER_TURN])
+        scheduler.register("round", lambda: runs.append("round"), [SystemTrigger.ROUND_END])
+        scheduler.register("every_2", lambda: runs.append("every_2"), [SystemTrigger.EVERY_N_TURNS], interval=2)
+        scheduler.register("sight", lambda: runs.append("sight"), [SystemTrigger.SIGHT_CHANGE])
+        scheduler.register(
+            "dirty", lambda: runs.append("dirty"), [SystemTrigger.DIRTY_COMPONENTS], components=[MockComponent]
+        )
+
+        scheduler.process_turn(is_player_turn=False)
+        assert runs == []
+
+        scheduler.mark_round_end()
+        scheduler.mark_dirty(MockComponent)
+        scheduler.mark_sight_changed()
+        scheduler.process_turn(is_player_turn=True)
+        assert runs == ["player", "round", "every_2", "sight", "dirty"]
+
+        runs.clear()
+        scheduler.process_turn(is_player_turn=False)
+        assert runs == []
+
+        assert scheduler.get_stats()["player"][0] == 1
@@ -0,0 +1,76 @@
+from scripts.engine.component import Position
+from scripts.engine.world_objects.spatial_index import SpatialIndex
+
+
+class TestSpatialIndex:
+    def test_get_entities(self):
+        """
+        Test entities are found on each tile they occupy
+        """
+        index = SpatialIndex()
+        index.add(1, [(0, 0), (1, 0)])
+        index.add(2, [(1, 0)])
+
+        assert index.get_entities((0, 0)) == [1]
+        assert index.get_entities((1, 0)) == [1, 2]
+        assert index.get_entities((5, 5)) == []
+
+    def test_move_and_remove(self):
+        """
+        Test moving an entity clears its old tiles and removing clears all of them
+        """
+        index = SpatialIndex()
+        index.add(1, [(0, 0)])
+        index.move(1, [(3, 3)])
+
+        assert index.get_entities((0, 0)) == []
+        assert index.get_entities((3, 3)) == [1]
+
+        index.remove(1)
+        assert index.get_entities((3, 3)) == []
+        assert 1 not in index
+
+    def test_range_queries(self):
+        """
+        Test rect and radius queries return each entity once
+        """
+        index = SpatialIndex()
+        index.add(1, [(2, 2), (3, 2)])
+        index.add(2, [(6, 6)])
+        index.add(3, [(2, 5)])
+
+        assert index.get_entities_in_rect(0, 0, 4, 4) == [1]
+        assert set(index.get_entities_in_rect(0, 0, 10, 10)) == {1, 2, 3}
+        assert set(index.get_entities_in_radius((2, 2), 3)) == {1, 3}
+        assert index.get_entities_in_radius((6, 6), 0) == [2]
+
+    def test_position_set_updates_index(self):
+        """
+        Test a Position linked to the index keeps it up to date when set
+        """
+        index = SpatialIndex()
+        position = Position((1, 1), (2, 1))
+        position.entity = 1
+        position.spatial_index = index
+        index.add(1, position.coordinates)
+
+        position.set(4, 4)
+
+        assert index.get_entities((1, 1)) == []
+        assert index.get_entities((4, 4)) == [1]
+        assert index.get_entities((5, 4)) == [1]
+
+    def test_listeners(self):
+        """
+        Test listeners are told the entity's tiles on add and move, and no tiles on remove
+        """
+        index = SpatialIndex()
+        changes = []
+        index.add_listener(lambda entity, tiles: changes.append((entity, tiles)))
+
+        index.add(1, [(0, 0)])
+        index.move(1, [(1, 0)])
+        index.remove(1)
+        index.remove(1)
+
+        assert changes == [(1, [(0, 0)]), (1, [(1, 0)]), (1, [])]
@@ -26,3 +26,16 @@ class TestUtility:
         """
         coordinates = utility.get_coords_from_shape(shape, size, direction)
         assert set(coordinates) == set(expected)
+
+    @pytest.mark.parametrize("shape, size, direction, expected", test_get_coordinates_from_shape_parameters)
+    def test_get_shape_template(self, shape: ShapeType, size: int, direction: Tuple[int, int],
+                                expected: List[Tuple[int, int]]):
+        """
+        Test the shape template's offsets and mask cover the shape's coordinates, and the template is reused
+        """
+        template = utility.get_shape_template(shape, size, direction)
+        radius = template.radius
+
+        assert set(map(tuple, template.offsets.tolist())) == set(expected)
+        assert {(x - radius, y - radius) for x, y in zip(*template.mask.nonzero())} == set(expected)
+        assert utility.get_shape_template(shape, size, direction) is template
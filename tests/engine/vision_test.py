@@ -0,0 +1,116 @@
+from functools import partial
+from types import SimpleNamespace
+
+import numpy as np
+import tcod
+
+from scripts.engine import library, world
+from scripts.engine.component import FOV, HasCombatStats, Identity, IsPlayer, LightSource, Position
+from scripts.engine.core.constants import FOV_ALGORITHM, FOV_LIGHT_WALLS
+from scripts.engine.core.data import store
+from scripts.engine.systems import vision
+from scripts.engine.world_objects.tile import Tile
+from tests.mocks import game_map_mock
+
+
+class TestVision:
+
+    def test_windowed_fov_matches_whole_map(self):
+        """
+        Test fov computed over only the window in range matches fov computed over the whole map, including at the
+        map's edges
+        """
+        game_map = game_map_mock.create_game_map(3)
+        transparency = game_map.transparency_map
+
+        centres = [(0, 0), (1, 38), (20, 20), (39, 39), (39, 5), (12, 0)]
+        for centre in centres:
+            for radius in (0, 1, 4, 9, 25):
+                full_fov = tcod.map.compute_fov(transparency, centre, radius, FOV_LIGHT_WALLS, FOV_ALGORITHM)
+
+                window = game_map.get_window(centre, radius)
+                windowed_fov = np.zeros_like(full_fov)
+                windowed_fov[window] = vision._compute_fov(transparency, window, centre, radius)
+
+                assert np.array_equal(windowed_fov, full_fov), (centre, radius)
+
+    def test_fov_calculated_when_read(self, monkeypatch):
+        """
+        Test fov marked out of date is only recalculated when read, and stays current until it moves or the
+        transparency changes within its sight range
+        """
+        game_map = game_map_mock.create_game_map(4)
+        monkeypatch.setattr(store, "current_game_map", game_map)
+        centre, sight_range = (20, 20), 5
+        game_map.blocks_sight_map[centre] = False
+        game_map.refresh_tile_layers(*centre)
+
+        fov = FOV()
+        pos = Position(centre)
+        fov.pending_update = partial(vision._calculate_fov, fov, pos, sight_range)
+        assert fov.calculated_with is None
+
+        full_fov = tcod.map.compute_fov(game_map.transparency_map, centre, sight_range, FOV_LIGHT_WALLS, FOV_ALGORITHM)
+        assert np.array_equal(fov.map, full_fov)
+        assert fov.pending_update is None and vision._is_fov_current(fov, pos, sight_range)
+
+        # a change out of range doesnt matter, one in range does
+        far_tile = Tile(game_map, 35, 35)
+        far_tile.blocks_sight = not far_tile.blocks_sight
+        assert vision._is_fov_current(fov, pos, sight_range)
+
+        near_tile = Tile(game_map, 22, 21)
+        near_tile.blocks_sight = not near_tile.blocks_sight
+        assert not vision._is_fov_current(fov, pos, sight_range)
+
+        # as does moving or a change in sight range
+        vision._calculate_fov(fov, pos, sight_range)
+        assert vision._is_fov_current(fov, pos, sight_range)
+        assert not vision._is_fov_current(fov, pos, sight_range + 1)
+        pos.set(21, 20)
+        assert not vision._is_fov_current(fov, pos, sight_range)
+
+    def test_thread_pool_matches_one_at_a_time(self, monkeypatch):
+        """
+        Test the light map and fov worked out across the thread pool match those worked out one at a time
+        """
+        game_map = game_map_mock.create_game_map(6)
+        monkeypatch.setattr(store, "current_game_map", game_map)
+        monkeypatch.setattr(world, "create_combat_stats", lambda entity: SimpleNamespace(sight_range=3 + entity % 5))
+
+        positions = [(20, 20), (15, 17), (25, 22), (18, 25), (23, 15), (14, 26)]  # all close enough to be active
+        entities = [world.create_entity([Identity("mock_player"), IsPlayer(), Position(positions[0])])]
+        for position in positions:
+            entities.append(world.create_entity([Identity("mock_seer"), Position(position), FOV(), HasCombatStats()]))
+            entities.append(world.create_entity([Identity("mock_light"), Position(position), LightSource(4)]))
+
+        def _process_vision():
+            for entity in entities:
+                game_map.remove_lit_area(entity)
+                if world.entity_has_component(entity, FOV):
+                    world.get_entitys_component(entity, FOV).calculated_with = None
+
+            vision.process_light_map()
+            vision.process_fov()
+            fovs = [world.get_entitys_component(e, FOV).map for e in entities if world.entity_has_component(e, FOV)]
+            return game_map.light_counts.copy(), fovs
+
+        try:
+            monkeypatch.setattr(library.GAME_CONFIG.performance, "vision_workers", 1)
+            light_counts, fovs = _process_vision()
+            assert vision._get_executor() is None
+
+            monkeypatch.setattr(library.GAME_CONFIG.performance, "vision_workers", 4)
+            threaded_light_counts, threaded_fovs = _process_vision()
+            assert vision._get_executor() is not None
+        finally:
+            if vision._executor:
+                vision._executor.shutdown()
+                vision._executor = None
+            for entity in entities:
+                world.delete(entity)
+            world.process_pending_deletions()
+
+        assert light_counts.any() and np.array_equal(light_counts, threaded_light_counts)
+        assert all(fov.any() for fov in fovs)
+        assert all(np.array_equal(fov, threaded_fov) for fov, threaded_fov in zip(fovs, threaded_fovs))
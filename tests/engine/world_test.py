@@ -0,0 +1,124 @@
+import random
+
+import numpy as np
+
+from scripts.engine import world
+from scripts.engine.component import Blocking, Identity, IsGod, Position
+from scripts.engine.core.constants import TargetTag
+from scripts.engine.core.data import store
+from tests.mocks import game_map_mock
+
+
+class TestWorld:
+
+    def test_tags_mask_matches_each_tile(self, monkeypatch):
+        """
+        Test the tags mask matches checking the tags against each tile's entities and blocking one at a time, for
+        rectangles partly off the map
+        """
+        game_map = game_map_mock.create_game_map(3)
+        monkeypatch.setattr(store, "current_game_map", game_map)
+        rng = random.Random(3)
+        game_map.visibility_map[:] = np.random.default_rng(3).random(game_map.visibility_map.shape) < 0.5
+
+        entities = []
+        for i in range(40):
+            x, y = rng.randrange(game_map.width - 1), rng.randrange(game_map.height - 1)
+            positions = [(x, y), (x + 1, y), (x, y + 1), (x + 1, y + 1)] if i % 8 == 0 else [(x, y)]
+            blocking = Blocking(blocks_movement=rng.random() < 0.7, blocks_sight=False)
+            entities.append(world.create_entity([Identity("mock_entity"), Position(*positions), blocking]))
+
+        def _has_tag(x, y, tag, active_entity):
+            if not (0 <= x < game_map.width and 0 <= y < game_map.height):
+                return False
+            on_tile = store.spatial_index.get_entities((x, y))
+            blocked = game_map.blocks_movement_map[x, y] or any(
+                world.get_entitys_component(entity, Blocking).blocks_movement for entity in on_tile
+            )
+            return {
+                TargetTag.SELF: active_entity in on_tile,
+                TargetTag.OTHER_ENTITY: any(entity != active_entity for entity in on_tile),
+                TargetTag.NO_ENTITY: not on_tile,
+                TargetTag.ANY: True,
+                TargetTag.OPEN_SPACE: not blocked,
+                TargetTag.BLOCKED_MOVEMENT: blocked,
+                TargetTag.IS_VISIBLE: bool(game_map.visibility_map[x, y]),
+                TargetTag.NO_BLOCKING_TILE: not game_map.blocks_movement_map[x, y],
+            }.get(tag, False)
+
+        all_tags = [value for name, value in vars(TargetTag).items() if not name.startswith("_")]
+        try:
+            for _ in range(100):
+                start_x, start_y = rng.randrange(-5, game_map.width), rng.randrange(-5, game_map.height)
+                width, height = rng.randrange(1, 12), rng.randrange(1, 12)
+                tags = rng.sample(all_tags, rng.randrange(1, 3))
+                active_entity = rng.choice(entities)
+
+                mask = world.get_tags_mask((start_x, start_y), width, height, tags, active_entity)
+                assert mask.shape == (width, height)
+                for i in range(width):
+                    for j in range(height):
+                        x, y = start_x + i, start_y + j
+                        expected = all(_has_tag(x, y, tag, active_entity) for tag in tags)
+                        assert mask[i, j] == expected, (x, y, tags)
+        finally:
+            for entity in entities:
+                world.delete(entity)
+            world.process_pending_deletions()
+
+    def test_flag_index_follows_flags(self):
+        """
+        Test the entities held against a flag follow the flag being added, removed and the entity being deleted
+        """
+        first = world.create_entity([Identity("mock_god"), IsGod()])
+        second = world.create_entity([Identity("mock_entity")])
+        assert world.get_entities_with_flag(IsGod)[-1] == first
+        assert second not in world.get_entities_with_flag(IsGod)
+
+        try:
+            world.add_component(second, IsGod())
+            assert world.get_entities_with_flag(IsGod)[-2:] == [first, second]
+
+            world.remove_component(first, IsGod)
+            assert first not in world.get_entities_with_flag(IsGod)
+            assert not world.entity_has_component(first, IsGod)
+
+            world.add_component(first, IsGod())
+            assert world.get_entities_with_flag(IsGod)[-2:] == [second, first]
+
+            # gone as soon as it is queued for deletion, not just once it is processed
+            world.delete(second)
+            assert second not in world.get_entities_with_flag(IsGod)
+            world.process_pending_deletions()
+            assert world.get_entities_with_flag(IsGod)[-1] == first
+        finally:
+            world.delete(first)
+            world.delete(second)
+            world.process_pending_deletions()
+
+        assert first not in world.get_entities_with_flag(IsGod)
+
+    def test_remove_component_updates_map(self, monkeypatch):
+        """
+        Test removing blocking or position takes the entity off the map's layers and the spatial index
+        """
+        game_map = game_map_mock.create_game_map(4)
+        monkeypatch.setattr(store, "current_game_map", game_map)
+        x, y = map(int, np.argwhere(~game_map.blocks_movement_map)[0])
+        position = Position((x, y))
+        entity = world.create_entity([Identity("mock_entity"), position, Blocking(True, True)])
+        assert not game_map.walkable_map[x, y] and not game_map.transparency_map[x, y]
+
+        try:
+            world.remove_component(entity, Blocking)
+            assert game_map.walkable_map[x, y] and game_map.occupancy_map[x, y] == 1
+
+            world.remove_component(entity, Position)
+            assert entity not in store.spatial_index and game_map.occupancy_map[x, y] == 0
+
+            # no longer linked, so moving it does nothing
+            position.set(x + 1, y)
+            assert entity not in store.spatial_index
+        finally:
+            world.delete(entity)
+            world.process_pending_deletions()
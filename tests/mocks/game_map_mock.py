@@ -0,0 +1,20 @@
+import numpy as np
+
+from scripts.engine import library, world  # noqa: F401, world must be imported before the game map
+from scripts.engine.core.constants import TileCategory
+from scripts.engine.world_objects.game_map import GameMap
+
+
+def create_game_map(seed: int) -> GameMap:
+    """
+    Create a game map with walls scattered across a floor
+    """
+    game_map = GameMap("cave", seed)
+    sprite_paths = library.MAPS["cave"].sprite_paths
+    floor_index = game_map.get_tile_type_index(sprite_paths[TileCategory.FLOOR])
+    wall_index = game_map.get_tile_type_index(sprite_paths[TileCategory.WALL], True, True)
+
+    rng = np.random.default_rng(seed)
+    is_wall = rng.random((game_map.width, game_map.height)) < 0.3
+    game_map.set_tile_types(np.where(is_wall, wall_index, floor_index).astype(np.int16))
+    return game_map
@@ -0,0 +1,99 @@
+import pygame
+import pytest
+
+from scripts.engine import chronicle, library, state, world
+from scripts.engine.component import Aesthetic, Identity, Position
+from scripts.engine.core.constants import GameState, RenderLayer
+from scripts.engine.core.data import store
+from scripts.engine.core.definitions import TraitSpritesData
+from scripts.nqp import main
+from tests.mocks import game_map_mock
+
+_PLAYER = 1
+
+
+class TestMain:
+
+    @pytest.fixture
+    def turns(self, monkeypatch):
+        """
+        A mock turn queue, holding the turns taken, with the player's turn after three others and time enough to
+        take them all
+        """
+        turns = {"queue": [3, 4, 5, _PLAYER, 6], "taken": [], "state": GameState.GAMEMAP}
+
+        def _take_turn(entity):
+            turns["taken"].append(turns["queue"].pop(0))
+
+        monkeypatch.setattr(world, "get_player", lambda: _PLAYER)
+        monkeypatch.setattr(world, "take_turn", _take_turn)
+        monkeypatch.setattr(chronicle, "get_turn_holder", lambda: turns["queue"][0])
+        monkeypatch.setattr(state, "get_current", lambda: turns["state"])
+        monkeypatch.setattr(library.GAME_CONFIG.performance, "npc_turn_time_per_frame", 1000)
+        monkeypatch.setattr(main, "_is_animating_in_view", lambda entity: False)
+        return turns
+
+    def test_npc_turns_stop_at_player(self, turns):
+        """
+        Test non-player turns are taken until it is the player's turn
+        """
+        main.take_npc_turns()
+        assert turns["taken"] == [3, 4, 5]
+
+        main.take_npc_turns()
+        assert turns["taken"] == [3, 4, 5]
+
+    def test_npc_turns_stop_on_state_change(self, turns, monkeypatch):
+        """
+        Test non-player turns stop once a turn changes the game state
+        """
+
+        def _take_turn(entity):
+            turns["taken"].append(turns["queue"].pop(0))
+            if entity == 4:
+                turns["state"] = GameState.PLAYER_DEAD
+
+        monkeypatch.setattr(world, "take_turn", _take_turn)
+        main.take_npc_turns()
+        assert turns["taken"] == [3, 4]
+
+    def test_npc_turns_stop_on_animation(self, turns, monkeypatch):
+        """
+        Test non-player turns stop once a turn starts an animation the player can see, leaving the rest for the next
+        frame
+        """
+        monkeypatch.setattr(main, "_is_animating_in_view", lambda entity: entity == 3)
+        main.take_npc_turns()
+        assert turns["taken"] == [3]
+
+        main.take_npc_turns()
+        assert turns["taken"] == [3, 4, 5]
+
+    def test_is_animating_in_view(self, monkeypatch):
+        """
+        Test an entity is animating in view only when moving or not idle on a tile the player can see
+        """
+        game_map = game_map_mock.create_game_map(6)
+        monkeypatch.setattr(store, "current_game_map", game_map)
+        game_map.visibility_map[:] = False
+        sprites = TraitSpritesData(idle=pygame.Surface((1, 1)), attack=pygame.Surface((1, 1)))
+        aesthetic = Aesthetic(sprites.idle, sprites, [], RenderLayer.ACTOR, (2, 2))
+        entity = world.create_entity([Identity("mock_animated"), Position((2, 2)), aesthetic])
+
+        try:
+            assert not main._is_animating_in_view(entity)
+
+            aesthetic.current_sprite = sprites.attack
+            assert not main._is_animating_in_view(entity)
+
+            game_map.visibility_map[2, 2] = True
+            assert main._is_animating_in_view(entity)
+
+            aesthetic.current_sprite = sprites.idle
+            assert not main._is_animating_in_view(entity)
+
+            aesthetic.target_draw_x = 3
+            assert main._is_animating_in_view(entity)
+        finally:
+            world.delete(entity)
+            world.process_pending_deletions()